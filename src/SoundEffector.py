@@ -6,20 +6,71 @@
 # @
 
 # import os
+import argparse
 import sys
-from pyqtgraph.Qt import QtGui
 import SoundEffectorModel
-import SoundEffectorView
 import SoundEffectorController
 
-if __name__ == "__main__":
+
+## 画面ありの実行
+# @brief Qt・pyqtgraph・音声デバイスはここで初めて読み込みます
+# @param model SoundEffectorModel
+# @param args コマンドライン引数
+def runGui(model, args):
+    from pyqtgraph.Qt import QtGui
+    import SoundEffectorEngine
+    import SoundEffectorView
     app = QtGui.QApplication(sys.argv)
-    model = SoundEffectorModel.SoundEffectorModel()
-    view = SoundEffectorView.SoundEffectorView(model)
-    controller = SoundEffectorController.SoundEffectController(view, model)
+    backend = SoundEffectorEngine.PyAudioBackend(model.RATE, model.CHANNELS)
+    engine = SoundEffectorEngine.SoundEffectorEngine(model, backend)
+    view = SoundEffectorView.SoundEffectorView(model, engine)
+    controller = SoundEffectorController.SoundEffectController(model, view)
+    if args.preset:
+        controller.parameters.applyPreset(
+            model, SoundEffectorController.readPreset(args.preset))
     try:
+        engine.start()
         view.show()
         sys.exit(app.exec_())
     except Exception as e:
-        print("Error: {}".format(e.argv[1]))
-        model.delete()
+        print("Error: {}".format(e))
+    finally:
+        engine.stop()
+
+
+## 画面なしの実行
+# @brief Qt・音声デバイスを使用せず、ファイルにエフェクトをかけます
+# @details パラメータシステムを付けると1CHUNKずつの処理になるため、プリセットは
+#          モデルに直接適用し、args.blockのCHUNK数ずつまとめて処理します。
+# @param model SoundEffectorModel
+# @param args コマンドライン引数
+def runHeadless(model, args):
+    import SoundEffectorRenderer
+    if args.preset:
+        SoundEffectorController.applyPreset(
+            model, SoundEffectorController.readPreset(args.preset))
+    _, rtf = SoundEffectorRenderer.renderFile(args.input, args.output, model,
+                                              args.rate, args.channels, args.block)
+    print("real-time factor: {:.1f}x".format(rtf))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SoundEffector")
+    parser.add_argument("--headless", action="store_true",
+                        help="render input to output without Qt or audio devices")
+    parser.add_argument("input", nargs="?", help="input file (headless)")
+    parser.add_argument("output", nargs="?", help="output file (headless)")
+    parser.add_argument("--preset", help="preset file (.json)")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--block", type=int, default=64,
+                        help="number of CHUNKs processed at once (headless)")
+    args = parser.parse_args()
+
+    model = SoundEffectorModel.SoundEffectorModel()
+    if args.headless:
+        if args.input is None or args.output is None:
+            parser.error("--headless requires input and output")
+        runHeadless(model, args)
+    else:
+        runGui(model, args)
@@ -0,0 +1,114 @@
+# @package SoundEffectorAnalyzer.py
+# @brief SoundEffectorの解析処理(スペクトラム・ケプストラム・位相)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+from SoundEffectorPhaser import FFT_OUT
+
+
+## 解析器
+# @brief 履歴の直近size点を実数FFTで解析します
+# @details 購読されている結果(spectrum/power/cepstrum/phase)のみを計算し、
+#          解析はanalysis_rate[Hz]に間引いて行います。
+#          結果は事前確保した配列に書き込み、購読者のコールバックに渡します。
+class Analyzer:
+    ## 解析結果の種類
+    PRODUCTS = ("spectrum", "power", "cepstrum", "phase")
+
+    ## コンストラクタ
+    # @param size 解析長
+    # @param rate サンプリングレート
+    # @param analysis_rate 解析頻度[Hz]
+    def __init__(self, size, rate=44100, analysis_rate=60.0):
+        self.size = size
+        self.rate = rate
+        self.window = np.hanning(size)
+        self.freq = np.fft.rfftfreq(size, 1.0 / rate)
+        self.quefrency = np.arange(size // 2) / rate
+        self.windowed = np.zeros(size)
+        self.spectrum = np.zeros(size // 2 + 1, dtype=complex)
+        self.power = np.zeros(size // 2 + 1)
+        self.logpower = np.zeros(size // 2 + 1)
+        self.cepstrum = np.zeros(size)
+        self.phase = np.zeros(size // 2 + 1)
+        self.subscribers = {product: [] for product in self.PRODUCTS}
+        self.pending = 0
+        self.analysis_count = 0
+        self.setAnalysisRate(analysis_rate)
+
+    ## 解析頻度の設定
+    # @param analysis_rate 解析頻度[Hz]
+    def setAnalysisRate(self, analysis_rate):
+        self.analysis_rate = analysis_rate
+        self.interval = max(1, int(self.rate / analysis_rate))
+
+    ## 購読
+    # @param product 解析結果の種類
+    # @param callback 解析ごとに結果を渡す関数(Noneの場合は計算のみ)
+    def subscribe(self, product, callback=None):
+        if product not in self.subscribers:
+            raise KeyError("unknown product: {}".format(product))
+        self.subscribers[product].append(callback)
+
+    ## 購読解除
+    # @param product 解析結果の種類
+    # @param callback subscribeに渡した関数
+    def unsubscribe(self, product, callback=None):
+        self.subscribers[product].remove(callback)
+
+    ## 購読判定
+    # @param product 解析結果の種類
+    # @return subscribed 購読者がいる場合True
+    def isSubscribed(self, product):
+        return len(self.subscribers[product]) > 0
+
+    ## 解析
+    # @brief 前回の解析からinterval以上のサンプルが追加された場合のみ解析します
+    # @param data 直近size点の信号
+    # @param new_samples 前回の呼び出し以降に追加されたサンプル数
+    # @return analyzed 解析を行った場合True
+    def update(self, data, new_samples):
+        self.pending += new_samples
+        if self.pending < self.interval:
+            return False
+        self.pending %= self.interval
+        self.analyze(data)
+        return True
+
+    ## 解析(間引きなし)
+    # @param data 直近size点の信号
+    def analyze(self, data):
+        need_cepstrum = self.isSubscribed("cepstrum")
+        need_power = need_cepstrum or self.isSubscribed("power")
+        need_phase = self.isSubscribed("phase")
+        if not (need_power or need_phase or self.isSubscribed("spectrum")):
+            return
+        np.multiply(data, self.window, out=self.windowed)
+        if FFT_OUT:
+            np.fft.rfft(self.windowed, out=self.spectrum)
+        else:
+            self.spectrum[:] = np.fft.rfft(self.windowed)
+        if need_power:
+            np.abs(self.spectrum, out=self.power)
+            np.square(self.power, out=self.power)
+        if need_cepstrum:
+            np.add(self.power, 0.0001, out=self.logpower)
+            np.log10(self.logpower, out=self.logpower)
+            self.logpower *= 20
+            if FFT_OUT:
+                np.fft.irfft(self.logpower, self.size, out=self.cepstrum)
+            else:
+                self.cepstrum[:] = np.fft.irfft(self.logpower, self.size)
+        if need_phase:
+            np.arctan2(self.spectrum.imag, self.spectrum.real, out=self.phase)
+        self.analysis_count += 1
+        for product in self.PRODUCTS:
+            for callback in self.subscribers[product]:
+                if callback is not None:
+                    callback(getattr(self, product))
@@ -0,0 +1,200 @@
+# @package SoundEffectorBatch.py
+# @brief 複数の音声ファイルをプロセスプールで並列にオフライン処理します
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import SoundEffectorController
+import SoundEffectorIO
+import SoundEffectorModel
+import SoundEffectorRenderer
+
+
+""" ---------------------------------------------------------------------------
+    Worker
+--------------------------------------------------------------------------- """
+## セグメントの解析
+# @brief 処理済み信号からCHUNKごとのパワースペクトラム・ケプストラムを求めます
+# @param model SoundEffectorModel
+# @param padded 解析用の処理済み信号(先頭にANALYZEDSIZE-CHUNKの文脈を含む)
+# @param first_chunk セグメント先頭の通しCHUNK番号
+# @param hop 解析間隔(CHUNK数)
+# @param batch 一度にFFTするフレーム数
+# @return power パワースペクトラム(フレーム数×ANALYZEDSIZE/2+1)
+# @return cepstrum ケプストラム(フレーム数×ANALYZEDSIZE/2)
+def analyzeSegment(model, padded, first_chunk, hop, batch=64):
+    frames = np.lib.stride_tricks.sliding_window_view(
+        padded, model.ANALYZEDSIZE)[::model.CHUNK]
+    index = np.arange(frames.shape[0])
+    frames = frames[(first_chunk + index) % hop == 0]
+    half = model.ANALYZEDSIZE // 2
+    power = np.empty((frames.shape[0], half + 1), dtype="float32")
+    cepstrum = np.empty((frames.shape[0], half), dtype="float32")
+    for start in range(0, frames.shape[0], batch):
+        spectrum = model.fft(frames[start:start + batch], model.HANNINGWINDOW)
+        full_power = model.calcPowerSpectrum(spectrum)
+        power[start:start + batch] = full_power[:, :half + 1]
+        cepstrum[start:start + batch] = model.makeCepstrum(full_power)[:, :half]
+    return power, cepstrum
+
+
+## セグメントの処理(ワーカープロセス)
+# @brief 担当する範囲(直前の文脈を含む)だけをファイルから読み込んで処理します
+# @param task (path, rate, channels, start, stop, context, preset, analysis_hop)
+# @return output 出力音信号(文脈部分を除く)
+# @return analysis (power, cepstrum)、解析しない場合None
+# @return elapsed 処理時間[s]
+def processSegment(task):
+    path, rate, channels, start, stop, context, preset, analysis_hop = task
+    begin = time.perf_counter()
+    model = SoundEffectorModel.SoundEffectorModel()
+    SoundEffectorController.applyPreset(model, preset)
+    data, rate, channels = SoundEffectorIO.readRange(path, start - context, stop,
+                                                     rate, channels)
+    data = SoundEffectorRenderer.toMonoral(model, data, channels)
+    model.whole_counter = (start - context) // model.CHUNK
+    output = SoundEffectorRenderer.render(model, data)
+    analysis = None
+    if analysis_hop:
+        overlap = min(context, model.ANALYZEDSIZE - model.CHUNK)
+        lead = model.ANALYZEDSIZE - model.CHUNK - overlap
+        tail = output[context - overlap:]
+        chunks = -(-len(tail) // model.CHUNK)
+        padded = np.zeros(lead + max(chunks, 1) * model.CHUNK, dtype="int16")
+        padded[lead:lead + len(tail)] = tail
+        analysis = analyzeSegment(model, padded, start // model.CHUNK, analysis_hop)
+    return output[context:], analysis, time.perf_counter() - begin
+
+
+""" ---------------------------------------------------------------------------
+    Batch
+--------------------------------------------------------------------------- """
+## セグメント分割
+# @brief CHUNK境界で分割し、各セグメントの直前に重ねる文脈の長さを決めます
+# @param frames フレーム数
+# @param chunk CHUNK
+# @param segment_chunks 1セグメントのCHUNK数(Noneの場合は分割しません)
+# @param overlap 重ねる区間のサンプル数(CHUNKの倍数)
+# @return segments (start, stop, context)のリスト
+def splitSegments(frames, chunk, segment_chunks, overlap):
+    if segment_chunks is None:
+        return [(0, frames, 0)]
+    segments = []
+    length = segment_chunks * chunk
+    for start in range(0, max(frames, 1), length):
+        segments.append((start, min(start + length, frames), min(overlap, start)))
+    return segments
+
+
+## 文脈の長さ
+# @brief エフェクトチェーンの状態を再現するための先行処理(pre-roll)の長さを
+#        CHUNKの倍数に切り上げ、解析する場合は解析に必要な直前の区間を加えます
+# @details 解析に使う直前の区間は、pre-roll後の(状態が再現された)出力から取ります。
+# @param model プリセットを適用したSoundEffectorModel
+# @param analysis_hop 解析間隔(CHUNK数, 0の場合は解析しない)
+# @return overlap 重ねる区間のサンプル数(状態の長さに限りがない場合None)
+def contextLength(model, analysis_hop):
+    memory = model.chain.memory()
+    if memory is None:
+        return None
+    overlap = model.ANALYZEDSIZE - model.CHUNK if analysis_hop else 0
+    return overlap + -(-memory // model.CHUNK) * model.CHUNK
+
+
+## バッチ処理
+# @brief ファイル群をセグメントに分けてプロセスプールで処理し、順番通りに結合します
+# @details 各ワーカーは担当する範囲だけをファイルから読み込みます。セグメントの
+#          直前には、エフェクトチェーンの状態の長さ分の区間を重ねて処理(pre-roll)
+#          するため、結合した結果はファイル全体を1回で処理した場合と一致します。
+#          状態の長さに限りがないエフェクト(IIRフィルタ・ダイナミクス・
+#          フィードバック・リバーブ等)が有効な場合は、ファイルを分割しません。
+# @param paths 入力ファイルパスのリスト
+# @param output_dir 出力ディレクトリ
+# @param preset 全ファイル共通のプリセット
+# @param workers プロセス数(Noneの場合はCPU数)
+# @param segment_sec 1セグメントの長さ[s]
+# @param analysis_hop 解析間隔(CHUNK数, 0の場合は解析しない)
+# @param rate サンプリングレート(CSV・raw PCMの場合)
+# @param channels チャンネル数(CSV・raw PCMの場合)
+# @return summary ファイルごとの処理結果の辞書のリスト
+def processFiles(paths, output_dir, preset, workers=None, segment_sec=30.0,
+                 analysis_hop=0, rate=44100, channels=1):
+    model = SoundEffectorModel.SoundEffectorModel()
+    SoundEffectorController.applyPreset(model, preset)
+    overlap = contextLength(model, analysis_hop)
+    tasks = []
+    files = []
+    for path in paths:
+        frames, file_rate, file_channels = SoundEffectorIO.signalInfo(path, rate, channels)
+        segment_chunks = None
+        if overlap is not None:
+            segment_chunks = max(1, int(segment_sec * file_rate) // model.CHUNK)
+        segments = splitSegments(frames, model.CHUNK, segment_chunks, overlap)
+        files.append((path, file_rate, frames, len(segments)))
+        for start, stop, context in segments:
+            tasks.append((path, file_rate, file_channels, start, stop, context, preset,
+                          analysis_hop))
+
+    os.makedirs(output_dir, exist_ok=True)
+    summary = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(processSegment, tasks)
+        for path, rate, length, count in files:
+            outputs, analyses, elapsed = [], [], 0.0
+            for _ in range(count):
+                output, analysis, seconds = next(results)
+                outputs.append(output)
+                analyses.append(analysis)
+                elapsed += seconds
+            name = os.path.splitext(os.path.basename(path))[0]
+            output_path = os.path.join(output_dir, name + ".wav")
+            SoundEffectorIO.writeSignal(
+                output_path, np.concatenate(outputs)[:length], rate, 1)
+            if analysis_hop:
+                np.savez(os.path.join(output_dir, name + "_analysis.npz"),
+                         power=np.concatenate([a[0] for a in analyses]),
+                         cepstrum=np.concatenate([a[1] for a in analyses]))
+            duration = length / rate
+            summary.append({"file": path,
+                            "duration": duration,
+                            "segments": count,
+                            "cpu_time": elapsed,
+                            "realtime_factor": (duration / elapsed if elapsed > 0
+                                                else float("inf"))})
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SoundEffector batch renderer")
+    parser.add_argument("inputs", nargs="+", help="input files (.wav/.csv/raw int16)")
+    parser.add_argument("--output-dir", default="rendered")
+    parser.add_argument("--preset", default=None, help="preset JSON file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--segment", type=float, default=30.0,
+                        help="segment length in seconds")
+    parser.add_argument("--analysis-hop", type=int, default=0,
+                        help="save power spectrum/cepstrum every N CHUNKs (0: off)")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = processFiles(args.inputs, args.output_dir,
+                           SoundEffectorController.readPreset(args.preset), args.workers,
+                           args.segment, args.analysis_hop, args.rate, args.channels)
+    wall = time.perf_counter() - start
+    total = sum(item["duration"] for item in summary)
+    for item in summary:
+        print("{file}: {duration:.1f}s audio, {segments} segments, "
+              "{cpu_time:.2f}s cpu, {realtime_factor:.1f}x".format(**item))
+    print("total: {:.1f}s audio in {:.2f}s wall ({:.1f}x real time)".format(
+        total, wall, total / wall if wall > 0 else float("inf")))
@@ -0,0 +1,318 @@
+# @package SoundEffectorBenchmark.py
+# @brief SoundEffectorの信号処理のベンチマーク(音声デバイス不要)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import SoundEffectorController
+import SoundEffectorModel
+import SoundEffectorEngine
+import SoundEffectorPitch
+
+## 既定のCHUNK
+CHUNKS = (128, 256, 512, 1024, 2048, 4096, 8192)
+
+## エフェクトの組み合わせ(プリセット)
+COMBOS = {
+    "clean": {"pre_booster_on": 0},
+    "booster": {"pre_booster_on": 1, "pre_booster_amp": 4},
+    "distortion": {"pre_booster_on": 1, "pre_booster_amp": 4, "distortion_on": 1},
+    "distortion_4x": {"pre_booster_on": 1, "pre_booster_amp": 4, "distortion_on": 1,
+                      "distortion_oversample": 4},
+    "distortion_8x": {"pre_booster_on": 1, "pre_booster_amp": 4, "distortion_on": 1,
+                      "distortion_curve": "tanh", "distortion_oversample": 8},
+    "filter": {"highpass_on": 1, "lowpass_on": 1, "tone_on": 1, "eq_on": 1},
+    "dynamics": {"gate_on": 1, "compressor_on": 1, "limiter_on": 1},
+    "modulation": {"chorus_on": 1, "flanger_on": 1, "delay_on": 1},
+    "reverb": {"reverb_on": 1},
+    "convolution": {"convolution_on": 1},
+    "phaser": {"phaser_on": 1},
+    "phaser_lfo": {"phaser_on": 1, "depth_phaser": 0.3},
+    "phaser_stft": {"phaser_on": 1, "stft_on": 1},
+    "full": {"pre_booster_on": 1, "pre_booster_amp": 4, "distortion_on": 1,
+             "post_booster_on": 1, "post_booster_amp": 2, "phaser_on": 1},
+}
+
+## 計測対象
+TARGETS = ("effect", "phaser", "gate", "analysis", "pitch", "main")
+
+## 画面なしの起動で読み込まれてはいけないモジュール
+HEAVYMODULES = ("scipy", "pyqtgraph", "pyaudio", "PyQt5", "PySide2")
+
+## 起動時間の計測用スクリプト(新しいインタプリタで実行します)
+STARTUPSCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import SoundEffectorModel
+imported = time.perf_counter()
+SoundEffectorModel.SoundEffectorModel()
+constructed = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000,
+                  "construct_ms": (constructed - imported) * 1000,
+                  "modules": sorted(set(name.split(".")[0] for name in sys.modules))}))
+"""
+
+## 録音データ
+RECORDED = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "..", "tests", "data", "test.csv")
+
+
+""" ---------------------------------------------------------------------------
+    Signal
+--------------------------------------------------------------------------- """
+## 試験信号の作成
+# @param name 信号名(sine/noise/sweep/recorded)
+# @param length サンプル数
+# @param rate サンプリングレート
+# @return data 試験信号(int16型)
+def makeSignal(name, length, rate=44100):
+    t = np.arange(length) / rate
+    if name == "sine":
+        data = 8000 * np.sin(2 * np.pi * 440 * t)
+    elif name == "noise":
+        data = 3000 * np.random.RandomState(0).randn(length)
+    elif name == "sweep":
+        duration = length / rate
+        data = 8000 * np.sin(2 * np.pi * 20 * duration / np.log(1000)
+                             * (np.exp(t / duration * np.log(1000)) - 1))
+    elif name == "recorded":
+        recorded = np.loadtxt(RECORDED, delimiter=",", ndmin=1).ravel()
+        data = np.resize(recorded * 100, length)
+    else:
+        raise ValueError("unknown signal: {}".format(name))
+    return np.array(np.clip(data, -32768, 32767), dtype="int16")
+
+
+""" ---------------------------------------------------------------------------
+    Measurement
+--------------------------------------------------------------------------- """
+## 計測対象の関数の作成
+# @param model SoundEffectorModel
+# @param target 計測対象名
+# @param signal 試験信号(int16型, モノラル)
+# @return step 1CHUNK分の処理を行う関数(引数はブロック番号)
+def makeStep(model, target, signal):
+    chunk = model.CHUNK
+    blocks = np.reshape(signal[:len(signal) // chunk * chunk], (-1, chunk))
+    count = blocks.shape[0]
+    if target == "effect":
+        return lambda i: model.effect(blocks[i % count])
+    if target == "phaser":
+        return lambda i: model.phaser(blocks[i % count], model.shift_phaser, i)
+    if target == "gate":
+        return lambda i: model.gate(blocks[i % count])
+    if target == "analysis":
+        for product in model.analyzer.PRODUCTS:
+            model.analyzer.subscribe(product)
+        return lambda i: model.analyze(blocks[i % count])
+    if target == "pitch":
+        tracker = SoundEffectorPitch.PitchTracker(model.ANALYZEDSIZE, model.RATE)
+        tracker.attach(model.analyzer, chunk)
+        return lambda i: model.analyze(blocks[i % count])
+    if target == "main":
+        for product in model.analyzer.PRODUCTS:
+            model.analyzer.subscribe(product)
+        stream = SoundEffectorEngine.FakeStreamBackend(
+            model.toStereo(signal), model.RATE, model.CHANNELS, loop=True)
+        return lambda i: model.main(stream)
+    raise ValueError("unknown target: {}".format(target))
+
+
+## 計測
+# @param step 1CHUNK分の処理を行う関数
+# @param period 1CHUNKの再生時間[s]
+# @param blocks 計測するCHUNK数
+# @param warmup 計測前に捨てるCHUNK数
+# @return result 計測結果の辞書
+def measure(step, period, blocks=200, warmup=20):
+    for i in range(warmup):
+        step(i)
+    times = np.empty(blocks)
+    for i in range(blocks):
+        start = time.perf_counter_ns()
+        step(warmup + i)
+        times[i] = time.perf_counter_ns() - start
+    times /= 1000.0
+
+    """ Allocation(一時的な確保量のピーク) """
+    alloc_blocks = min(blocks, 50)
+    peaks = np.empty(alloc_blocks)
+    tracemalloc.start()
+    for i in range(alloc_blocks):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        step(warmup + blocks + i)
+        peaks[i] = tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    p50, p99 = np.percentile(times, [50, 99])
+    return {"mean_us": float(np.mean(times)),
+            "p50_us": float(p50),
+            "p99_us": float(p99),
+            "jitter_us": float(p99 - p50),
+            "max_us": float(np.max(times)),
+            "headroom_used_pct": float(np.mean(times) / (period * 1e6) * 100),
+            "alloc_bytes_per_chunk": float(np.mean(peaks))}
+
+
+## ベンチマーク
+# @param chunks CHUNKのリスト
+# @param combos エフェクトの組み合わせ名のリスト
+# @param targets 計測対象名のリスト
+# @param signals 試験信号名のリスト
+# @param blocks 計測するCHUNK数
+# @return results 計測結果の辞書のリスト
+def runBenchmark(chunks=CHUNKS, combos=tuple(COMBOS), targets=TARGETS,
+                 signals=("noise",), blocks=200):
+    results = []
+    for chunk in chunks:
+        for signal_name in signals:
+            for combo in combos:
+                for target in targets:
+                    if target in ("phaser", "gate", "analysis", "pitch") and combo != combos[0]:
+                        continue
+                    model = SoundEffectorModel.SoundEffectorModel(chunk)
+                    SoundEffectorController.applyPreset(model, COMBOS[combo])
+                    signal = makeSignal(signal_name, max(chunk * 64, model.RATE),
+                                        model.RATE)
+                    step = makeStep(model, target, signal)
+                    result = {"chunk": chunk, "signal": signal_name,
+                              "combo": combo, "target": target}
+                    result.update(measure(step, chunk / model.RATE, blocks))
+                    results.append(result)
+    return results
+
+
+## 起動時間の計測
+# @brief 新しいインタプリタでSoundEffectorModelのimport・生成にかかる時間を計測し、
+#        重いモジュールが読み込まれていないことを確認します
+# @details 1回目はディスクのキャッシュ(SOUNDEFFECTOR_CACHEを設定した場合)を作成する
+#          場合があるため計測から除きます。
+# @param repeats 計測回数
+# @return result 計測結果の辞書
+def measureStartup(repeats=5):
+    samples = []
+    for i in range(repeats + 1):
+        output = subprocess.check_output(
+            [sys.executable, "-c", STARTUPSCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        samples.append(json.loads(output.decode().strip().splitlines()[-1]))
+    samples = samples[1:]
+    total = [sample["import_ms"] + sample["construct_ms"] for sample in samples]
+    return {"import_ms": float(np.median([sample["import_ms"] for sample in samples])),
+            "construct_ms": float(np.median([sample["construct_ms"]
+                                             for sample in samples])),
+            "total_ms": float(np.median(total)),
+            "heavy_modules": [name for name in HEAVYMODULES
+                              if name in samples[-1]["modules"]]}
+
+
+""" ---------------------------------------------------------------------------
+    Report
+--------------------------------------------------------------------------- """
+## 実行環境の情報
+# @return meta 実行環境の辞書
+def environment():
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor()}
+
+
+## 結果の識別子
+# @param result 計測結果
+# @return key (chunk, signal, combo, target)
+def resultKey(result):
+    return (result["chunk"], result["signal"], result["combo"], result["target"])
+
+
+## 結果の比較
+# @param results 今回の計測結果
+# @param baseline 比較対象の計測結果
+# @param threshold 退行とみなす比率
+# @return regressions (key, 比率)のリスト
+def compare(results, baseline, threshold=1.2):
+    previous = {resultKey(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = resultKey(result)
+        if key not in previous:
+            continue
+        ratio = result["p50_us"] / max(previous[key]["p50_us"], 1e-9)
+        print("{:>5} {:>8} {:>12} {:>9}: {:8.1f}us -> {:8.1f}us ({:5.2f}x)".format(
+            *key, previous[key]["p50_us"], result["p50_us"], ratio))
+        if ratio > threshold:
+            regressions.append((key, ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SoundEffector DSP benchmark")
+    parser.add_argument("--chunks", type=int, nargs="+", default=list(CHUNKS))
+    parser.add_argument("--combos", nargs="+", default=list(COMBOS))
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS))
+    parser.add_argument("--signals", nargs="+", default=["noise"],
+                        help="sine/noise/sweep/recorded")
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None,
+                        help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p50 ratio treated as a regression")
+    parser.add_argument("--startup", action="store_true",
+                        help="measure headless import/construction time only")
+    parser.add_argument("--startup-budget", type=float, default=500.0,
+                        help="startup time (ms) treated as a regression")
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = measureStartup()
+        print("startup: import {import_ms:.1f}ms construct {construct_ms:.1f}ms "
+              "total {total_ms:.1f}ms heavy modules {heavy_modules}".format(**startup))
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "startup": startup}, f, indent=2)
+        if startup["heavy_modules"]:
+            raise SystemExit("heavy modules imported at startup: {}".format(
+                ", ".join(startup["heavy_modules"])))
+        if startup["total_ms"] > args.startup_budget:
+            raise SystemExit("startup {:.1f}ms over budget {:.1f}ms".format(
+                startup["total_ms"], args.startup_budget))
+        raise SystemExit(0)
+
+    results = runBenchmark(args.chunks, args.combos, args.targets,
+                           args.signals, args.blocks)
+    for result in results:
+        print("{chunk:>5} {signal:>8} {combo:>12} {target:>9}: "
+              "{mean_us:8.1f}us/chunk p50 {p50_us:8.1f} p99 {p99_us:8.1f} "
+              "{headroom_used_pct:5.1f}% of period {alloc_bytes_per_chunk:8.0f}B alloc"
+              .format(**result))
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            raise SystemExit("{} regression(s) over {:.2f}x".format(
+                len(regressions), args.threshold))
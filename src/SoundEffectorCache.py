@@ -0,0 +1,126 @@
+# @package SoundEffectorCache.py
+# @brief SoundEffectorのDSPテーブル(フィルタ係数・インパルス応答等)のキャッシュ
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import hashlib
+import inspect
+import os
+import re
+import tempfile
+import numpy as np
+
+## テーブルの形式の版数(保存形式を変えた場合に上げて古いキャッシュを無効にします)
+VERSION = 1
+
+## キャッシュディレクトリ(環境変数SOUNDEFFECTOR_CACHEまたはsetCacheDirで設定、
+#  既定は空文字列でディスクのキャッシュは無効)
+CACHEDIR = os.environ.get("SOUNDEFFECTOR_CACHE", "")
+
+## プロセス内のキャッシュ
+_tables = {}
+
+## テーブルを作成する関数→ソースのハッシュ
+_sources = {}
+
+
+## キャッシュディレクトリの設定
+# @param path ディレクトリ(Noneまたは空文字列でディスクのキャッシュを無効)
+def setCacheDir(path):
+    global CACHEDIR
+    CACHEDIR = path or ""
+
+
+## テーブルを作成する関数のハッシュ
+# @brief 関数のソースのハッシュです(作成方法を変えると別のキャッシュになります)
+# @details ソースを取得できない場合は関数の修飾名を使用します。
+# @param builder テーブルを作成する関数
+# @return digest ハッシュ(16進数12文字)
+def sourceHash(builder):
+    digest = _sources.get(builder)
+    if digest is None:
+        try:
+            source = inspect.getsource(builder)
+        except (OSError, TypeError):
+            source = getattr(builder, "__module__", "") + "." + getattr(
+                builder, "__qualname__", repr(builder))
+        digest = _sources[builder] = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    return digest
+
+
+## キャッシュの識別子
+# @param name テーブル名
+# @param builder テーブルを作成する関数
+# @param args テーブルを作成する関数の引数
+# @return key ファイル名に使用できる識別子
+def cacheKey(name, builder, args):
+    key = "-".join([name, "v{}".format(VERSION), sourceHash(builder)]
+                   + [repr(arg) for arg in args])
+    return re.sub(r"[^0-9A-Za-z.+-]", "_", key)
+
+
+## テーブルの取得
+# @brief プロセス内・ディスクのキャッシュにあればそれを、なければ作成して保存します
+# @details ディスクのキャッシュはCACHEDIRを設定した場合のみ使用します。
+#          ディスクへの書き込みは一時ファイルからの置き換えで行い、書き込めない場合
+#          (読み取り専用の環境等)はプロセス内のキャッシュのみ使用します。
+#          返すテーブルは共有されるため、書き換えないでください。
+# @param name テーブル名
+# @param builder テーブルを作成する関数
+# @param args builderの引数
+# @return table テーブル(読み取り専用)
+def table(name, builder, *args):
+    key = cacheKey(name, builder, args)
+    cached = _tables.get(key)
+    if cached is not None:
+        return cached
+    path = os.path.join(CACHEDIR, key + ".npy") if CACHEDIR else None
+    cached = None
+    if path is not None and os.path.exists(path):
+        try:
+            cached = np.load(path)
+        except (OSError, ValueError):
+            cached = None
+    if cached is None:
+        cached = np.asarray(builder(*args))
+        if path is not None:
+            save(path, cached)
+    cached.setflags(write=False)
+    _tables[key] = cached
+    return cached
+
+
+## テーブルの保存
+# @param path ファイルパス
+# @param data テーブル
+def save(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.save(f, data)
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+## キャッシュの消去
+# @param disk ディスクのキャッシュも消去する場合True
+def clear(disk=False):
+    _tables.clear()
+    if disk and CACHEDIR and os.path.isdir(CACHEDIR):
+        for name in os.listdir(CACHEDIR):
+            if name.endswith(".npy"):
+                try:
+                    os.remove(os.path.join(CACHEDIR, name))
+                except OSError:
+                    pass
@@ -0,0 +1,581 @@
+# @package SoundEffectorChain.py
+# @brief SoundEffectorのエフェクトチェーン(エフェクトノードの並びと融合処理)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import SoundEffectorPhaser
+import SoundEffectorSTFT
+
+## scipy.signal(scipySignal()で最初に使用するときに読み込みます)
+_signal = None
+
+## フェード長→クロスフェードの重み(cos, sin)
+_curves = {}
+
+
+## scipy.signalの取得
+# @brief 起動時間を短くするため、scipyは最初に使用するときに1回だけ読み込みます
+# @return signal scipy.signalモジュール
+def scipySignal():
+    global _signal
+    if _signal is None:
+        from scipy import signal
+        _signal = signal
+    return _signal
+
+
+## クロスフェードの重み
+# @brief 等パワーのクロスフェードの重みをフェード長ごとに1回だけ作成します
+# @param length フェード長[サンプル]
+# @return fade_out 切り替え前の処理の重み(cos)
+# @return fade_in 切り替え後の処理の重み(sin)
+def fadeCurve(length):
+    curve = _curves.get(length)
+    if curve is None:
+        theta = np.arange(1, length + 1) * (np.pi / 2 / length)
+        curve = _curves[length] = (np.cos(theta).astype("float32"),
+                                   np.sin(theta).astype("float32"))
+    return curve
+
+
+## 区間の値
+# @brief サンプルごとの値(1次元配列)は区間を切り出し、定数・チャンネルごとの値
+#        (チャンネル数×1)はそのまま返します
+# @param value 値
+# @param start 区間の先頭
+# @param stop 区間の末尾
+# @return value 区間の値
+def segment(value, start, stop):
+    if np.ndim(value) == 1:
+        return value[start:stop]
+    return value
+
+
+## チャンネルごとの値
+# @brief チャンネルごとの値(チャンネル数の配列)を作業バッファ(チャンネル数×n)に
+#        ブロードキャストできる形にします(定数はそのまま返します)
+# @param value 値
+# @return value 定数またはチャンネル数×1の配列
+def channelwise(value):
+    if np.ndim(value) == 1:
+        return np.asarray(value, dtype=float)[:, np.newaxis]
+    return value
+
+
+""" ---------------------------------------------------------------------------
+    Effect Node
+--------------------------------------------------------------------------- """
+## エフェクトノード
+# @brief エフェクトチェーンの1段です
+# @details pointwiseなノードはops()で(種類, 値)の並びを返し、チェーンが
+#          隣接するノードとまとめて1つの作業バッファ上でその場処理します。
+#          それ以外のノードはprocess()で作業バッファを受け取り結果を返します。
+#          CURVESの属性はschedule()でサンプルごとの値(ランプ・オートメーション)を
+#          次のブロックに指定できます。CHANNELWISEの属性はチャンネルごとの値
+#          (チャンネル数の配列)も受け付けます。
+class EffectNode:
+    ## サンプルごとに独立した処理か
+    pointwise = False
+
+    ## サンプルごとの値を受け付ける属性
+    CURVES = ()
+
+    ## チャンネルごとの値を受け付ける属性
+    CHANNELWISE = ()
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param enabled 有効/無効
+    def __init__(self, name, enabled=True):
+        self.name = name
+        self.enabled = enabled
+        self.curves = {}
+
+    ## パラメータの識別子
+    # @brief 値が変わるとチェーンが再コンパイルされます
+    # @return key パラメータのタプル
+    def key(self):
+        return ()
+
+    ## 融合処理用の演算
+    # @return ops (種類, 値)のリスト
+    def ops(self):
+        return []
+
+    ## アルゴリズム遅延
+    # @return latency 遅延[サンプル]
+    def latency(self):
+        return 0
+
+    ## 状態の初期化
+    # @brief 無効から有効に切り替わったときにチェーンが呼び出します
+    def reset(self):
+        pass
+
+    ## 状態の長さ
+    # @brief 出力に影響する過去の入力のサンプル数です
+    # @return memory サンプル数(IIRフィルタ・フィードバック等で限りがない場合None)
+    def memory(self):
+        return 0
+
+    ## 切り替え前の処理
+    # @brief 設定(選択肢)を変える直前に呼び出され、変更前の設定・状態を写した
+    #        事前確保済みのノードを返します(クロスフェードの変更前の処理に使用します)
+    # @return twin 変更前の処理を続けるノード(Noneの場合はクロスフェードしません)
+    def shadow(self):
+        return None
+
+    ## サンプルごとの値の指定
+    # @param attr 属性名(CURVESのいずれか)
+    # @param curve 次のブロックのサンプルごとの値
+    def schedule(self, attr, curve):
+        self.curves[attr] = curve
+
+    ## サンプルごとの値の取り出し
+    # @param attr 属性名
+    # @param length ブロック長
+    # @return curve サンプルごとの値(指定がない・長さが合わない場合は属性の値)
+    def takeCurve(self, attr, length):
+        curve = self.curves.pop(attr, None)
+        if curve is None or np.shape(curve)[-1] != length:
+            return channelwise(getattr(self, attr))
+        return curve
+
+    ## エフェクト処理
+    # @param buffer 作業バッファ(float32型, 最終軸が時間軸)
+    # @param counter 先頭ブロックのブロック番号
+    # @return output 出力音信号
+    def process(self, buffer, counter):
+        return buffer
+
+
+## ブースター
+# @brief 音の大きさを変動させます
+# @details 倍率は処理のたびに読むため、値が変わってもチェーンは再コンパイルしません。
+class BoosterNode(EffectNode):
+    pointwise = True
+    CURVES = ("amp",)
+    CHANNELWISE = ("amp",)
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param amp 倍率
+    # @param enabled 有効/無効
+    def __init__(self, name, amp=1, enabled=True):
+        super(BoosterNode, self).__init__(name, enabled)
+        self.amp = amp
+
+    def ops(self):
+        return [("gain", self)]
+
+
+## ディストーション
+# @brief 閾値(MAXLEVELに対する%)で音をクリップします
+# @details 閾値は処理のたびに読むため、値が変わってもチェーンは再コンパイルしません。
+class DistortionNode(EffectNode):
+    pointwise = True
+    CURVES = ("thresh",)
+    CHANNELWISE = ("thresh",)
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param thresh 閾値[%]
+    # @param maxlevel 最大振幅
+    # @param enabled 有効/無効
+    def __init__(self, name, thresh=20, maxlevel=32768.0, enabled=True):
+        super(DistortionNode, self).__init__(name, enabled)
+        self.thresh = thresh
+        self.maxlevel = maxlevel
+
+    def ops(self):
+        return [("shape", self)]
+
+    ## 閾値
+    # @param thresh 閾値[%](Noneの場合はthresh、サンプル・チャンネルごとの配列も可)
+    # @return level 閾値(振幅)
+    def level(self, thresh=None):
+        if thresh is None:
+            thresh = self.thresh
+        return thresh / 100 * self.maxlevel
+
+    ## 特性曲線の適用
+    # @param buffer 作業バッファ(その場で書き換えます)
+    def shape(self, buffer):
+        level = self.level(self.takeCurve("thresh", np.shape(buffer)[-1]))
+        np.clip(buffer, -level, level, out=buffer)
+
+
+## フェーザー
+# @brief CHUNKごとの処理とSTFT/オーバーラップ加算処理を切り替えられるフェーザーです
+class PhaserNode(EffectNode):
+    ## コンストラクタ
+    # @param name ノード名
+    # @param chunk フレーム長(CHUNK)
+    # @param rate サンプリングレート
+    # @param stft_size STFTのフレーム長
+    # @param stft_hop STFTのずらし幅
+    # @param enabled 有効/無効
+    # @param twin 切り替え前の処理用の複製を確保するか
+    def __init__(self, name, chunk, rate=44100, stft_size=2048, stft_hop=512,
+                 enabled=True, twin=True):
+        super(PhaserNode, self).__init__(name, enabled)
+        self.shift = 0.5
+        self.depth = 0.0
+        self.lfo_rate = 0.5
+        self.stft_on = False
+        self.engine = SoundEffectorPhaser.Phaser(chunk, rate, self.shift)
+        self.stft_engine = SoundEffectorPhaser.Phaser(stft_size, rate, self.shift,
+                                                      hop=stft_hop)
+        self.stft = SoundEffectorSTFT.STFTProcessor(stft_size, stft_hop)
+        self.stft.effects.append(self.stft_engine)
+        self.twin = None
+        if twin:
+            self.twin = PhaserNode(name, chunk, rate, stft_size, stft_hop, enabled, False)
+
+    def key(self):
+        return (self.stft_on,)
+
+    def latency(self):
+        return self.stft.latency() if self.stft_on else 0
+
+    def reset(self):
+        self.stft.shape = None
+
+    def memory(self):
+        return None if self.stft_on else 0
+
+    def shadow(self):
+        twin = self.twin
+        twin.shift = self.shift
+        twin.depth = self.depth
+        twin.lfo_rate = self.lfo_rate
+        twin.stft_on = self.stft_on
+        twin.stft.assign(self.stft)
+        return twin
+
+    def process(self, buffer, counter):
+        if self.stft_on:
+            self.stft_engine.configure(self.shift, self.depth, self.lfo_rate)
+            return self.stft.process(buffer)
+        self.engine.configure(self.shift, self.depth, self.lfo_rate)
+        return self.engine.process(buffer, counter)
+
+
+## 融合ステージ
+# @brief 隣接するpointwiseノードをまとめ、作業バッファをその場で1回ずつ処理します
+# @details 連続するブースターは1つの演算にまとめ、処理のたびに倍率を読んで
+#          1回の乗算に畳み込みます(サンプルごとの倍率が指定されたものは個別に掛けます)。
+class FusedStage:
+    ## コンストラクタ
+    # @param nodes pointwiseノードのリスト
+    def __init__(self, nodes):
+        self.names = [node.name for node in nodes]
+        self.name = "fused:" + "+".join(self.names)
+        self.ops = []
+        for node in nodes:
+            for kind, value in node.ops():
+                if kind == "gain" and self.ops and self.ops[-1][0] == "gain":
+                    self.ops[-1][1].append(value)
+                elif kind == "gain":
+                    self.ops.append((kind, [value]))
+                else:
+                    self.ops.append((kind, value))
+
+    ## 融合処理
+    # @param buffer 作業バッファ(その場で書き換えます)
+    # @param counter 未使用
+    # @return buffer 作業バッファ
+    def process(self, buffer, counter):
+        for kind, value in self.ops:
+            if kind == "gain":
+                gain = 1
+                for node in value:
+                    factor = node.takeCurve("amp", np.shape(buffer)[-1])
+                    if np.ndim(factor) == 0:
+                        gain = gain * factor
+                    else:
+                        np.multiply(buffer, factor, out=buffer, casting="unsafe")
+                if gain != 1:
+                    np.multiply(buffer, gain, out=buffer)
+            elif kind == "shape":
+                value.shape(buffer)
+        return buffer
+
+
+## クロスフェードステージ
+# @brief ノードの有効/無効・設定の切り替えを等パワーのクロスフェードで行います
+# @details 切り替え前の処理(source)と切り替え後の処理(target)に同じ入力を与え、
+#          cos/sinの重みで混ぜます(Noneは素通し)。無効にする場合は、以後使用しない
+#          ノード自身を切り替え前の処理にします。重みはフェード長ごとに共有し、
+#          作業バッファはチェーンのものを使うため、処理中にメモリを確保しません。
+class CrossfadeStage:
+    ## サンプルごとに独立した処理か
+    pointwise = False
+
+    ## コンストラクタ
+    # @param node 切り替えるノード
+    # @param source 切り替え前の処理(ノード・ステージ、Noneの場合は素通し)
+    # @param target 切り替え後の処理(ノード・ステージ、Noneの場合は素通し)
+    # @param length フェード長[サンプル]
+    # @param buffers 作業バッファの辞書(チェーンと共有)
+    # @param offset 次のブロックの先頭からフェードを始めるまでのサンプル数
+    def __init__(self, node, source, target, length, buffers, offset=0):
+        self.node = node
+        self.name = "fade:" + node.name
+        self.source = source
+        self.target = target
+        self.length = max(int(length), 1)
+        self.position = -int(offset)
+        self.buffers = buffers
+        self.depth = 0
+        for stage in (source, target):
+            if isinstance(stage, CrossfadeStage):
+                self.depth = stage.depth + 1
+        self.fade_out, self.fade_in = fadeCurve(self.length)
+
+    ## 終了判定
+    # @return done フェードが終わった場合True
+    def done(self):
+        return self.position >= self.length
+
+    ## 有効/無効の切り替えの反転
+    # @brief フェードイン中に無効に(フェードアウト中に有効に)戻した場合に、
+    #        現在の重みから逆向きにフェードします
+    def reverse(self):
+        self.source, self.target = self.target, self.source
+        self.position = max(self.length - self.position, 0)
+
+    ## クロスフェード処理
+    # @param buffer 作業バッファ(その場で書き換えます)
+    # @param counter 先頭ブロックのブロック番号
+    # @return buffer 作業バッファ
+    def process(self, buffer, counter):
+        shape = np.shape(buffer)
+        scratch = self.buffers.get((shape, self.depth))
+        if scratch is None:
+            scratch = self.buffers[(shape, self.depth)] = np.zeros(shape, dtype="float32")
+        np.copyto(scratch, buffer)
+        old = scratch if self.source is None else self.source.process(scratch, counter)
+        if self.target is not None:
+            new = self.target.process(buffer, counter)
+            if new is not buffer:
+                np.copyto(buffer, new, casting="unsafe")
+        """ フェード開始前(先頭のskipサンプル)は切り替え前の処理のままにします """
+        skip = min(max(-self.position, 0), shape[-1])
+        if skip:
+            buffer[..., :skip] = old[..., :skip]
+        count = min(shape[-1], self.length - self.position) - skip
+        if count > 0:
+            span = slice(self.position + skip, self.position + skip + count)
+            head = buffer[..., skip:skip + count]
+            head *= self.fade_in[span]
+            np.multiply(old[..., skip:skip + count], self.fade_out[span],
+                        out=scratch[..., skip:skip + count], casting="unsafe")
+            head += scratch[..., skip:skip + count]
+        self.position += shape[-1]
+        return buffer
+
+
+""" ---------------------------------------------------------------------------
+    Effect Chain
+--------------------------------------------------------------------------- """
+## エフェクトチェーン
+# @brief エフェクトノードを順番に適用します。ノードの追加・削除・並べ替えは
+#        実行中に行えます(リストを差し替えるため処理中のブロックには影響しません)
+class EffectChain:
+    ## コンストラクタ
+    # @param nodes エフェクトノードのリスト
+    def __init__(self, nodes=()):
+        self.nodes = list(nodes)
+        self.signature = None
+        self.stages = []
+        self.buffers = {}
+        self.active = set()
+        self.fades = {}
+        self.scratch = {}
+        self.profiler = None
+
+    ## ノードの取得
+    # @param name ノード名
+    # @return node エフェクトノード
+    def __getitem__(self, name):
+        for node in self.nodes:
+            if node.name == name:
+                return node
+        raise KeyError(name)
+
+    ## ノード名の一覧
+    # @return names ノード名のリスト
+    def names(self):
+        return [node.name for node in self.nodes]
+
+    ## ノードの追加
+    # @param node エフェクトノード
+    def append(self, node):
+        self.nodes = self.nodes + [node]
+
+    ## ノードの挿入
+    # @param index 挿入位置
+    # @param node エフェクトノード
+    def insert(self, index, node):
+        nodes = list(self.nodes)
+        nodes.insert(index, node)
+        self.nodes = nodes
+
+    ## ノードの削除
+    # @param name ノード名
+    # @return node 削除したエフェクトノード
+    def remove(self, name):
+        node = self[name]
+        self.nodes = [other for other in self.nodes if other is not node]
+        return node
+
+    ## ノードの移動
+    # @param name ノード名
+    # @param index 移動先
+    def move(self, name, index):
+        node = self[name]
+        nodes = [other for other in self.nodes if other is not node]
+        nodes.insert(index, node)
+        self.nodes = nodes
+
+    ## アルゴリズム遅延
+    # @return latency 有効なノードの遅延の合計[サンプル]
+    def latency(self):
+        return sum(node.latency() for node in self.nodes if node.enabled)
+
+    ## クロスフェードの開始
+    # @brief ノードの有効/無効・設定を変更する直前に呼び出すと、変更前の処理から
+    #        変更後の処理へlengthサンプルかけて切り替えます
+    # @details 無効にする場合はノード自身から素通しへ、有効にする場合は素通しから
+    #          ノードへフェードします。フェード中に有効/無効を戻した場合はその位置から
+    #          逆向きにフェードします。設定の変更はshadow()の複製から切り替え、
+    #          フェード中の変更はそのまま同じフェードで切り替えます。
+    # @param node 変更するノード
+    # @param length フェード長[サンプル]
+    # @param enabled 変更後の有効/無効(Noneの場合は設定の変更)
+    # @param offset 次のブロックの先頭から切り替えるまでのサンプル数
+    def crossfade(self, node, length, enabled=None, offset=0):
+        fade = self.fades.get(id(node))
+        if fade is not None and fade.done():
+            fade = None
+        if enabled is None:
+            if fade is not None or not node.enabled:
+                return
+            twin = node.shadow()
+            if twin is not None:
+                self.fades[id(node)] = CrossfadeStage(node, self.stage(twin), self.stage(node),
+                                                      length, self.scratch, offset)
+            return
+        if enabled == node.enabled:
+            return
+        if fade is not None and None in (fade.source, fade.target):
+            fade.reverse()
+            return
+        if node.enabled:
+            source, target = fade or self.stage(node), None
+        else:
+            source, target = None, self.stage(node)
+        self.fades[id(node)] = CrossfadeStage(node, source, target, length, self.scratch,
+                                              offset)
+
+    ## ノードの処理ステージ
+    # @param node エフェクトノード
+    # @return stage pointwiseなノードは単独の融合ステージ、それ以外はノード自身
+    def stage(self, node):
+        return FusedStage([node]) if node.pointwise else node
+
+    ## 状態の長さ
+    # @return memory 有効なノードの状態の長さの合計[サンプル](限りがない場合None)
+    def memory(self):
+        total = 0
+        for node in self.nodes:
+            if not node.enabled:
+                continue
+            memory = node.memory()
+            if memory is None:
+                return None
+            total += memory
+        return total
+
+    ## コンパイル
+    # @brief 有効なノードを処理ステージの並びに変換します
+    # @details 無効から有効に切り替わったノード(と追加されたノード)は、以前の状態
+    #          (遅延線・フィルタの状態等)が残らないよう初期化します。
+    #          クロスフェード中のノードはCrossfadeStageに置き換えます(無効にした
+    #          ノードもフェードアウトが終わるまで処理し、状態を保ちます)。
+    # @param nodes エフェクトノードのリスト
+    # @return stages 処理ステージのリスト
+    def compile(self, nodes):
+        stages = []
+        group = []
+        active = set()
+        for node in nodes:
+            fade = self.fades.get(id(node))
+            if not node.enabled and fade is None:
+                continue
+            active.add(id(node))
+            if id(node) not in self.active:
+                node.reset()
+            if fade is not None:
+                if group:
+                    stages.append(FusedStage(group))
+                    group = []
+                stages.append(fade)
+                continue
+            if node.pointwise:
+                group.append(node)
+                continue
+            if group:
+                stages.append(FusedStage(group))
+                group = []
+            stages.append(node)
+        if group:
+            stages.append(FusedStage(group))
+        self.active = active
+        return stages
+
+    ## 作業バッファ
+    # @param shape 入力の形
+    # @return buffers (float32の作業バッファ, int16の出力バッファ)
+    def getBuffers(self, shape):
+        if shape not in self.buffers:
+            self.buffers[shape] = (np.zeros(shape, dtype="float32"),
+                                   np.zeros(shape, dtype="int16"))
+        return self.buffers[shape]
+
+    ## エフェクト処理
+    # @param input 入力音信号(最終軸が時間軸)
+    # @param counter 先頭ブロックのブロック番号
+    # @return output 出力音信号(int16型, 飽和処理済み、次の呼び出しで上書きされます)
+    def process(self, input, counter):
+        nodes = self.nodes
+        if self.fades:
+            self.fades = {key: fade for key, fade in self.fades.items()
+                          if not fade.done()}
+        signature = (tuple((id(node), node.enabled, node.key()) for node in nodes),
+                     tuple(id(fade) for fade in self.fades.values()))
+        if signature != self.signature:
+            self.stages = self.compile(nodes)
+            self.signature = signature
+        work, output = self.getBuffers(np.shape(input))
+        np.copyto(work, input, casting="unsafe")
+        profiler = self.profiler
+        profiling = profiler is not None and profiler.enabled
+        for stage in self.stages:
+            if profiling:
+                start = profiler.begin()
+            result = stage.process(work, counter)
+            if result is not work:
+                np.copyto(work, result, casting="unsafe")
+            if profiling:
+                profiler.end("effect." + stage.name, start)
+        np.clip(work, -32768, 32767, out=work)
+        np.copyto(output, work, casting="unsafe")
+        return output
@@ -0,0 +1,66 @@
+# @package SoundEffectorCodec.py
+# @brief SoundEffectorの入出力変換(インターリーブPCM⇔チャンネル別float32)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import ctypes
+import numpy as np
+
+
+## PCM変換
+# @brief int16インターリーブのPCMとチャンネル別(planar)の配列を相互に変換します
+# @details 変換先は事前確保した配列・ctypesのバッファで、1CHUNKあたりのメモリ確保はありません。
+#          出力バッファはPyAudioのstream.writeがコピーなしで受け付けるctypesのchar配列です
+#          (bytearrayは受け付けられません)。
+#          decode/encodeが返す配列・バッファは次の呼び出しで上書きされます。
+#          値のスケールはint16のまま(±MAXLEVEL)です。
+class PCMCodec:
+    ## コンストラクタ
+    # @param chunk 1ブロックのフレーム数
+    # @param channels チャンネル数
+    def __init__(self, chunk, channels=2):
+        self.chunk = chunk
+        self.channels = channels
+        self.planar = np.zeros((channels, chunk), dtype="float32")
+        self.output = (ctypes.c_char * (2 * channels * chunk))()
+        self.interleaved = np.frombuffer(self.output, "int16").reshape(chunk, channels)
+
+    ## 複製・pickle用の状態
+    # @return state interleaved(outputのビュー)を除き、outputをbytesにした属性
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["interleaved"]
+        state["output"] = bytes(self.output)
+        return state
+
+    ## 複製・pickle用の状態復元
+    # @param state __getstate__の戻り値
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.output = (ctypes.c_char * len(state["output"])).from_buffer_copy(state["output"])
+        self.interleaved = np.frombuffer(self.output, "int16").reshape(
+            self.chunk, self.channels)
+
+    ## デコード
+    # @param data pyaudioの入力音信号(str型, int16インターリーブ)
+    # @return planar チャンネル別の入力音信号(float32型, チャンネル数×chunk)
+    def decode(self, data):
+        interleaved = np.frombuffer(data, "int16").reshape(self.chunk, self.channels)
+        np.copyto(self.planar, interleaved.T, casting="unsafe")
+        return self.planar
+
+    ## エンコード
+    # @brief モノラル(chunk)の場合は全チャンネルに同じ信号を書き込みます
+    # @param processed 出力音信号(int16型, チャンネル数×chunk または chunk)
+    # @return data pyaudioの出力音信号(ctypesのchar配列, int16インターリーブ)
+    def encode(self, processed):
+        if np.ndim(processed) == 1:
+            np.copyto(self.interleaved, processed[:, np.newaxis], casting="unsafe")
+        else:
+            np.copyto(self.interleaved.T, processed, casting="unsafe")
+        return self.output
@@ -1,11 +1,557 @@
 # @package SoundEffectorController.py
-# @brief SoundEffectorのController
+# @brief SoundEffectorのController(パラメータ・プリセット・オートメーション)
 # @author Nakashima
 # @date 2018/9/22
 # @version 0.0.1
 # @
 
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import json
+import math
+import numpy as np
 
+## プリセットに含めるパラメータ(モデルの属性名)
+PRESETKEYS = ("pre_booster_on", "pre_booster_amp",
+              "distortion_on", "distortion_thresh",
+              "distortion_curve", "distortion_oversample",
+              "post_booster_on", "post_booster_amp",
+              "phaser_on", "shift_phaser", "depth_phaser",
+              "rate_phaser", "stft_on",
+              "highpass_on", "highpass_cutoff",
+              "lowpass_on", "lowpass_cutoff",
+              "wah_on", "wah_position", "wah_rate",
+              "tone_on", "tone_bass", "tone_mid", "tone_treble",
+              "eq_on", "eq_gains",
+              "gate_on", "gate_thresh",
+              "compressor_on", "compressor_thresh", "compressor_ratio",
+              "compressor_makeup", "limiter_on", "limiter_thresh",
+              "chorus_on", "chorus_depth", "chorus_rate", "chorus_mix",
+              "flanger_on", "flanger_depth", "flanger_rate",
+              "flanger_feedback", "delay_on", "delay_time",
+              "delay_feedback", "delay_mix", "reverb_on", "reverb_decay",
+              "reverb_mix", "convolution_on", "convolution_mix")
+
+## 連続値パラメータの範囲と平滑化(sample: サンプルごと, block: ブロックごと, None: 即時)
+RANGES = {
+    "pre_booster_amp": (0.0, 20.0, "sample"),
+    "post_booster_amp": (0.0, 20.0, "sample"),
+    "distortion_thresh": (1.0, 100.0, "block"),
+    "shift_phaser": (0.0, 1.0, "block"),
+    "depth_phaser": (0.0, 1.0, "block"),
+    "rate_phaser": (0.0, 20.0, None),
+    "highpass_cutoff": (20.0, 2000.0, "block"),
+    "lowpass_cutoff": (500.0, 20000.0, "block"),
+    "wah_position": (0.0, 1.0, "block"),
+    "wah_rate": (0.0, 20.0, None),
+    "tone_bass": (-24.0, 24.0, "block"),
+    "tone_mid": (-24.0, 24.0, "block"),
+    "tone_treble": (-24.0, 24.0, "block"),
+    "eq_gains": (-24.0, 24.0, None),
+    "gate_thresh": (-100.0, 0.0, "block"),
+    "compressor_thresh": (-60.0, 0.0, "block"),
+    "compressor_ratio": (1.0, 20.0, "block"),
+    "compressor_makeup": (0.0, 24.0, "block"),
+    "limiter_thresh": (-24.0, 0.0, "block"),
+    "chorus_depth": (0.0, 10.0, "block"),
+    "chorus_rate": (0.0, 10.0, None),
+    "chorus_mix": (0.0, 1.0, "block"),
+    "flanger_depth": (0.0, 5.0, "block"),
+    "flanger_rate": (0.0, 5.0, None),
+    "flanger_feedback": (-0.95, 0.95, "block"),
+    "delay_time": (1.0, 2000.0, "block"),
+    "delay_feedback": (0.0, 0.95, "block"),
+    "delay_mix": (0.0, 1.0, "block"),
+    "reverb_decay": (0.1, 10.0, None),
+    "reverb_mix": (0.0, 1.0, "block"),
+    "convolution_mix": (0.0, 1.0, "block"),
+}
+
+## 選択肢のパラメータ
+CHOICES = {
+    "distortion_curve": ("hard", "soft", "tanh", "asymmetric"),
+    "distortion_oversample": (1, 2, 4, 8),
+}
+
+## 段階的に切り替えるパラメータの型(オートメーションで補間しません)
+STEPKINDS = ("bool", "int", "choice")
+
+
+""" ---------------------------------------------------------------------------
+    Parameter
+--------------------------------------------------------------------------- """
+## パラメータ
+# @brief 型・範囲・平滑化の種類を持つパラメータの定義です
+class Parameter:
+    ## コンストラクタ
+    # @param name パラメータ名(モデルの属性名)
+    # @param kind 型(bool/int/float/choice/list)
+    # @param default 既定値
+    # @param minimum 最小値
+    # @param maximum 最大値
+    # @param smoothing 平滑化の種類(sample/block/None)
+    # @param choices 選択肢(choiceのみ)
+    def __init__(self, name, kind, default, minimum=None, maximum=None, smoothing=None,
+                 choices=None):
+        self.name = name
+        self.kind = kind
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.smoothing = smoothing
+        self.choices = choices
+
+    ## 値の検証
+    # @brief 型を変換し範囲内に制限します
+    # @param value 値
+    # @return value 検証済みの値
+    def validate(self, value):
+        if self.kind == "bool":
+            return int(bool(value))
+        if self.kind == "choice":
+            if value not in self.choices:
+                raise ValueError("{} must be one of {}".format(self.name, self.choices))
+            return self.choices[self.choices.index(value)]
+        if self.kind == "list":
+            return [self.clamp(float(item)) for item in value]
+        if self.kind == "int":
+            return int(self.clamp(int(value)))
+        return self.clamp(float(value))
+
+    ## 範囲の制限
+    # @param value 値
+    # @return value 範囲内の値
+    def clamp(self, value):
+        if self.minimum is not None:
+            value = max(value, self.minimum)
+        if self.maximum is not None:
+            value = min(value, self.maximum)
+        return value
+
+    ## 段階的な値の検証
+    # @brief オートメーションの点の値を、数値は整数に丸めてから検証します
+    # @param value 値(数値または選択肢の文字列)
+    # @return value 検証済みの値
+    def step(self, value):
+        if isinstance(value, str):
+            return self.validate(str(value))
+        return self.validate(int(round(float(value))))
+
+
+## パラメータ表の作成
+# @brief PRESETKEYSとモデルの現在値から型付きのパラメータ表を作成します
+# @param model SoundEffectorModel
+# @return table パラメータ名→Parameterの辞書
+def parameterTable(model):
+    table = {}
+    for name in PRESETKEYS:
+        default = getattr(model, name)
+        if name.endswith("_on"):
+            table[name] = Parameter(name, "bool", int(default))
+        elif name in CHOICES:
+            table[name] = Parameter(name, "choice", default, choices=CHOICES[name])
+        elif isinstance(default, list):
+            minimum, maximum, _ = RANGES.get(name, (None, None, None))
+            table[name] = Parameter(name, "list", list(default), minimum, maximum)
+        elif name in RANGES:
+            minimum, maximum, smoothing = RANGES[name]
+            table[name] = Parameter(name, "float", float(default), minimum, maximum,
+                                    smoothing)
+        elif isinstance(default, int):
+            table[name] = Parameter(name, "int", default)
+        else:
+            table[name] = Parameter(name, "float", float(default))
+    return table
+
+
+## プリセットファイルの読み込み
+# @param path JSONファイルパス(Noneの場合は空のプリセット)
+# @return preset パラメータ名→値の辞書
+def readPreset(path):
+    if path is None:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+## プリセットの即時適用
+# @brief 全ての値を検証してから、平滑化せずにモデルへ反映します
+#        (パラメータシステムを使用しないオフライン処理用)
+# @param model SoundEffectorModel
+# @param preset パラメータ名→値の辞書
+# @param table パラメータ表(Noneの場合はモデルから作成)
+# @return values 検証済みの値の辞書
+def applyPreset(model, preset, table=None):
+    if table is None:
+        table = parameterTable(model)
+    values = {}
+    for name, value in preset.items():
+        if name not in table:
+            raise KeyError("unknown parameter: {}".format(name))
+        values[name] = table[name].validate(value)
+    for name, value in values.items():
+        setattr(model, name, value)
+    return values
+
+
+""" ---------------------------------------------------------------------------
+    Automation
+--------------------------------------------------------------------------- """
+## オートメーション
+# @brief パラメータごとの折れ線(時刻[s], 値)をサンプル単位で補間します
+# @details 連続値は、ノードがサンプルごとの値を受け付ける場合(EffectNode.CURVES)は
+#          サンプル単位で、それ以外はブロック先頭の値で反映します。
+#          有効/無効・整数・選択肢は補間せず、点の時刻のサンプルで切り替えます。
+class Automation:
+    ## コンストラクタ
+    # @param rate サンプリングレート
+    def __init__(self, rate=44100):
+        self.rate = rate
+        self.lanes = {}
+
+    ## 折れ線の追加
+    # @param name パラメータ名
+    # @param times 時刻[s]のリスト(昇順)
+    # @param values 値のリスト(選択肢の文字列も可)
+    def addLane(self, name, times, values):
+        values = np.asarray(values)
+        if values.dtype.kind in "biuf":
+            values = values.astype(float)
+        self.lanes[name] = (np.asarray(times, dtype=float) * self.rate, values)
+
+    ## 値の取得
+    # @param name パラメータ名
+    # @param position 先頭のサンプル番号
+    # @param length サンプル数
+    # @return values サンプルごとの値
+    def values(self, name, position, length):
+        times, values = self.lanes[name]
+        return np.interp(position + np.arange(length), times, values)
+
+    ## 切り替えの取得
+    # @brief 直前の点の値を保持し、点の時刻で切り替えます(補間しません)
+    # @param name パラメータ名
+    # @param position 先頭のサンプル番号
+    # @param length サンプル数
+    # @return steps (先頭からのサンプル数, 点の番号)のリスト(最初はブロック先頭の値)
+    def steps(self, name, position, length):
+        times = self.lanes[name][0]
+        first = max(int(np.searchsorted(times, position, "right")) - 1, 0)
+        last = int(np.searchsorted(times, position + length, "left"))
+        steps = [(0, first)]
+        for index in range(first + 1, last):
+            steps.append((int(math.ceil(times[index] - position)), index))
+        return steps
+
+    ## JSONからの読み込み
+    # @param path JSONファイルパス({パラメータ名: [[時刻, 値], ...]})
+    def load(self, path):
+        with open(path) as f:
+            lanes = json.load(f)
+        for name, points in lanes.items():
+            self.addLane(name, [point[0] for point in points], [point[1] for point in points])
+
+
+""" ---------------------------------------------------------------------------
+    Parameter System
+--------------------------------------------------------------------------- """
+## パラメータシステム
+# @brief GUIスレッドからの変更をスナップショットとして音声スレッドに受け渡し、
+#        ブロックの先頭で平滑化しながらモデルに反映します
+# @details set()は変更後の値の辞書を新しく作り、(版数, 辞書)のタプルを1回の代入で
+#          差し替えます。音声スレッドはブロックの先頭で参照を1回だけ読むため、
+#          ロックなしで常に一貫した値の組を受け取ります。
+#          ブースターの倍率はサンプルごとのランプ、連続値はブロックごとの1次平滑化で、
+#          どちらも全パラメータ分をまとめて計算します。
+class ParameterSystem:
+    ## コンストラクタ
+    # @param model SoundEffectorModel
+    # @param ramp_ms サンプルごとのランプ時間[ms]
+    # @param smooth_ms ブロックごとの平滑化の時定数[ms]
+    # @param fade_ms 有効/無効・選択肢の切り替えのクロスフェード時間[ms]
+    def __init__(self, model, ramp_ms=20.0, smooth_ms=30.0, fade_ms=20.0):
+        self.table = parameterTable(model)
+        self.rate = model.RATE
+        self.ramp_samples = max(1.0, ramp_ms * 1e-3 * model.RATE)
+        self.smooth_samples = max(1.0, smooth_ms * 1e-3 * model.RATE)
+        self.fade_samples = max(1, int(round(fade_ms * 1e-3 * model.RATE)))
+        self.snapshot = (0, {name: self.table[name].validate(getattr(model, name))
+                             for name in self.table})
+        self.applied = 0
+        self.automation = None
+        self.steps = {}
+        self.position = 0
+        """ ブロックごとの平滑化(structure of arrays) """
+        self.block_names = [name for name, parameter in self.table.items()
+                            if parameter.smoothing == "block"]
+        self.block_current = np.array([self.snapshot[1][name] for name in self.block_names])
+        self.block_target = self.block_current.copy()
+        self.block_epsilon = np.array([1e-4 * (self.table[name].maximum
+                                               - self.table[name].minimum)
+                                       for name in self.block_names])
+        """ サンプルごとのランプ """
+        self.sample_names = [name for name, parameter in self.table.items()
+                             if parameter.smoothing == "sample"]
+        self.sample_current = np.array([self.snapshot[1][name]
+                                        for name in self.sample_names])
+        self.sample_target = self.sample_current.copy()
+        self.sample_step = np.zeros(len(self.sample_names))
+
+    """ -----------------------------------------------------------------------
+        GUI thread
+    ----------------------------------------------------------------------- """
+    ## パラメータの設定
+    # @param name パラメータ名
+    # @param value 値
+    def set(self, name, value):
+        self.update({name: value})
+
+    ## 複数パラメータの設定
+    # @brief 全ての値を検証してから1回でスナップショットを差し替えます
+    # @param values パラメータ名→値の辞書
+    def update(self, values):
+        version, current = self.snapshot
+        changed = dict(current)
+        for name, value in values.items():
+            if name not in self.table:
+                raise KeyError("unknown parameter: {}".format(name))
+            changed[name] = self.table[name].validate(value)
+        self.snapshot = (version + 1, changed)
+
+    ## パラメータの取得
+    # @param name パラメータ名
+    # @return value 最新の設定値
+    def get(self, name):
+        return self.snapshot[1][name]
+
+    ## プリセットの取得
+    # @return preset パラメータ名→値の辞書
+    def getPreset(self):
+        return dict(self.snapshot[1])
+
+    ## プリセットの保存
+    # @param path JSONファイルパス
+    def savePreset(self, path):
+        with open(path, "w") as f:
+            json.dump(self.getPreset(), f, indent=2)
+
+    ## プリセットの読み込み
+    # @brief 値は平滑化しながら切り替わります
+    # @param path JSONファイルパス
+    def loadPreset(self, path):
+        self.update(readPreset(path))
+
+    ## プリセットの即時適用
+    # @brief 平滑化せずにモデルへ反映し、スナップショット・平滑化の状態も
+    #        その値に揃えます(処理の開始前に呼び出してください)
+    # @param model SoundEffectorModel
+    # @param preset パラメータ名→値の辞書
+    def applyPreset(self, model, preset):
+        values = applyPreset(model, preset, self.table)
+        version, current = self.snapshot
+        changed = dict(current)
+        changed.update(values)
+        self.snapshot = (version + 1, changed)
+        self.applied = version + 1
+        for index, name in enumerate(self.block_names):
+            self.block_current[index] = self.block_target[index] = changed[name]
+        for index, name in enumerate(self.sample_names):
+            self.sample_current[index] = self.sample_target[index] = changed[name]
+            self.sample_step[index] = 0.0
+
+    ## オートメーションの設定
+    # @brief 有効/無効・整数・選択肢の折れ線は、点の値をここで丸めて検証します
+    # @param automation Automation(Noneで解除)
+    def setAutomation(self, automation):
+        steps = {}
+        if automation is not None:
+            for name, (_, values) in automation.lanes.items():
+                if name not in self.table:
+                    raise KeyError("unknown parameter: {}".format(name))
+                parameter = self.table[name]
+                if parameter.kind in STEPKINDS:
+                    steps[name] = [parameter.step(value) for value in values]
+        self.steps = steps
+        self.automation = automation
+
+    """ -----------------------------------------------------------------------
+        Audio thread
+    ----------------------------------------------------------------------- """
+    ## ブロックの先頭の処理
+    # @param model SoundEffectorModel
+    # @param length ブロック長
+    def applyBlock(self, model, length):
+        version, values = self.snapshot
+        if version != self.applied:
+            self.applied = version
+            self.retarget(model, values)
+        automated = ()
+        if self.automation is not None:
+            automated = self.automation.lanes
+            self.automate(model, length)
+        self.smoothBlock(model, length, automated)
+        self.rampSamples(model, length, automated)
+        self.position += length
+
+    ## 目標値の更新
+    # @param model SoundEffectorModel
+    # @param values パラメータ名→値の辞書
+    def retarget(self, model, values):
+        for index, name in enumerate(self.block_names):
+            self.block_target[index] = values[name]
+        for index, name in enumerate(self.sample_names):
+            target = values[name]
+            if target != self.sample_target[index]:
+                self.sample_target[index] = target
+                self.sample_step[index] = ((target - self.sample_current[index])
+                                           / self.ramp_samples)
+        for name, value in values.items():
+            if self.table[name].smoothing is None and getattr(model, name) != value:
+                self.switch(model, name, value)
+
+    ## 平滑化しないパラメータの反映
+    # @brief 有効/無効・選択肢の切り替えは、対応するノードをクロスフェードさせて
+    #        から反映します(それ以外はそのまま反映します)
+    # @param model SoundEffectorModel
+    # @param name パラメータ名
+    # @param value 値
+    # @param offset ブロックの先頭から切り替えるまでのサンプル数
+    def switch(self, model, name, value, offset=0):
+        prop = getattr(type(model), name, None)
+        if (self.table[name].kind in ("bool", "choice") and hasattr(prop, "node")
+                and getattr(model, name) != value):
+            node = model.chain[prop.node]
+            if prop.attr == "enabled":
+                model.chain.crossfade(node, self.fade_samples, bool(value), offset)
+            else:
+                model.chain.crossfade(node, self.fade_samples, offset=offset)
+        setattr(model, name, value)
+
+    ## サンプルごとの値を受け付けるノード
+    # @param model SoundEffectorModel
+    # @param name パラメータ名
+    # @return node エフェクトノード(受け付けない場合None)
+    # @return attr ノードの属性名
+    def curveNode(self, model, name):
+        prop = getattr(type(model), name, None)
+        if not hasattr(prop, "node"):
+            return None, None
+        node = model.chain[prop.node]
+        if prop.attr not in node.CURVES:
+            return None, None
+        return node, prop.attr
+
+    ## オートメーションの反映
+    # @brief 有効/無効・整数・選択肢は点の時刻のサンプルで切り替え、連続値はノードが
+    #        受け付ける場合はサンプルごとの値、それ以外はブロック先頭の値で反映します
+    # @param model SoundEffectorModel
+    # @param length ブロック長
+    def automate(self, model, length):
+        automation = self.automation
+        for name in automation.lanes:
+            parameter = self.table[name]
+            if parameter.kind in STEPKINDS:
+                values = self.steps.get(name)
+                if values is None:
+                    continue
+                for offset, index in automation.steps(name, self.position, length):
+                    self.switch(model, name, values[index], offset)
+                continue
+            node, attr = self.curveNode(model, name)
+            if node is None or parameter.smoothing is None:
+                value = parameter.validate(automation.values(name, self.position, 1)[0])
+                if parameter.smoothing == "block":
+                    index = self.block_names.index(name)
+                    self.block_current[index] = self.block_target[index] = value
+                    setattr(model, name, value)
+                else:
+                    self.switch(model, name, value)
+                continue
+            curve = automation.values(name, self.position, length)
+            np.clip(curve, parameter.minimum, parameter.maximum, out=curve)
+            value = curve[-1].item()
+            if parameter.smoothing == "sample":
+                index = self.sample_names.index(name)
+                self.sample_current[index] = self.sample_target[index] = value
+                self.sample_step[index] = 0.0
+            else:
+                index = self.block_names.index(name)
+                self.block_current[index] = self.block_target[index] = value
+            setattr(model, name, value)
+            if node.enabled:
+                node.schedule(attr, curve)
+
+    ## ブロックごとの平滑化
+    # @brief 全パラメータ分の1次平滑化をまとめて計算し、変化したものだけ反映します
+    # @param model SoundEffectorModel
+    # @param length ブロック長
+    # @param automated オートメーション中のパラメータ名
+    def smoothBlock(self, model, length, automated):
+        difference = self.block_target - self.block_current
+        moving = np.abs(difference) > self.block_epsilon
+        if not moving.any():
+            if (difference != 0).any():
+                self.block_current[:] = self.block_target
+                for index in np.flatnonzero(difference):
+                    self.assign(model, self.block_names[index], automated)
+            return
+        alpha = 1 - math.exp(-length / self.smooth_samples)
+        self.block_current += alpha * difference
+        settled = ~moving
+        self.block_current[settled] = self.block_target[settled]
+        for index in np.flatnonzero(difference):
+            self.assign(model, self.block_names[index], automated)
+
+    ## 平滑化した値の反映
+    # @param model SoundEffectorModel
+    # @param name パラメータ名
+    # @param automated オートメーション中のパラメータ名
+    def assign(self, model, name, automated):
+        if name in automated:
+            return
+        index = self.block_names.index(name)
+        setattr(model, name, self.block_current[index].item())
+
+    ## サンプルごとのランプ
+    # @brief 目標値まで一定の傾きで変化するサンプルごとの倍率を作り、ノードに渡します
+    # @param model SoundEffectorModel
+    # @param length ブロック長
+    # @param automated オートメーション中のパラメータ名
+    def rampSamples(self, model, length, automated):
+        for index, name in enumerate(self.sample_names):
+            if name in automated:
+                continue
+            current = self.sample_current[index]
+            target = self.sample_target[index]
+            if current == target:
+                continue
+            node, attr = self.curveNode(model, name)
+            step = self.sample_step[index]
+            curve = current + step * np.arange(1, length + 1)
+            if step > 0:
+                np.minimum(curve, target, out=curve)
+            else:
+                np.maximum(curve, target, out=curve)
+            self.sample_current[index] = curve[-1]
+            setattr(model, name, curve[-1].item())
+            if node.enabled:
+                node.schedule(attr, curve)
+
+
+""" ---------------------------------------------------------------------------
+    Controller
+--------------------------------------------------------------------------- """
+## Controller
+# @brief パラメータシステムを作成し、Viewの操作をパラメータの変更として受け渡します
 class SoundEffectController:
-    def __init__(self, model, view):
-        pass
+    ## コンストラクタ
+    # @param model SoundEffectorModel
+    # @param view SoundEffectorView(Noneの場合は画面なし)
+    def __init__(self, model, view=None):
+        self.model = model
+        self.view = view
+        self.parameters = ParameterSystem(model)
+        model.parameters = self.parameters
+        if view is not None:
+            view.parameters = self.parameters
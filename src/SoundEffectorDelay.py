@@ -0,0 +1,492 @@
+# @package SoundEffectorDelay.py
+# @brief SoundEffectorの時間系エフェクト(ディレイ・コーラス・フランジャー・リバーブ)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import math
+import numpy as np
+import SoundEffectorCache
+import SoundEffectorIO
+from SoundEffectorChain import EffectNode, scipySignal, segment
+from SoundEffectorPhaser import FFT_OUT
+
+
+""" ---------------------------------------------------------------------------
+    Delay Line
+--------------------------------------------------------------------------- """
+## 遅延線
+# @brief 事前確保した循環バッファです。読み出しは小数の遅延量(サンプルごと)を
+#        線形補間でまとめて行います
+# @details 保存領域は最終軸が時間軸で、先頭の軸はチャンネル(入力の形)です。
+class DelayLine:
+    ## コンストラクタ
+    # @param capacity 容量(最大遅延量+ブロック長以上)
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.storage = None
+        self.index = 0
+
+    ## 保存領域の確保
+    # @param shape 保存領域の先頭の軸の形
+    def allocate(self, shape):
+        shape = tuple(shape) + (self.capacity,)
+        if self.storage is None or self.storage.shape != shape:
+            self.storage = np.zeros(shape)
+            self.index = 0
+
+    ## 状態の初期化
+    def clear(self):
+        if self.storage is not None:
+            self.storage[...] = 0
+        self.index = 0
+
+    ## 読み出し
+    # @brief 次に書き込むn点それぞれについて、delaysだけ前の値を読み出します
+    # @param delays 遅延量[サンプル](n点の配列, 1以上)
+    # @return output 遅延した信号(先頭の軸の形×n)
+    def read(self, delays):
+        position = self.index + np.arange(np.shape(delays)[-1]) - delays
+        floor = np.floor(position)
+        frac = position - floor
+        first = np.mod(floor.astype("int64"), self.capacity)
+        second = first + 1
+        second[second == self.capacity] = 0
+        before = self.storage[..., first]
+        return before + frac * (self.storage[..., second] - before)
+
+    ## 整数遅延の読み出し
+    # @param delay 遅延量[サンプル](整数, n以上)
+    # @param n 読み出すサンプル数
+    # @return output 遅延した信号(先頭の軸の形×n)
+    def readInteger(self, delay, n):
+        start = (self.index - delay) % self.capacity
+        if start + n <= self.capacity:
+            return self.storage[..., start:start + n]
+        return np.concatenate((self.storage[..., start:],
+                               self.storage[..., :start + n - self.capacity]), axis=-1)
+
+    ## 書き込み
+    # @param data 入力(先頭の軸の形×n)
+    def write(self, data):
+        n = np.shape(data)[-1]
+        end = self.index + n
+        if end <= self.capacity:
+            self.storage[..., self.index:end] = data
+        else:
+            first = self.capacity - self.index
+            self.storage[..., self.index:] = data[..., :first]
+            self.storage[..., :end - self.capacity] = data[..., first:]
+        self.index = end % self.capacity
+
+
+""" ---------------------------------------------------------------------------
+    Modulated Delay
+--------------------------------------------------------------------------- """
+## 変調ディレイ
+# @brief ディレイ・コーラス・フランジャーに共通の、LFOで遅延量を動かすフィードバック
+#        ディレイです
+# @details 遅延量は絶対サンプル番号から求めるため、ブロックの長さによらず同じ結果に
+#          なります。フィードバックのため、1回の処理長は最小遅延量以下に分割します。
+#          フィードバック量・ウェット音の割合はサンプルごと(n)・チャンネルごと
+#          (チャンネル数×1)の配列も受け付けます。
+class ModulatedDelay:
+    ## コンストラクタ
+    # @param chunk 処理単位(CHUNK)
+    # @param rate サンプリングレート
+    # @param max_delay_ms 最大遅延量[ms]
+    def __init__(self, chunk=1024, rate=44100, max_delay_ms=2000.0):
+        self.chunk = chunk
+        self.rate = rate
+        self.max_delay = int(math.ceil(max_delay_ms * 1e-3 * rate))
+        self.line = DelayLine(self.max_delay + chunk + 2)
+        self.configure(300.0)
+
+    ## パラメータ設定
+    # @param delay_ms 遅延量の中心[ms]
+    # @param depth_ms 遅延量の変調幅[ms]
+    # @param lfo_rate LFOの周波数[Hz]
+    # @param feedback フィードバック量(-1～1, サンプル・チャンネルごとの配列も可)
+    # @param mix ウェット音の割合(0～1, サンプル・チャンネルごとの配列も可)
+    def configure(self, delay_ms, depth_ms=0.0, lfo_rate=0.0, feedback=0.0, mix=0.5):
+        center = delay_ms * 1e-3 * self.rate
+        depth = min(depth_ms * 1e-3 * self.rate, center - 1.0)
+        self.center = min(max(center, 1.0), self.max_delay - max(depth, 0.0))
+        self.depth = max(depth, 0.0)
+        self.omega = 2 * math.pi * lfo_rate / self.rate
+        self.feedback = feedback
+        self.mix = mix
+        minimum = int(self.center - self.depth)
+        self.step = max(1, min(self.chunk, minimum))
+
+    ## 状態の初期化
+    def reset(self):
+        self.line.clear()
+
+    ## 1回分の処理(長さは最小遅延量以下)
+    # @param input 入力音信号
+    # @param time 先頭の絶対サンプル番号
+    # @param feedback フィードバック量(定数または区間の配列)
+    # @param mix ウェット音の割合(定数または区間の配列)
+    # @return output 出力音信号
+    def processStep(self, input, time, feedback, mix):
+        n = np.shape(input)[-1]
+        if self.depth > 0:
+            delays = self.center + self.depth * np.sin(self.omega * (time + np.arange(n)))
+        else:
+            delays = np.full(n, self.center)
+        delayed = self.line.read(delays)
+        if np.ndim(feedback) or feedback:
+            self.line.write(input + feedback * delayed)
+        else:
+            self.line.write(input)
+        return input + mix * (delayed - input)
+
+    ## エフェクト処理
+    # @param input 入力音信号(最終軸が時間軸)
+    # @param counter 先頭ブロックのブロック番号
+    # @return output 出力音信号
+    def process(self, input, counter):
+        self.line.allocate(np.shape(input)[:-1])
+        length = np.shape(input)[-1]
+        output = np.empty(np.shape(input))
+        time = counter * self.chunk
+        for block in range(0, length, self.chunk):
+            end = min(block + self.chunk, length)
+            for start in range(block, end, self.step):
+                stop = min(start + self.step, end)
+                output[..., start:stop] = self.processStep(
+                    input[..., start:stop], time + start,
+                    segment(self.feedback, start, stop), segment(self.mix, start, stop))
+        return output
+
+
+""" ---------------------------------------------------------------------------
+    FDN Reverb
+--------------------------------------------------------------------------- """
+## FDNリバーブ
+# @brief 8本の遅延線をアダマール行列で結合したフィードバック・ディレイ・ネットワークです
+# @details 全遅延線の読み出し・結合・書き込みをまとめて行います。
+class FDNReverb:
+    ## 遅延線の長さ(44.1kHz基準)
+    LENGTHS = (1116, 1188, 1277, 1356, 1422, 1491, 1557, 1617)
+
+    ## コンストラクタ
+    # @param chunk 処理単位(CHUNK)
+    # @param rate サンプリングレート
+    def __init__(self, chunk=1024, rate=44100):
+        self.chunk = chunk
+        self.rate = rate
+        self.lengths = np.array([int(length * rate / 44100) for length in self.LENGTHS])
+        self.step = min(chunk, int(self.lengths.min()))
+        count = self.lengths.shape[0]
+        hadamard = np.array([[1.0]])
+        while hadamard.shape[0] < count:
+            hadamard = np.block([[hadamard, hadamard], [hadamard, -hadamard]])
+        self.matrix = hadamard / math.sqrt(count)
+        self.storage = None
+        self.index = 0
+        self.capacity = int(self.lengths.max()) + chunk
+        self.damping_zi = None
+        self.params = None
+        self.configure(2.0)
+
+    ## パラメータ設定
+    # @param decay_sec 残響時間(RT60)[s]
+    # @param damping 高域の減衰(0～1)
+    # @param mix ウェット音の割合(0～1, サンプル・チャンネルごとの配列も可)
+    def configure(self, decay_sec, damping=0.3, mix=0.3):
+        self.mix = mix
+        params = (decay_sec, damping)
+        if params == self.params:
+            return
+        self.gains = 10 ** (-3 * self.lengths / (max(decay_sec, 1e-3) * self.rate))
+        self.damping_b = np.array([1 - damping])
+        self.damping_a = np.array([1.0, -damping])
+        self.params = params
+
+    ## 状態の初期化
+    def reset(self):
+        self.storage = None
+        self.damping_zi = None
+
+    ## 1回分の処理(長さは最短の遅延線以下)
+    # @param input 入力音信号(チャンネル×n)
+    # @return wet 残響音(チャンネル×n)
+    def processStep(self, input):
+        signal = scipySignal()
+        n = input.shape[-1]
+        count = self.lengths.shape[0]
+        offsets = np.arange(n)
+        read = np.mod(self.index - self.lengths[:, np.newaxis] + offsets, self.capacity)
+        outputs = self.storage[:, np.arange(count)[:, np.newaxis], read]
+        outputs, self.damping_zi = signal.lfilter(self.damping_b, self.damping_a,
+                                                  outputs, axis=-1, zi=self.damping_zi)
+        outputs *= self.gains[:, np.newaxis]
+        feedback = np.matmul(self.matrix, outputs)
+        feedback += input[:, np.newaxis, :]
+        write = np.mod(self.index + offsets, self.capacity)
+        self.storage[:, :, write] = feedback
+        self.index = (self.index + n) % self.capacity
+        return outputs.sum(axis=1) / math.sqrt(count)
+
+    ## エフェクト処理
+    # @param input 入力音信号(最終軸が時間軸)
+    # @return output 出力音信号
+    def process(self, input):
+        shape = np.shape(input)
+        flat = np.reshape(input, (-1, shape[-1]))
+        count = self.lengths.shape[0]
+        if self.storage is None or self.storage.shape[0] != flat.shape[0]:
+            self.storage = np.zeros((flat.shape[0], count, self.capacity))
+            self.damping_zi = np.zeros((flat.shape[0], count, 1))
+            self.index = 0
+        output = np.empty(flat.shape)
+        for block in range(0, shape[-1], self.chunk):
+            end = min(block + self.chunk, shape[-1])
+            for start in range(block, end, self.step):
+                stop = min(start + self.step, end)
+                dry = flat[:, start:stop]
+                wet = self.processStep(dry)
+                output[:, start:stop] = dry + segment(self.mix, start, stop) * (wet - dry)
+        return output.reshape(shape)
+
+
+""" ---------------------------------------------------------------------------
+    Convolution Reverb
+--------------------------------------------------------------------------- """
+## インパルス応答の作成
+# @brief 指数減衰するノイズで残響のインパルス応答を作成します
+# @param decay_sec 残響時間(RT60)[s]
+# @param rate サンプリングレート
+# @param seed 乱数の種
+# @return impulse インパルス応答
+def makeImpulse(decay_sec=2.0, rate=44100, seed=0):
+    length = int(decay_sec * rate)
+    envelope = 10 ** (-3 * np.arange(length) / (decay_sec * rate))
+    impulse = np.random.RandomState(seed).randn(length) * envelope
+    return impulse / np.sqrt(np.sum(impulse ** 2))
+
+
+## 既定のインパルス応答
+# @brief makeImpulseの結果をキャッシュから取得します
+# @param decay_sec 残響時間(RT60)[s]
+# @param rate サンプリングレート
+# @return impulse インパルス応答(読み取り専用)
+def defaultImpulse(decay_sec=2.0, rate=44100):
+    return SoundEffectorCache.table("impulse", makeImpulse, float(decay_sec), int(rate), 0)
+
+
+## インパルス応答の読み込み
+# @brief WAV・CSV・raw PCMを読み込み、必要ならサンプリングレートを変換します
+# @param path ファイルパス
+# @param rate サンプリングレート
+# @return impulse インパルス応答(1チャンネル目, エネルギーで正規化)
+def loadImpulse(path, rate=44100):
+    signal = scipySignal()
+    data, file_rate, channels = SoundEffectorIO.readSignal(path, rate)
+    impulse = np.reshape(data, (-1, channels))[:, 0] / 32768.0
+    if file_rate != rate:
+        divisor = math.gcd(int(rate), int(file_rate))
+        impulse = signal.resample_poly(impulse, rate // divisor, file_rate // divisor)
+    return impulse / max(np.sqrt(np.sum(impulse ** 2)), 1e-12)
+
+
+## 畳み込みリバーブ
+# @brief 均一分割のオーバーラップ・セーブ法(周波数領域遅延線)でインパルス応答を
+#        畳み込みます
+# @details 分割長はCHUNKで、1CHUNKあたりFFT・逆FFTを1回ずつ行い、分割数分の
+#          スペクトルの積和をまとめて計算します。遅延はありません。
+class ConvolutionReverb:
+    ## コンストラクタ
+    # @param chunk 分割長(CHUNK)
+    # @param impulse インパルス応答
+    def __init__(self, chunk=1024, impulse=None):
+        self.chunk = chunk
+        self.mix = 0.3
+        self.setImpulse(defaultImpulse() if impulse is None else impulse)
+
+    ## インパルス応答の設定
+    # @param impulse インパルス応答
+    def setImpulse(self, impulse):
+        chunk = self.chunk
+        count = max(1, -(-len(impulse) // chunk))
+        padded = np.zeros(count * chunk)
+        padded[:len(impulse)] = impulse
+        parts = np.zeros((count, 2 * chunk))
+        parts[:, :chunk] = padded.reshape(count, chunk)
+        """ 古い順の入力スペクトルに掛けるため逆順に並べます """
+        self.filters = np.fft.rfft(parts, axis=-1)[::-1].copy()
+        self.count = count
+        self.reset()
+
+    ## 状態の初期化
+    def reset(self):
+        self.history = None
+        self.index = 0
+
+    ## 1CHUNK分の処理
+    # @param input 入力音信号(チャンネル×chunk)
+    # @return wet 残響音(チャンネル×chunk)
+    def processBlock(self, input):
+        chunk = self.chunk
+        count = self.count
+        window = self.window
+        window[:, :chunk] = window[:, chunk:]
+        window[:, chunk:] = input
+        if FFT_OUT:
+            np.fft.rfft(window, axis=-1, out=self.spectrum)
+        else:
+            self.spectrum[:] = np.fft.rfft(window, axis=-1)
+        """ 周波数領域遅延線(ミラー領域で常に連続したビューを参照) """
+        self.history[self.index] = self.spectrum
+        self.history[self.index + count] = self.spectrum
+        self.index = (self.index + 1) % count
+        recent = self.history[self.index:self.index + count]
+        np.einsum("pck,pk->ck", recent, self.filters, out=self.accumulated)
+        if FFT_OUT:
+            np.fft.irfft(self.accumulated, 2 * chunk, axis=-1, out=self.output)
+        else:
+            self.output[:] = np.fft.irfft(self.accumulated, 2 * chunk, axis=-1)
+        return self.output[:, chunk:]
+
+    ## エフェクト処理
+    # @param input 入力音信号(最終軸が時間軸, CHUNKの倍数)
+    # @return output 出力音信号
+    def process(self, input):
+        shape = np.shape(input)
+        flat = np.reshape(input, (-1, shape[-1]))
+        channels = flat.shape[0]
+        bins = self.chunk + 1
+        if self.history is None or self.history.shape[1] != channels:
+            self.history = np.zeros((2 * self.count, channels, bins), dtype=complex)
+            self.window = np.zeros((channels, 2 * self.chunk))
+            self.spectrum = np.zeros((channels, bins), dtype=complex)
+            self.accumulated = np.zeros((channels, bins), dtype=complex)
+            self.output = np.zeros((channels, 2 * self.chunk))
+            self.index = 0
+        output = np.empty(flat.shape)
+        for start in range(0, shape[-1], self.chunk):
+            dry = flat[:, start:start + self.chunk]
+            wet = self.processBlock(dry)
+            mix = segment(self.mix, start, start + self.chunk)
+            output[:, start:start + self.chunk] = dry + mix * (wet - dry)
+        return output.reshape(shape)
+
+
+""" ---------------------------------------------------------------------------
+    Effect Node
+--------------------------------------------------------------------------- """
+## ディレイ・コーラス・フランジャーのノード
+class ModulatedDelayNode(EffectNode):
+    CURVES = ("feedback", "mix")
+    CHANNELWISE = ("feedback", "mix")
+
+    ## 既定値(遅延量[ms], 変調幅[ms], LFO[Hz], フィードバック, ウェット)
+    PRESETS = {"delay": (350.0, 0.0, 0.0, 0.4, 0.35),
+               "chorus": (20.0, 5.0, 0.8, 0.0, 0.5),
+               "flanger": (3.0, 2.0, 0.25, 0.6, 0.5)}
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param chunk 処理単位(CHUNK)
+    # @param rate サンプリングレート
+    # @param kind 既定値の種類(delay/chorus/flanger)
+    # @param enabled 有効/無効
+    def __init__(self, name, chunk=1024, rate=44100, kind="delay", enabled=True):
+        super(ModulatedDelayNode, self).__init__(name, enabled)
+        (self.time, self.depth, self.lfo_rate, self.feedback,
+         self.mix) = self.PRESETS[kind]
+        self.engine = ModulatedDelay(chunk, rate)
+
+    def reset(self):
+        self.engine.reset()
+
+    def memory(self):
+        return None
+
+    def process(self, buffer, counter):
+        length = np.shape(buffer)[-1]
+        self.engine.configure(self.time, self.depth, self.lfo_rate,
+                              self.takeCurve("feedback", length), self.takeCurve("mix", length))
+        return self.engine.process(buffer, counter)
+
+
+## FDNリバーブのノード
+class ReverbNode(EffectNode):
+    CURVES = ("mix",)
+    CHANNELWISE = ("mix",)
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param chunk 処理単位(CHUNK)
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, chunk=1024, rate=44100, enabled=True):
+        super(ReverbNode, self).__init__(name, enabled)
+        self.decay = 2.0
+        self.damping = 0.3
+        self.mix = 0.3
+        self.engine = FDNReverb(chunk, rate)
+
+    def reset(self):
+        self.engine.reset()
+
+    def memory(self):
+        return None
+
+    def process(self, buffer, counter):
+        self.engine.configure(self.decay, self.damping,
+                              self.takeCurve("mix", np.shape(buffer)[-1]))
+        return self.engine.process(buffer)
+
+
+## 畳み込みリバーブのノード
+# @brief インパルス応答の分割・FFTは最初に使用するときに行います
+class ConvolutionNode(EffectNode):
+    CURVES = ("mix",)
+    CHANNELWISE = ("mix",)
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param chunk 分割長(CHUNK)
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, chunk=1024, rate=44100, enabled=True):
+        super(ConvolutionNode, self).__init__(name, enabled)
+        self.chunk = chunk
+        self.rate = rate
+        self.mix = 0.3
+        self._engine = None
+
+    ## 畳み込みリバーブ
+    # @return engine ConvolutionReverb(初回に既定のインパルス応答で作成)
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = ConvolutionReverb(self.chunk, defaultImpulse(2.0, self.rate))
+        return self._engine
+
+    ## インパルス応答ファイルの読み込み
+    # @param path ファイルパス(WAV/CSV/raw PCM)
+    def load(self, path):
+        impulse = loadImpulse(path, self.rate)
+        if self._engine is None:
+            self._engine = ConvolutionReverb(self.chunk, impulse)
+        else:
+            self._engine.setImpulse(impulse)
+
+    def reset(self):
+        if self._engine is not None:
+            self._engine.reset()
+
+    def memory(self):
+        return self.engine.count * self.chunk
+
+    def process(self, buffer, counter):
+        self.engine.mix = self.takeCurve("mix", np.shape(buffer)[-1])
+        return self.engine.process(buffer)
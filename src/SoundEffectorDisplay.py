@@ -0,0 +1,219 @@
+# @package SoundEffectorDisplay.py
+# @brief SoundEffectorの表示用データの間引き(波形・スペクトラム・スペクトログラム・ケプストラム)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import math
+import time
+import numpy as np
+import SoundEffectorRingBuffer
+
+
+""" ---------------------------------------------------------------------------
+    Waveform
+--------------------------------------------------------------------------- """
+## 波形の間引き
+# @brief 画面の幅(ピクセル数)ごとの区間の最小値・最大値を交互に並べて描画点数を
+#        抑えます(ピークは失われません)
+class WaveformDecimator:
+    ## コンストラクタ
+    # @param size 信号長
+    # @param width 画面の幅[ピクセル]
+    def __init__(self, size, width=1024):
+        self.size = size
+        self.resize(width)
+
+    ## 画面の幅の変更
+    # @param width 画面の幅[ピクセル]
+    def resize(self, width):
+        self.width = max(1, int(width))
+        self.bucket = max(1, self.size // self.width)
+        self.count = self.size // self.bucket
+        self.x = np.repeat(np.arange(self.count) * self.bucket + self.bucket / 2, 2)
+        self.y = np.zeros(2 * self.count)
+
+    ## 間引き
+    # @param data 信号(size点)
+    # @param width 画面の幅[ピクセル](Noneの場合は変更なし)
+    # @return x 横軸(サンプル番号)
+    # @return y 区間ごとの最小値・最大値
+    def decimate(self, data, width=None):
+        if width is not None and int(width) != self.width:
+            self.resize(width)
+        if self.bucket == 1:
+            return np.arange(len(data)), data
+        blocks = np.reshape(data[len(data) - self.count * self.bucket:],
+                            (self.count, self.bucket))
+        np.min(blocks, axis=1, out=self.y[0::2])
+        np.max(blocks, axis=1, out=self.y[1::2])
+        return self.x, self.y
+
+
+""" ---------------------------------------------------------------------------
+    Spectrum
+--------------------------------------------------------------------------- """
+## 対数周波数スペクトラム
+# @brief パワースペクトルを対数間隔の帯域にまとめ、dB値を時間方向に平滑化します
+# @details ビンを含まない低域の帯域はビンの値を補間します。
+class LogSpectrum:
+    ## コンストラクタ
+    # @param freq 各ビンの周波数[Hz]
+    # @param fmin 最小周波数[Hz]
+    # @param fmax 最大周波数[Hz]
+    # @param bands 帯域数
+    # @param smoothing 平滑化係数(0で平滑化なし, 1に近いほど遅く追従)
+    def __init__(self, freq, fmin=20.0, fmax=5000.0, bands=200, smoothing=0.5):
+        self.freq = np.asarray(freq)
+        self.smoothing = smoothing
+        edges = np.geomspace(fmin, fmax, bands + 1)
+        self.centers = np.sqrt(edges[:-1] * edges[1:])
+        index = np.searchsorted(edges, self.freq, side="right") - 1
+        self.inside = (index >= 0) & (index < bands)
+        self.index = index[self.inside]
+        self.counts = np.bincount(self.index, minlength=bands)
+        self.empty = self.counts == 0
+        self.counts[self.empty] = 1
+        self.level = None
+
+    ## 更新
+    # @param power パワースペクトル
+    # @return centers 帯域の中心周波数[Hz]
+    # @return level 平滑化したレベル[dB]
+    def update(self, power):
+        values = np.bincount(self.index, weights=power[self.inside],
+                             minlength=self.centers.shape[0])
+        values /= self.counts
+        if self.empty.any():
+            values[self.empty] = np.interp(self.centers[self.empty], self.freq, power)
+        level = 10 * np.log10(values + 1e-12)
+        if self.level is None or self.smoothing <= 0:
+            self.level = level
+        else:
+            self.level *= self.smoothing
+            self.level += (1 - self.smoothing) * level
+        return self.centers, self.level
+
+
+""" ---------------------------------------------------------------------------
+    Spectrogram
+--------------------------------------------------------------------------- """
+## カラーマップ
+# @brief 黒→紫→赤→黄→白の参照テーブルを作成します
+# @param size 階調数
+# @return lut 参照テーブル(size×3, uint8型)
+def makeColormap(size=256):
+    anchors = np.array([[0, 0, 0], [80, 20, 120], [200, 40, 60], [250, 180, 40],
+                        [255, 255, 255]], dtype=float)
+    position = np.linspace(0, len(anchors) - 1, size)
+    lut = np.stack([np.interp(position, np.arange(len(anchors)), anchors[:, channel])
+                    for channel in range(3)], axis=-1)
+    return np.array(np.round(lut), dtype="uint8")
+
+
+## スペクトログラム
+# @brief 対数周波数の帯域ごとのレベルをuint8に量子化し、固定容量の2次元リングバッファ
+#        (時間×帯域)に1列ずつ書き込みます
+# @details 解析器のpower購読のコールバックとして表示側のスレッドで更新するため、
+#          音声処理のスレッドには影響しません。image()は古い順に並んだ連続ビューで、
+#          ImageItemにそのまま渡せます。
+class Spectrogram:
+    ## コンストラクタ
+    # @param freq 各ビンの周波数[Hz]
+    # @param analysis_rate 解析頻度[Hz]
+    # @param history_sec 保持する時間[s]
+    # @param bands 帯域数
+    # @param fmin 最小周波数[Hz]
+    # @param fmax 最大周波数[Hz]
+    # @param floor_db 表示の下限[dB]
+    # @param range_db 表示の範囲[dB]
+    def __init__(self, freq, analysis_rate=30.0, history_sec=30.0, bands=256,
+                 fmin=20.0, fmax=20000.0, floor_db=40.0, range_db=120.0):
+        self.columns = LogSpectrum(freq, fmin, min(fmax, freq[-1]), bands, smoothing=0)
+        self.frames = int(math.ceil(history_sec * analysis_rate))
+        self.history = SoundEffectorRingBuffer.RingBuffer(self.frames, "uint8", (bands,))
+        self.column = np.zeros(bands)
+        self.pixels = np.zeros(bands, dtype="uint8")
+        self.scale = 255 / range_db
+        self.floor_db = floor_db
+        self.lut = makeColormap()
+        self.count = 0
+
+    ## 1列の書き込み
+    # @param power パワースペクトル
+    def update(self, power):
+        level = self.columns.update(power)[1]
+        np.subtract(level, self.floor_db, out=self.column)
+        self.column *= self.scale
+        np.clip(self.column, 0, 255, out=self.column)
+        np.copyto(self.pixels, self.column, casting="unsafe")
+        self.history.pushFrame(self.pixels)
+        self.count += 1
+
+    ## 画像
+    # @return image 時間×帯域の画像(uint8型, 古い順の連続ビュー)
+    def image(self):
+        return self.history.latest()
+
+    ## 縦軸の目盛り
+    # @return centers 帯域の中心周波数[Hz]
+    def bandFrequency(self):
+        return self.columns.centers
+
+
+""" ---------------------------------------------------------------------------
+    Cepstrum
+--------------------------------------------------------------------------- """
+## ケプストラムの表示範囲
+# @brief ケフレンシー軸[ms]と表示範囲のケプストラムを切り出します
+class CepstrumRange:
+    ## コンストラクタ
+    # @param quefrency ケフレンシー[s]
+    # @param qmin 最小ケフレンシー[s]
+    # @param qmax 最大ケフレンシー[s]
+    def __init__(self, quefrency, qmin=0.001, qmax=0.02):
+        quefrency = np.asarray(quefrency)
+        self.start = int(np.searchsorted(quefrency, qmin))
+        self.stop = int(np.searchsorted(quefrency, qmax, side="right"))
+        self.x = quefrency[self.start:self.stop] * 1000
+
+    ## 切り出し
+    # @param cepstrum ケプストラム
+    # @return x ケフレンシー[ms]
+    # @return y ケプストラム(ビュー)
+    def select(self, cepstrum):
+        return self.x, cepstrum[self.start:self.stop]
+
+
+""" ---------------------------------------------------------------------------
+    Frame Limiter
+--------------------------------------------------------------------------- """
+## 描画頻度の制限
+# @brief 音声処理の周期とは独立に、描画を最大max_fps[Hz]に制限します
+class FrameLimiter:
+    ## 間隔の判定の許容誤差[s](時刻の丸め誤差で1フレーム分遅れないようにします)
+    TOLERANCE = 1e-6
+
+    ## コンストラクタ
+    # @param max_fps 最大描画頻度[Hz]
+    def __init__(self, max_fps=30.0):
+        self.max_fps = max_fps
+        self.last = None
+        self.skipped = 0
+
+    ## 描画判定
+    # @param now 現在時刻[s](Noneの場合は単調増加クロック)
+    # @return ready 描画してよい場合True
+    def ready(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        if (self.last is not None
+                and now - self.last < 1.0 / self.max_fps - self.TOLERANCE):
+            self.skipped += 1
+            return False
+        self.last = now
+        return True
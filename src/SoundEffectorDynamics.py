@@ -0,0 +1,212 @@
+# @package SoundEffectorDynamics.py
+# @brief SoundEffectorのダイナミクス系エフェクト(ノイズゲート・コンプレッサー・リミッター)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import math
+import numpy as np
+from SoundEffectorChain import EffectNode, scipySignal
+
+## 動作の種類
+MODES = ("gate", "compressor", "limiter")
+
+
+## ダイナミクス処理
+# @brief 時間領域のエンベロープ検出でゲイン(減衰量)を求めます
+# @details ピーク検出(瞬時アタック・指数リリース)は対数領域の累積最大値で、
+#          減衰量のアタックは1次のIIRフィルタでベクトル化しています。
+#          状態はブロック間で保持し、CHUNKごとに処理するためブロックの長さによらず
+#          同じ結果になります。linkedの場合は全チャンネル共通のゲインで、そうでない
+#          場合はチャンネルごとに検出し、パラメータにチャンネル数の配列も指定できます。
+class Dynamics:
+    ## エンベロープの下限(振幅)
+    FLOOR = 1e-3
+
+    ## コンストラクタ
+    # @param chunk 処理単位(CHUNK)
+    # @param rate サンプリングレート
+    # @param mode 動作の種類(gate/compressor/limiter)
+    # @param maxlevel 0dBに対応する振幅
+    # @param linked Trueの場合全チャンネル共通のゲイン
+    def __init__(self, chunk=1024, rate=44100, mode="compressor", maxlevel=32768.0,
+                 linked=True):
+        self.chunk = chunk
+        self.rate = rate
+        self.mode = mode
+        self.maxlevel = maxlevel
+        self.linked = linked
+        self.params = None
+        self.gain_reduction_db = 0.0
+        self.reduction_db = np.zeros(1)
+        self.reset()
+
+    ## 状態の初期化
+    def reset(self):
+        self.envelope = None
+        self.smooth_zi = None
+        self.delay = None
+
+    ## パラメータ設定
+    # @brief 値が変わったときだけ係数を計算し直します
+    # @param threshold_db 閾値[dBFS](linkedでない場合はチャンネル数の配列も可)
+    # @param ratio 比率(リミッターでは無視します, 配列も可)
+    # @param attack_ms アタック時間[ms]
+    # @param release_ms リリース時間[ms]
+    # @param lookahead_ms 先読み時間[ms]
+    # @param range_db ゲートの最大減衰量[dB]
+    # @param makeup_db メイクアップゲイン[dB](配列も可)
+    def configure(self, threshold_db, ratio=4.0, attack_ms=5.0, release_ms=100.0,
+                  lookahead_ms=0.0, range_db=80.0, makeup_db=0.0):
+        params = tuple(tuple(np.ravel(value).tolist()) if np.ndim(value) else value
+                       for value in (threshold_db, ratio, attack_ms, release_ms,
+                                     lookahead_ms, range_db, makeup_db))
+        if params == self.params:
+            return
+        if self.mode not in MODES:
+            raise ValueError("unknown mode: {}".format(self.mode))
+        self.threshold_db = self.perChannel(threshold_db)
+        self.ratio = self.perChannel(ratio)
+        self.range_db = range_db
+        self.makeup = 10 ** (self.perChannel(makeup_db) / 20)
+        """ リリース: 1サンプルあたりの減衰(自然対数) """
+        decay = -1.0 / max(release_ms * 1e-3 * self.rate, 1.0)
+        self.ramp = -decay * np.arange(self.chunk)
+        self.decay = decay
+        """ アタック: 1次IIRフィルタ """
+        pole = math.exp(-1.0 / max(attack_ms * 1e-3 * self.rate, 1e-9))
+        self.attack_b = np.array([1 - pole])
+        self.attack_a = np.array([1.0, -pole])
+        lookahead = int(round(lookahead_ms * 1e-3 * self.rate))
+        if self.params is None or lookahead != self.lookahead:
+            self.delay = None
+        self.lookahead = lookahead
+        self.params = params
+
+    ## チャンネルごとのパラメータ
+    # @param value スカラーまたはチャンネル数の配列
+    # @return value 時間軸に対してブロードキャストできる値
+    def perChannel(self, value):
+        if np.ndim(value) == 0:
+            return float(value)
+        return np.asarray(value, dtype=float)[..., np.newaxis]
+
+    ## 減衰量の計算
+    # @param level_db 入力レベル[dBFS]
+    # @return reduction 減衰量[dB](0以上)
+    def reduction(self, level_db):
+        over = level_db - self.threshold_db
+        if self.mode == "gate":
+            return np.clip(-over * (self.ratio - 1), 0, self.range_db)
+        if self.mode == "limiter":
+            return np.maximum(over, 0)
+        return np.maximum(over, 0) * (1 - 1 / self.ratio)
+
+    ## 1CHUNK分の処理
+    # @param input 入力音信号(最終軸が時間軸, CHUNK以下)
+    # @return output 出力音信号
+    def processBlock(self, input):
+        signal = scipySignal()
+        n = np.shape(input)[-1]
+        level = np.abs(input)
+        if self.linked and level.ndim > 1:
+            level = level.reshape(-1, n).max(axis=0)
+        state = level.shape[:-1] + (1,)
+        if self.envelope is None or self.envelope.shape != state:
+            self.envelope = np.full(state, math.log(self.FLOOR))
+            self.smooth_zi = np.zeros(state)
+        """ ピーク検出(対数領域の累積最大値) """
+        ramp = self.ramp[:n]
+        envelope = np.log(np.maximum(level, self.FLOOR))
+        envelope += ramp
+        np.maximum.accumulate(envelope, axis=-1, out=envelope)
+        np.maximum(envelope, self.envelope + self.decay, out=envelope)
+        envelope -= ramp
+        self.envelope = envelope[..., -1:].copy()
+        level_db = envelope * (20 / math.log(10)) - 20 * math.log10(self.maxlevel)
+        """ 減衰量のアタック """
+        reduction, self.smooth_zi = signal.lfilter(
+            self.attack_b, self.attack_a, self.reduction(level_db), axis=-1,
+            zi=self.smooth_zi)
+        self.reduction_db = np.max(reduction, axis=-1)
+        self.gain_reduction_db = float(np.max(self.reduction_db))
+        gain = np.power(10.0, reduction / -20)
+        gain *= self.makeup
+        """ 先読み(遅延線) """
+        if self.lookahead > 0:
+            shape = np.shape(input)[:-1] + (self.lookahead,)
+            if self.delay is None or self.delay.shape != shape:
+                self.delay = np.zeros(shape)
+            extended = np.concatenate((self.delay, input), axis=-1)
+            self.delay = extended[..., n:]
+            input = extended[..., :n]
+        return input * gain
+
+    ## エフェクト処理
+    # @param input 入力音信号(最終軸が時間軸)
+    # @return output 出力音信号
+    def process(self, input):
+        length = np.shape(input)[-1]
+        if length <= self.chunk:
+            return self.processBlock(input)
+        output = np.empty(np.shape(input))
+        for start in range(0, length, self.chunk):
+            output[..., start:start + self.chunk] = self.processBlock(
+                input[..., start:start + self.chunk])
+        return output
+
+
+## ダイナミクスのノード
+# @brief gain_reduction_dbに直近のブロックの最大減衰量[dB]を保持します(メーター用)
+class DynamicsNode(EffectNode):
+    CHANNELWISE = ("threshold", "ratio", "makeup")
+
+    ## 既定値(閾値[dBFS], 比率, アタック[ms], リリース[ms], 先読み[ms])
+    DEFAULTS = {"gate": (-50.0, 10.0, 1.0, 100.0, 0.0),
+                "compressor": (-20.0, 4.0, 5.0, 100.0, 0.0),
+                "limiter": (-1.0, 1.0, 0.5, 50.0, 1.5)}
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param chunk 処理単位(CHUNK)
+    # @param rate サンプリングレート
+    # @param mode 動作の種類(gate/compressor/limiter)
+    # @param maxlevel 0dBに対応する振幅
+    # @param linked Trueの場合全チャンネル共通、Falseの場合チャンネルごとに検出します
+    # @param enabled 有効/無効
+    def __init__(self, name, chunk=1024, rate=44100, mode="compressor",
+                 maxlevel=32768.0, linked=True, enabled=True):
+        super(DynamicsNode, self).__init__(name, enabled)
+        (self.threshold, self.ratio, self.attack, self.release,
+         self.lookahead) = self.DEFAULTS[mode]
+        self.range = 80.0
+        self.makeup = 0.0
+        self.engine = Dynamics(chunk, rate, mode, maxlevel, linked)
+
+    ## 減衰量[dB]
+    @property
+    def gain_reduction_db(self):
+        return self.engine.gain_reduction_db
+
+    ## パラメータの反映
+    # @return engine ダイナミクス処理
+    def configure(self):
+        self.engine.configure(self.threshold, self.ratio, self.attack, self.release,
+                              self.lookahead, self.range, self.makeup)
+        return self.engine
+
+    def latency(self):
+        return int(round(self.lookahead * 1e-3 * self.engine.rate))
+
+    def reset(self):
+        self.engine.reset()
+
+    def memory(self):
+        return None
+
+    def process(self, buffer, counter):
+        return self.configure().process(buffer)
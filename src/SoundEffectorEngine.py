@@ -0,0 +1,318 @@
+# @package SoundEffectorEngine.py
+# @brief SoundEffectorのオーディオエンジン(専用スレッドでエフェクト処理を行います)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import threading
+import time
+import numpy as np
+
+
+## ブロック用リングバッファ
+# @brief 固定長ブロックを受け渡す単一生産者・単一消費者のリングバッファです
+# @details 生産者は_writeのみ、消費者は_readのみを更新するためロック不要です。
+#          満杯の場合は新しいブロックを破棄し、dropped_countを増やします。
+class BlockRingBuffer:
+    ## コンストラクタ
+    # @param capacity 格納できるブロック数
+    # @param block_size 1ブロックのサンプル数
+    # @param dtype データ型
+    def __init__(self, capacity, block_size, dtype="int16"):
+        self.capacity = capacity
+        self.block_size = block_size
+        self.buffer = np.zeros((capacity, block_size), dtype=dtype)
+        self.dropped_count = 0
+        self._write = 0
+        self._read = 0
+
+    ## 格納済みブロック数
+    # @return count ブロック数
+    def __len__(self):
+        return self._write - self._read
+
+    ## ブロックの追加(生産者側)
+    # @param block 入力ブロック
+    # @return pushed 追加できた場合True
+    def push(self, block):
+        write = self._write
+        if write - self._read >= self.capacity:
+            self.dropped_count += 1
+            return False
+        self.buffer[write % self.capacity] = block
+        self._write = write + 1
+        return True
+
+    ## 全ブロックの取り出し(消費者側)
+    # @return blocks 取り出したブロック(ブロック数×block_size)
+    def popAll(self):
+        read = self._read
+        write = self._write
+        index = np.arange(read, write) % self.capacity
+        blocks = self.buffer[index]
+        self._read = write
+        return blocks
+
+
+## エンジン統計
+# @brief ブロックごとの処理時間・書き込み待ち時間とドロップアウト、
+#        チェーンのアルゴリズム遅延を記録します
+# @details 処理時間(process・encode)と書き込み待ち時間(出力バッファが空くまでの待ち)
+#          は別々に記録します。xrunは処理時間からは推定せず、入出力が報告した
+#          入力オーバーフロー・出力アンダーフローの数を数えます。
+#          処理時間が再生時間を超えたブロックはlate_countに数えます。
+class EngineStats:
+    ## コンストラクタ
+    # @param history 処理時間を保持するブロック数
+    def __init__(self, history=256):
+        self.latencies = np.zeros(history)
+        self.waits = np.zeros(history)
+        self.block_count = 0
+        self.xrun_count = 0
+        self.late_count = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.last_wait = 0.0
+        self.chain_latency = 0
+
+    ## 処理時間の記録
+    # @param latency 1ブロックの処理時間(書き込み待ちを含まない)[s]
+    # @param wait 1ブロックの書き込み待ち時間[s]
+    # @param period 1ブロックの再生時間[s]
+    # @param xruns このブロックで入出力が報告したオーバーフロー・アンダーフローの数
+    def record(self, latency, wait, period, xruns=0):
+        index = self.block_count % self.latencies.shape[0]
+        self.latencies[index] = latency
+        self.waits[index] = wait
+        self.block_count += 1
+        self.last_latency = latency
+        self.last_wait = wait
+        if latency > self.max_latency:
+            self.max_latency = latency
+        if latency > period:
+            self.late_count += 1
+        self.xrun_count += xruns
+
+    ## 平均処理時間
+    # @return latency 直近historyブロックの平均処理時間[s]
+    def meanLatency(self):
+        count = min(self.block_count, self.latencies.shape[0])
+        if count == 0:
+            return 0.0
+        return float(np.mean(self.latencies[:count]))
+
+    ## 平均書き込み待ち時間
+    # @return wait 直近historyブロックの平均書き込み待ち時間[s]
+    def meanWait(self):
+        count = min(self.block_count, self.waits.shape[0])
+        if count == 0:
+            return 0.0
+        return float(np.mean(self.waits[:count]))
+
+    ## アルゴリズム遅延の記録
+    # @param samples 有効なエフェクトの遅延の合計[サンプル]
+    def recordChainLatency(self, samples):
+        self.chain_latency = samples
+
+    ## アルゴリズム遅延
+    # @param rate サンプリングレート
+    # @return latency 有効なエフェクトの遅延の合計[ms]
+    def chainLatencyMs(self, rate):
+        return 1e3 * self.chain_latency / rate
+
+
+""" ---------------------------------------------------------------------------
+    I/O Backend
+--------------------------------------------------------------------------- """
+## PyAudio入出力
+# @brief 音声デバイスとの入出力を行います
+class PyAudioBackend:
+    ## コンストラクタ
+    # @param rate サンプリングレート
+    # @param channels チャンネル数
+    def __init__(self, rate=44100, channels=2):
+        import pyaudio
+        self.rate = rate
+        self.channels = channels
+        self.overflow_count = 0
+        self.underflow_count = 0
+        self.p = pyaudio.PyAudio()
+        self.stream = self.p.open(format=pyaudio.paInt16,
+                                  channels=channels,
+                                  rate=rate,
+                                  input=True,
+                                  output=True)
+
+    ## 読み込み
+    # @param frames フレーム数
+    # @return data 入力音信号(str型)
+    def read(self, frames):
+        try:
+            return self.stream.read(frames)
+        except IOError:
+            self.overflow_count += 1
+            return bytes(2 * self.channels * frames)
+
+    ## 書き込み
+    # @details PCMCodecの出力バッファ(ctypesのchar配列)とbytesはそのまま渡します。
+    #          PyAudioが受け付けないbytearray・memoryviewの場合のみbytesに変換します。
+    #          出力アンダーフローは書き込み完了後に例外で報告されるため、数えるだけです
+    # @param data 出力音信号(bytes型・ctypesのchar配列またはbytearray)
+    def write(self, data):
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        try:
+            self.stream.write(data, exception_on_underflow=True)
+        except IOError:
+            self.underflow_count += 1
+
+    ## 終了処理
+    # @brief 音声入出力用インスタンスを削除します
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.p.terminate()
+
+
+## メモリ上の疑似ストリーム
+# @brief 音声デバイスの代わりにメモリ上の信号を入出力します(テスト・オフライン用)
+class FakeStreamBackend:
+    ## コンストラクタ
+    # @param data 入力音信号(int16型, チャンネルインターリーブ)
+    # @param rate サンプリングレート
+    # @param channels チャンネル数
+    # @param realtime Trueの場合ブロックの再生時間だけ待機します
+    # @param loop Trueの場合入力を繰り返します
+    def __init__(self, data, rate=44100, channels=2, realtime=False, loop=False):
+        self.data = np.asarray(data, dtype="int16").tobytes()
+        self.rate = rate
+        self.channels = channels
+        self.realtime = realtime
+        self.loop = loop
+        self.overflow_count = 0
+        self.underflow_count = 0
+        self.position = 0
+        self.written = []
+
+    ## 読み込み
+    # @param frames フレーム数
+    # @return data 入力音信号(str型)、入力が尽きた場合None
+    def read(self, frames):
+        size = 2 * self.channels * frames
+        if self.position >= len(self.data):
+            if not self.loop:
+                return None
+            self.position = 0
+        data = self.data[self.position:self.position + size]
+        self.position += size
+        if self.realtime:
+            time.sleep(frames / self.rate)
+        return data + bytes(size - len(data))
+
+    ## 書き込み
+    # @param data 出力音信号(bytes型・ctypesのchar配列またはbytearray)
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    ## 出力音信号の取得
+    # @return output 書き込まれた出力音信号(int16型)
+    def output(self):
+        return np.frombuffer(b"".join(self.written), "int16")
+
+    ## 終了処理
+    def close(self):
+        pass
+
+
+""" ---------------------------------------------------------------------------
+    Engine
+--------------------------------------------------------------------------- """
+## オーディオエンジン
+# @brief 専用スレッドで読み込み・エフェクト・書き込みを行い、処理済みブロックを
+#        リングバッファ経由で表示側に渡します
+class SoundEffectorEngine:
+    ## コンストラクタ
+    # @param model SoundEffectorModel
+    # @param backend 入出力(read/write/closeを持つもの)
+    # @param queue_size 表示側に渡すブロックの最大数
+    def __init__(self, model, backend, queue_size=32):
+        self.model = model
+        self.backend = backend
+        self.queue = BlockRingBuffer(queue_size, model.CHUNK)
+        self.stats = EngineStats()
+        self.period = model.CHUNK / model.RATE
+        self._xruns = 0
+        self._running = threading.Event()
+        self._thread = None
+
+    ## 開始
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    ## 停止
+    # @brief スレッドの終了を待ち、入出力を閉じます
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.close()
+
+    ## 終了待ち
+    # @brief 入力が尽きてスレッドが終了するまで待ちます(入出力は閉じません)
+    # @param timeout 最大待ち時間[s](Noneの場合無制限)
+    def join(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    ## 動作中判定
+    # @return running 動作中の場合True
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    ## 1ブロック処理
+    # @return processed 処理を行った場合True、入力が尽きた場合False
+    def step(self):
+        profiler = self.model.profiler
+        read_start = profiler.begin()
+        input_data = self.backend.read(self.model.CHUNK)
+        profiler.end("read", read_start)
+        if input_data is None:
+            return False
+        start = time.perf_counter()
+        processed_data = self.model.process(input_data)
+        output_data = self.model.encode(processed_data)
+        """ 処理時間と書き込み待ち時間を分けて計測 """
+        write_start = time.perf_counter()
+        profiled_start = profiler.begin()
+        self.backend.write(output_data)
+        profiler.end("write", profiled_start)
+        write_end = time.perf_counter()
+        xruns = self.backend.overflow_count + self.backend.underflow_count
+        self.stats.record(write_start - start, write_end - write_start, self.period,
+                          xruns - self._xruns)
+        self._xruns = xruns
+        self.stats.recordChainLatency(self.model.chain.latency())
+        self.queue.push(self.model.monitor(processed_data))
+        return True
+
+    ## スレッド本体
+    def run(self):
+        while self._running.is_set():
+            if not self.step():
+                break
+        self._running.clear()
+
+    ## ドロップアウト数
+    # @return count 入力オーバーフロー・出力アンダーフロー・キュー溢れの合計
+    def dropoutCount(self):
+        return self.stats.xrun_count + self.queue.dropped_count
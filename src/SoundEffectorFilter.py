@@ -0,0 +1,263 @@
+# @package SoundEffectorFilter.py
+# @brief SoundEffectorのフィルタ系エフェクト(2次セクション・状態保持付き)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import math
+import numpy as np
+from SoundEffectorChain import EffectNode, scipySignal
+
+
+""" ---------------------------------------------------------------------------
+    Design
+--------------------------------------------------------------------------- """
+## 2次セクション(biquad)の設計
+# @brief RBJ Audio EQ Cookbookの式で係数を求めます。引数は配列でも構いません
+# @param kind 種類(peaking/lowshelf/highshelf/bandpass/lowpass/highpass)
+# @param freq 中心・カットオフ周波数[Hz]
+# @param q Q値
+# @param gain_db ゲイン[dB](peaking/lowshelf/highshelfのみ)
+# @param rate サンプリングレート
+# @return sos 2次セクション(セクション数×6)
+def biquad(kind, freq, q=0.7071, gain_db=0.0, rate=44100):
+    freq, q, gain_db = np.broadcast_arrays(np.atleast_1d(np.asarray(freq, dtype=float)),
+                                           np.asarray(q, dtype=float),
+                                           np.asarray(gain_db, dtype=float))
+    w0 = 2 * np.pi * np.clip(freq, 1.0, 0.49 * rate) / rate
+    cos = np.cos(w0)
+    alpha = np.sin(w0) / (2 * q)
+    a = 10 ** (gain_db / 40)
+    if kind == "peaking":
+        b = (1 + alpha * a, -2 * cos, 1 - alpha * a)
+        den = (1 + alpha / a, -2 * cos, 1 - alpha / a)
+    elif kind == "lowshelf":
+        root = 2 * np.sqrt(a) * alpha
+        b = (a * ((a + 1) - (a - 1) * cos + root),
+             2 * a * ((a - 1) - (a + 1) * cos),
+             a * ((a + 1) - (a - 1) * cos - root))
+        den = ((a + 1) + (a - 1) * cos + root,
+               -2 * ((a - 1) + (a + 1) * cos),
+               (a + 1) + (a - 1) * cos - root)
+    elif kind == "highshelf":
+        root = 2 * np.sqrt(a) * alpha
+        b = (a * ((a + 1) + (a - 1) * cos + root),
+             -2 * a * ((a - 1) + (a + 1) * cos),
+             a * ((a + 1) + (a - 1) * cos - root))
+        den = ((a + 1) - (a - 1) * cos + root,
+               2 * ((a - 1) - (a + 1) * cos),
+               (a + 1) - (a - 1) * cos - root)
+    elif kind == "bandpass":
+        b = (alpha, np.zeros_like(alpha), -alpha)
+        den = (1 + alpha, -2 * cos, 1 - alpha)
+    elif kind == "lowpass":
+        b = ((1 - cos) / 2, 1 - cos, (1 - cos) / 2)
+        den = (1 + alpha, -2 * cos, 1 - alpha)
+    elif kind == "highpass":
+        b = ((1 + cos) / 2, -(1 + cos), (1 + cos) / 2)
+        den = (1 + alpha, -2 * cos, 1 - alpha)
+    else:
+        raise ValueError("unknown filter kind: {}".format(kind))
+    sos = np.stack(b + den, axis=-1)
+    return sos / sos[:, 3:4]
+
+
+## バターワース特性のQ値
+# @param order 次数(偶数)
+# @return q 各2次セクションのQ値
+def butterworthQ(order):
+    k = np.arange(order // 2)
+    return 1 / (2 * np.cos((2 * k + 1) * np.pi / (2 * order)))
+
+
+""" ---------------------------------------------------------------------------
+    Filter Node
+--------------------------------------------------------------------------- """
+## フィルタノード
+# @brief 2次セクションの縦続接続をsosfiltで1回に処理し、状態(zi)をブロック間で保持します
+# @details 係数はparams()の値が変わったときだけ設計し直します。
+class FilterNode(EffectNode):
+    ## コンストラクタ
+    # @param name ノード名
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, rate=44100, enabled=True):
+        super(FilterNode, self).__init__(name, enabled)
+        self.rate = rate
+        self.sos = None
+        self.designed = None
+        self.zi = None
+
+    ## 係数を決めるパラメータ
+    # @return params パラメータのタプル
+    def params(self):
+        return ()
+
+    ## 係数の設計
+    # @return sos 2次セクション(セクション数×6)
+    def design(self):
+        return np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]])
+
+    ## 係数の取得
+    # @return sos 2次セクション(パラメータが変わった場合のみ再設計)
+    def coefficients(self):
+        params = self.params()
+        if params != self.designed:
+            self.sos = self.design()
+            self.designed = params
+        return self.sos
+
+    ## 状態の初期化
+    def reset(self):
+        self.zi = None
+
+    def memory(self):
+        return None
+
+    ## フィルタ処理
+    # @param buffer 入力音信号(最終軸が時間軸)
+    # @param sos 2次セクション
+    # @return output 出力音信号
+    def filter(self, buffer, sos):
+        signal = scipySignal()
+        shape = (sos.shape[0],) + np.shape(buffer)[:-1] + (2,)
+        if self.zi is None or self.zi.shape != shape:
+            self.zi = np.zeros(shape)
+        output, self.zi = signal.sosfilt(sos, buffer, axis=-1, zi=self.zi)
+        return output
+
+    def process(self, buffer, counter):
+        return self.filter(buffer, self.coefficients())
+
+
+## イコライザ
+# @brief ピーキングフィルタのバンドを1つの縦続接続として処理します
+class EQNode(FilterNode):
+    ## 既定の中心周波数[Hz]
+    FREQS = (63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param freqs 中心周波数[Hz]のリスト
+    # @param q Q値
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, freqs=FREQS, q=1.4, rate=44100, enabled=True):
+        super(EQNode, self).__init__(name, rate, enabled)
+        self.freqs = list(freqs)
+        self.q = q
+        self.gains = [0.0] * len(self.freqs)
+
+    def params(self):
+        return (tuple(self.freqs), self.q, tuple(self.gains))
+
+    def design(self):
+        return biquad("peaking", self.freqs, self.q, self.gains, self.rate)
+
+
+## ローパス・ハイパスフィルタ
+# @brief バターワース特性の2次セクションの縦続接続です
+class PassNode(FilterNode):
+    ## コンストラクタ
+    # @param name ノード名
+    # @param kind lowpass/highpass
+    # @param cutoff カットオフ周波数[Hz]
+    # @param order 次数(偶数)
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, kind="lowpass", cutoff=5000.0, order=2, rate=44100,
+                 enabled=True):
+        super(PassNode, self).__init__(name, rate, enabled)
+        self.kind = kind
+        self.cutoff = cutoff
+        self.order = order
+
+    def params(self):
+        return (self.kind, self.cutoff, self.order)
+
+    def design(self):
+        return biquad(self.kind, self.cutoff, butterworthQ(self.order), 0.0, self.rate)
+
+
+## トーンスタック
+# @brief 低域シェルフ・中域ピーキング・高域シェルフの3バンドです
+class ToneStackNode(FilterNode):
+    ## コンストラクタ
+    # @param name ノード名
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, rate=44100, enabled=True):
+        super(ToneStackNode, self).__init__(name, rate, enabled)
+        self.bass = 0.0
+        self.mid = 0.0
+        self.treble = 0.0
+        self.freqs = (100.0, 800.0, 3200.0)
+
+    def params(self):
+        return (self.bass, self.mid, self.treble)
+
+    def design(self):
+        return np.concatenate([
+            biquad("lowshelf", self.freqs[0], 0.7071, self.bass, self.rate),
+            biquad("peaking", self.freqs[1], 0.7, self.mid, self.rate),
+            biquad("highshelf", self.freqs[2], 0.7071, self.treble, self.rate)])
+
+
+## ワウ
+# @brief 中心周波数を動かすバンドパスフィルタです
+# @details positionはペダル位置(0～1)で、lfo_rateが0より大きい場合はLFOで動かします。
+#          係数はCHUNKごとに更新し、位置を量子化した係数表をキャッシュします。
+class WahNode(FilterNode):
+    ## ペダル位置の量子化段数
+    STEPS = 256
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param chunk 係数を更新する間隔(CHUNK)
+    # @param rate サンプリングレート
+    # @param enabled 有効/無効
+    def __init__(self, name, chunk=1024, rate=44100, enabled=True):
+        super(WahNode, self).__init__(name, rate, enabled)
+        self.chunk = chunk
+        self.position = 0.5
+        self.lfo_rate = 0.0
+        self.low = 400.0
+        self.high = 2200.0
+        self.q = 4.0
+
+    def params(self):
+        return (self.low, self.high, self.q)
+
+    ## 係数表の設計
+    # @return sos ペダル位置ごとの2次セクション(STEPS×6)
+    def design(self):
+        position = np.linspace(0, 1, self.STEPS)
+        freq = self.low * (self.high / self.low) ** position
+        return biquad("bandpass", freq, self.q, 0.0, self.rate)
+
+    ## ペダル位置の段番号
+    # @param counter ブロック番号
+    # @return index 係数表の行番号
+    def step(self, counter):
+        position = self.position
+        if self.lfo_rate > 0:
+            phase = 2 * math.pi * self.lfo_rate * counter * self.chunk / self.rate
+            position = (math.sin(phase) + 1) / 2
+        return int(round(min(max(position, 0.0), 1.0) * (self.STEPS - 1)))
+
+    def process(self, buffer, counter):
+        table = self.coefficients()
+        length = np.shape(buffer)[-1]
+        if length == self.chunk:
+            index = self.step(counter)
+            return self.filter(buffer, table[index:index + 1])
+        output = np.empty(np.shape(buffer))
+        for block, start in enumerate(range(0, length, self.chunk)):
+            index = self.step(counter + block)
+            output[..., start:start + self.chunk] = self.filter(
+                buffer[..., start:start + self.chunk], table[index:index + 1])
+        return output
@@ -0,0 +1,110 @@
+# @package SoundEffectorIO.py
+# @brief SoundEffectorの音声ファイル入出力(WAV・CSV・raw PCM)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import os
+import wave
+import numpy as np
+
+
+## 音声ファイルの読み込み
+# @brief WAV(16bit)・CSV・raw PCM(int16)を読み込みます
+# @param path ファイルパス
+# @param rate サンプリングレート(CSV・raw PCMの場合)
+# @param channels チャンネル数(CSV・raw PCMの場合)
+# @return data 音信号(int16型, チャンネルインターリーブ)
+# @return rate サンプリングレート
+# @return channels チャンネル数
+def readSignal(path, rate=44100, channels=1):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".wav":
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("only 16bit WAV is supported: {}".format(path))
+            rate = wav.getframerate()
+            channels = wav.getnchannels()
+            data = np.frombuffer(wav.readframes(wav.getnframes()), "int16")
+    elif ext == ".csv":
+        data = np.loadtxt(path, delimiter=",", ndmin=1).ravel()
+        data = np.array(np.clip(data, -32768, 32767), dtype="int16")
+    else:
+        data = np.fromfile(path, dtype="int16")
+    return data, rate, channels
+
+
+## 音声ファイルの情報
+# @brief 信号を読み込まずにフレーム数・サンプリングレート・チャンネル数を求めます
+#        (CSVは全体を読み込みます)
+# @param path ファイルパス
+# @param rate サンプリングレート(CSV・raw PCMの場合)
+# @param channels チャンネル数(CSV・raw PCMの場合)
+# @return frames フレーム数
+# @return rate サンプリングレート
+# @return channels チャンネル数
+def signalInfo(path, rate=44100, channels=1):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".wav":
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes(), wav.getframerate(), wav.getnchannels()
+    if ext == ".csv":
+        data, rate, channels = readSignal(path, rate, channels)
+        return len(data) // channels, rate, channels
+    return os.path.getsize(path) // (2 * channels), rate, channels
+
+
+## 音声ファイルの部分読み込み
+# @brief フレーム[start, stop)だけを読み込みます(WAV・raw PCMは該当部分のみ読み込みます)
+# @param path ファイルパス
+# @param start 先頭フレーム
+# @param stop 末尾フレーム(含まない)
+# @param rate サンプリングレート(CSV・raw PCMの場合)
+# @param channels チャンネル数(CSV・raw PCMの場合)
+# @return data 音信号(int16型, チャンネルインターリーブ)
+# @return rate サンプリングレート
+# @return channels チャンネル数
+def readRange(path, start, stop, rate=44100, channels=1):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".wav":
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("only 16bit WAV is supported: {}".format(path))
+            rate = wav.getframerate()
+            channels = wav.getnchannels()
+            start = min(start, wav.getnframes())
+            wav.setpos(start)
+            data = np.frombuffer(wav.readframes(max(stop - start, 0)), "int16")
+    elif ext == ".csv":
+        data, rate, channels = readSignal(path, rate, channels)
+        data = data[start * channels:stop * channels]
+    else:
+        count = max(stop - start, 0) * channels
+        data = np.fromfile(path, dtype="int16", count=count,
+                           offset=2 * start * channels)
+    return data, rate, channels
+
+
+## 音声ファイルの書き込み
+# @brief 拡張子に応じてWAV(16bit)・CSV・raw PCM(int16)で書き込みます
+# @param path ファイルパス
+# @param data 音信号(int16型, チャンネルインターリーブ)
+# @param rate サンプリングレート
+# @param channels チャンネル数
+def writeSignal(path, data, rate=44100, channels=1):
+    ext = os.path.splitext(path)[1].lower()
+    data = np.asarray(data, dtype="int16")
+    if ext == ".wav":
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(data.tobytes())
+    elif ext == ".csv":
+        np.savetxt(path, data.reshape(1, -1), fmt="%d", delimiter=",")
+    else:
+        data.tofile(path)
@@ -9,71 +9,198 @@
 # -*- coding:utf-8 -*-
 # @endcond
 import numpy as np
-from scipy import signal
-import pyaudio
+import SoundEffectorAnalyzer
+import SoundEffectorChain
+import SoundEffectorCodec
+import SoundEffectorDelay
+import SoundEffectorDynamics
+import SoundEffectorFilter
+import SoundEffectorPhaser
+import SoundEffectorProfiler
+import SoundEffectorRingBuffer
+import SoundEffectorWaveshaper
 # import wave
 # from time import sleep
 
 
+## エフェクトノードのパラメータ用プロパティ
+# @brief 対応するノード名・属性名を保持するプロパティです
+class NodeProperty(property):
+    ## コンストラクタ
+    # @param fget 取得関数
+    # @param fset 設定関数
+    # @param node ノード名
+    # @param attr ノードの属性名
+    def __init__(self, fget, fset, node, attr):
+        super().__init__(fget, fset)
+        self.node = node
+        self.attr = attr
+
+
+## エフェクトノードのパラメータ用プロパティの作成
+# @brief モデルの属性(pre_booster_on等)をエフェクトチェーンのノードの属性に対応付けます
+# @param node ノード名
+# @param attr ノードの属性名
+# @return prop プロパティ
+def nodeProperty(node, attr):
+    if attr == "enabled":
+        return NodeProperty(lambda self: int(self.chain[node].enabled),
+                            lambda self, value: setattr(self.chain[node], attr, bool(value)),
+                            node, attr)
+    return NodeProperty(lambda self: getattr(self.chain[node], attr),
+                        lambda self, value: setattr(self.chain[node], attr, value),
+                        node, attr)
+
+
 ## Model
 # @brief 信号処理用クラス
 class SoundEffectorModel:
+    """ エフェクト用変数(エフェクトチェーンのノードに対応) """
+    pre_booster_on = nodeProperty("pre_booster", "enabled")
+    pre_booster_amp = nodeProperty("pre_booster", "amp")
+    distortion_on = nodeProperty("distortion", "enabled")
+    distortion_thresh = nodeProperty("distortion", "thresh")
+    distortion_curve = nodeProperty("distortion", "curve")
+    distortion_oversample = nodeProperty("distortion", "oversample")
+    post_booster_on = nodeProperty("post_booster", "enabled")
+    post_booster_amp = nodeProperty("post_booster", "amp")
+    phaser_on = nodeProperty("phaser", "enabled")
+    stft_on = nodeProperty("phaser", "stft_on")
+    shift_phaser = nodeProperty("phaser", "shift")
+    depth_phaser = nodeProperty("phaser", "depth")
+    rate_phaser = nodeProperty("phaser", "lfo_rate")
+    highpass_on = nodeProperty("highpass", "enabled")
+    highpass_cutoff = nodeProperty("highpass", "cutoff")
+    lowpass_on = nodeProperty("lowpass", "enabled")
+    lowpass_cutoff = nodeProperty("lowpass", "cutoff")
+    wah_on = nodeProperty("wah", "enabled")
+    wah_position = nodeProperty("wah", "position")
+    wah_rate = nodeProperty("wah", "lfo_rate")
+    tone_on = nodeProperty("tone", "enabled")
+    tone_bass = nodeProperty("tone", "bass")
+    tone_mid = nodeProperty("tone", "mid")
+    tone_treble = nodeProperty("tone", "treble")
+    eq_on = nodeProperty("eq", "enabled")
+    eq_gains = nodeProperty("eq", "gains")
+    gate_on = nodeProperty("gate", "enabled")
+    gate_thresh = nodeProperty("gate", "threshold")
+    compressor_on = nodeProperty("compressor", "enabled")
+    compressor_thresh = nodeProperty("compressor", "threshold")
+    compressor_ratio = nodeProperty("compressor", "ratio")
+    compressor_makeup = nodeProperty("compressor", "makeup")
+    limiter_on = nodeProperty("limiter", "enabled")
+    limiter_thresh = nodeProperty("limiter", "threshold")
+    chorus_on = nodeProperty("chorus", "enabled")
+    chorus_depth = nodeProperty("chorus", "depth")
+    chorus_rate = nodeProperty("chorus", "lfo_rate")
+    chorus_mix = nodeProperty("chorus", "mix")
+    flanger_on = nodeProperty("flanger", "enabled")
+    flanger_depth = nodeProperty("flanger", "depth")
+    flanger_rate = nodeProperty("flanger", "lfo_rate")
+    flanger_feedback = nodeProperty("flanger", "feedback")
+    delay_on = nodeProperty("delay", "enabled")
+    delay_time = nodeProperty("delay", "time")
+    delay_feedback = nodeProperty("delay", "feedback")
+    delay_mix = nodeProperty("delay", "mix")
+    reverb_on = nodeProperty("reverb", "enabled")
+    reverb_decay = nodeProperty("reverb", "decay")
+    reverb_mix = nodeProperty("reverb", "mix")
+    convolution_on = nodeProperty("convolution", "enabled")
+    convolution_mix = nodeProperty("convolution", "mix")
+
     ## コンストラクタ
-    # @brief メンバ変数宣言、音声入出力用インスタンス生成を行います
-    def __init__(self):
+    # @brief メンバ変数宣言、エフェクトチェーン・解析器の生成を行います
+    # @param chunk 1ブロックのフレーム数
+    # @param channels 入出力のチャンネル数
+    # @param rate サンプリングレート
+    def __init__(self, chunk=1024, channels=2, rate=44100):
         """ 信号処理用定数 """
-        self.FORMAT = pyaudio.paInt16
-        self.CHANNELS = 2
-        self.RATE = 44100
-        self.CHUNK = 1024
+        self.CHANNELS = channels
+        self.RATE = rate
+        self.CHUNK = chunk
         self.MONORALRIGHT = True
+        self.STEREO = False
         self.BUFFERSIZE = 2 * self.CHUNK
         self.ANALYZEDSIZE = 8 * self.CHUNK
+        self.ANALYSISRATE = 60.0
+        self.HISTORYSEC = 5.0
+        self.HISTORYSIZE = max(self.ANALYZEDSIZE,
+                               int(self.HISTORYSEC * self.RATE) // self.CHUNK * self.CHUNK)
+        self.STFTSIZE = 2 * self.CHUNK
+        self.STFTHOP = self.CHUNK // 2
         self.MAXLEVEL = 32768.0
         self.HANNINGWINDOW = np.hanning(self.ANALYZEDSIZE)
         self.HAMMINGWINDOW = np.hamming(self.ANALYZEDSIZE)
 
         """ 信号用配列 """
         self.bufferdata = np.zeros(self.BUFFERSIZE)
-        self.analyzeddata = np.empty(self.ANALYZEDSIZE)
-        self.plotdata = np.empty(self.CHUNK)
-        self.spectrum = np.empty(self.ANALYZEDSIZE)
-        self.power = np.empty(self.ANALYZEDSIZE)
-        self.cepstrum = np.empty(self.ANALYZEDSIZE)
-        self.phase = np.empty(self.BUFFERSIZE)
+        self.codec = SoundEffectorCodec.PCMCodec(self.CHUNK, self.CHANNELS)
+        self.history = SoundEffectorRingBuffer.RingBuffer(self.HISTORYSIZE, "int16")
+        self.analyzeddata = self.history.latest(self.ANALYZEDSIZE)
+        self.plotdata = self.analyzeddata
+        self.analyzer = SoundEffectorAnalyzer.Analyzer(self.ANALYZEDSIZE, self.RATE,
+                                                       self.ANALYSISRATE)
+        self.spectrum = self.analyzer.spectrum
+        self.power = self.analyzer.power
+        self.cepstrum = self.analyzer.cepstrum
+        self.phase = self.analyzer.phase
+
+        """ 計測 """
+        self.profiler = SoundEffectorProfiler.Profiler()
+
+        """ エフェクトチェーン """
+        self.chain = SoundEffectorChain.EffectChain([
+            SoundEffectorDynamics.DynamicsNode("gate", self.CHUNK, self.RATE, "gate",
+                                               self.MAXLEVEL, enabled=False),
+            SoundEffectorFilter.PassNode("highpass", "highpass", 80.0, 2, self.RATE,
+                                         enabled=False),
+            SoundEffectorFilter.WahNode("wah", self.CHUNK, self.RATE, enabled=False),
+            SoundEffectorChain.BoosterNode("pre_booster"),
+            SoundEffectorWaveshaper.WaveshaperNode("distortion", maxlevel=self.MAXLEVEL,
+                                                   chunk=self.CHUNK),
+            SoundEffectorChain.BoosterNode("post_booster"),
+            SoundEffectorFilter.PassNode("lowpass", "lowpass", 5000.0, 4, self.RATE,
+                                         enabled=False),
+            SoundEffectorFilter.ToneStackNode("tone", self.RATE, enabled=False),
+            SoundEffectorFilter.EQNode("eq", rate=self.RATE, enabled=False),
+            SoundEffectorDynamics.DynamicsNode("compressor", self.CHUNK, self.RATE,
+                                               "compressor", self.MAXLEVEL,
+                                               enabled=False),
+            SoundEffectorDelay.ModulatedDelayNode("chorus", self.CHUNK, self.RATE,
+                                                  "chorus", enabled=False),
+            SoundEffectorDelay.ModulatedDelayNode("flanger", self.CHUNK, self.RATE,
+                                                  "flanger", enabled=False),
+            SoundEffectorChain.PhaserNode("phaser", self.CHUNK, self.RATE,
+                                          self.STFTSIZE, self.STFTHOP),
+            SoundEffectorDelay.ModulatedDelayNode("delay", self.CHUNK, self.RATE,
+                                                  "delay", enabled=False),
+            SoundEffectorDelay.ReverbNode("reverb", self.CHUNK, self.RATE, enabled=False),
+            SoundEffectorDelay.ConvolutionNode("convolution", self.CHUNK, self.RATE,
+                                               enabled=False),
+            SoundEffectorDynamics.DynamicsNode("limiter", self.CHUNK, self.RATE,
+                                               "limiter", self.MAXLEVEL, enabled=False)])
+        self.chain.profiler = self.profiler
 
         """ エフェクト用変数 """
         self.pre_booster_on = 1
         self.pre_booster_amp = 1
         self.distortion_on = 0
         self.distortion_thresh = 20
+        self.distortion_curve = "hard"
+        self.distortion_oversample = 1
         self.post_booster_on = 0
         self.post_booster_amp = 1
         self.phaser_on = 0
+        self.stft_on = 0
 
         """ 内部処理用変数 """
         self.shift_phaser = 0.5
+        self.depth_phaser = 0.0
+        self.rate_phaser = 0.5
         self.whole_counter = 0
-
-        """ 音声入出力用インスタンス """
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(format=self.FORMAT,
-                                  channels=self.CHANNELS,
-                                  rate=self.RATE,
-                                  input=True,
-                                  output=True)
-
-    ## デストラクタ
-    # @brief インスタンス削除関数を呼び出します
-    def __del__(self):
-        self.delete()
-
-    ## インスタンス削除関数
-    # @brief 音声入出力用インスタンスを削除します
-    def delete(self):
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        self.emphasis_zi = None
+        self.parameters = None
+        self.helpers = {}
 
     """ -----------------------------------------------------------------------
         Pre Process
@@ -91,7 +218,7 @@ class SoundEffectorModel:
     # @param data_str pyaudioの入力音信号(str型)
     # @return data_float pyaudioの入力音信号(-1～1に正規化されたfloat型)
     def toNormalizedFloat(self, data_str):
-        data_float = np.frombuffer(data_str, "float") / self.MAXLEVEL
+        data_float = np.frombuffer(data_str, "int16") / self.MAXLEVEL
         return data_float
 
     """ ステレオ(左側)→モノラル """
@@ -134,53 +261,43 @@ class SoundEffectorModel:
     # @param data_int16 pyaudioの出力音信号(float型)
     # @return data_str pyaudioの出力音信号(str型)
     def toDenormalizedStr(self, data_float):
-        data_str = np.frombuffer(np.array(data_float) * 32768.0, "S1")
+        data_int16 = np.array(np.clip(np.asarray(data_float) * self.MAXLEVEL,
+                                      -self.MAXLEVEL, self.MAXLEVEL - 1), dtype="int16")
+        data_str = data_int16.tobytes()
         return data_str
 
     """ -----------------------------------------------------------------------
         Sound Effect
     ----------------------------------------------------------------------- """
     ## エフェクト処理
-    # @brief メインの音声エフェクト処理を行います
-    # @param input 入力音信号
-    # @return output 出力音信号
+    # @brief エフェクトチェーンで音声エフェクト処理を行います
+    # @details 入力長はCHUNKの整数倍であれば任意です。周波数領域の処理はCHUNKごとに
+    #          行うため、まとめて処理してもCHUNKずつ処理した場合と同じ結果になります。
+    #          parameters(ParameterSystem)が設定されている場合は、先頭でパラメータの
+    #          スナップショット・平滑化・オートメーションを反映します。
+    # @param input 入力音信号(最終軸が時間軸)
+    # @return output 出力音信号(int16型, 飽和処理済み、次の呼び出しで上書きされます)
     def effect(self, input):
-
-        # 時間領域の変調処理
-        effected = input
-        if self.pre_booster_on == 1:
-            effected = self.booster(effected, self.pre_booster_amp)
-        if self.distortion_on == 1:
-            distortion_thresh = self.distortion_thresh / 100 * self.MAXLEVEL
-            effected = self.distortion(effected, distortion_thresh)
-        if self.post_booster_on == 1:
-            effected = self.booster(effected, self.post_booster_amp)
-
-#        self.bufferdata = self.pushData(effected,self.bufferdata)
-
-        # 周波数領域の変調処理
-        if self.phaser_on == 1:
-            effected = self.phaser(effected, self.shift_phaser, self.whole_counter)
-#            self.bufferdata = self.gate(self.bufferdata)
-#            buf0 = np.zeros(self.BUFFERSIZE)
-#            buf1 = np.zeros(self.BUFFERSIZE)
-#            buf2 = np.zeros(self.BUFFERSIZE)
-#            buf0[:1024] = self.phaser(self.bufferdata[:1024], self.shift_phaser, self.whole_counter)
-#            buf1[512:1536] = self.phaser(self.bufferdata[512:1536], self.shift_phaser, self.whole_counter+0.5)
-#            buf2[1024:] = self.phaser(self.bufferdata[1024:], self.shift_phaser, self.whole_counter+1)
-#            buf2 += buf0+buf1
-#        effected = buf2[int(self.CHUNK/2):int(self.CHUNK*3/2)]
-
-        # 時間領域に領域に変換
-#        spectrum = self.restoreSpectrum(amp, phase)
-#        effected = self.ifft(spectrum)
-        self.whole_counter += 1
-
-        # 出力
-        output = np.array(effected, dtype="int16")
+        blocks = np.shape(input)[-1] // self.CHUNK
+        if self.parameters is not None:
+            self.parameters.applyBlock(self, np.shape(input)[-1])
+        output = self.chain.process(input, self.whole_counter)
+        self.whole_counter += blocks
         return output
 
     """ エフェクト """
+    ## 単体処理用のエンジン
+    # @brief エフェクトチェーンの状態を乱さないよう、ノードとは別のエンジンを
+    #        最初に使用するときに作成します
+    # @param name エンジン名
+    # @param factory エンジンを作成する関数
+    # @return engine エンジン
+    def helperEngine(self, name, factory):
+        engine = self.helpers.get(name)
+        if engine is None:
+            engine = self.helpers[name] = factory()
+        return engine
+
     ## ブースター
     # @brief 音の大きさを変動させます
     # @param input 入力音信号
@@ -190,49 +307,45 @@ class SoundEffectorModel:
         return input * amp
 
     ## ディストーション
-    # @brief 音に歪みを加えます
+    # @brief 音に歪みを加えます(オーバーサンプリング・参照テーブル方式)
     # @param input 入力音信号
     # @param threshold 音量の閾値
     # @return output 出力音信号
     def distortion(self, input, threshold):
-        effected = input.copy()
-        effected[input > threshold] = threshold
-        effected[input < -threshold] = -threshold
-        return effected
+        engine = self.helperEngine("distortion", lambda: SoundEffectorWaveshaper.Waveshaper(
+            self.distortion_curve, threshold, self.distortion_oversample, self.CHUNK))
+        engine.configure(self.distortion_curve, threshold, self.distortion_oversample)
+        return engine.process(input)
 
     ## フェーザー
     # @brief 位相を操作したエフェクトをかけます
-    # @param phase 位相(input)
+    # @param effected 入力音信号
     # @param shift 位相のシフト量
-    # @return output 位相(output)
+    # @param counter 先頭ブロックのブロック番号(LFO用)
+    # @return output 出力音信号
     def phaser(self, effected, shift, counter):
-        original = effected / 2
-        spectrum = np.fft.fft(effected)
-        amp = self.calcAmpSpectrum(spectrum)
-        phase = self.calcPhaseSpectrum(spectrum)
-        shifter = np.pi * shift * 200 * np.linspace(0, 1, effected.shape[0] / 2 + 1)
-        shifter = np.delete(shifter, -1)
-        shifter = np.concatenate([shifter, np.pi * shift * 200 * np.linspace(1, 0, effected.shape[0] / 2 + 1)])
-        shifter = np.delete(shifter, -1)
-        phase_shifted = phase + np.mod(shifter, np.pi)
-        spectrum = self.restoreSpectrum(amp, phase_shifted)
-        modulated = self.ifft(spectrum) / 2
-        output = original + modulated
-#        output = 2*modulated
-        return output
+        engine = self.helperEngine("phaser", lambda: SoundEffectorPhaser.Phaser(
+            self.CHUNK, self.RATE, shift))
+        engine.configure(shift, self.depth_phaser, self.rate_phaser)
+        return engine.process(effected, counter)
 
     ## ノイズゲート
-    # @brief 位相を操作したエフェクトをかけます
-    # @param phase 位相(input)
-    # @param shift 位相のシフト量
-    # @return output 位相(output)
+    # @brief 閾値(gate_thresh)を下回る音を減衰させます
+    # @param effected 入力音信号
+    # @return output 出力音信号
     def gate(self, effected):
-        spectrum = np.fft.fft(effected)
-        amp = self.calcAmpSpectrum(spectrum)
-        phase = self.calcPhaseSpectrum(spectrum)
-        spectrum = self.restoreSpectrum(amp, phase)
-        output = self.ifft(spectrum)
-        return output
+        node = self.chain["gate"]
+        engine = self.helperEngine("gate", lambda: SoundEffectorDynamics.Dynamics(
+            self.CHUNK, self.RATE, "gate", self.MAXLEVEL))
+        engine.configure(node.threshold, node.ratio, node.attack, node.release,
+                         node.lookahead, node.range, node.makeup)
+        return engine.process(effected)
+
+    ## 減衰量メーター
+    # @return meter ダイナミクスのノード名→直近のブロックの減衰量[dB]の辞書
+    def gainReduction(self):
+        return {name: self.chain[name].gain_reduction_db
+                for name in ("gate", "compressor", "limiter")}
 
     """ -----------------------------------------------------------------------
         Signal Processing
@@ -249,8 +362,8 @@ class SoundEffectorModel:
     # @param buffer 入力配列(キュー)
     # @return output 出力配列(キュー)
     def pushData(self, input, buffer):
-        buffer = np.delete(buffer, list(range(self.CHUNK)))
-        buffer = np.append(buffer, input)
+        buffer[:-self.CHUNK] = buffer[self.CHUNK:]
+        buffer[-self.CHUNK:] = input
         return buffer
 
     """ -----------------------------------------------------------------------
@@ -296,12 +409,10 @@ class SoundEffectorModel:
     # @param phase 入力配列(位相スペクトラム)
     # @return spectrum 出力配列(スペクトラム)
     def restoreSpectrum(self, amp, phase):
-        real = amp * np.cos(phase)
-        imag = amp * np.sin(phase)
-        spectrum = list(map(complex, real, imag))
-#        for i, no_use in enumerate(real):
-#            spectrum.append(complex(real[i],imag[i]))
-        return np.array(spectrum, dtype=complex)
+        spectrum = np.empty(np.shape(amp), dtype=complex)
+        spectrum.real = amp * np.cos(phase)
+        spectrum.imag = amp * np.sin(phase)
+        return spectrum
 
     """ IFFT """
     ## 逆フーリエ変換
@@ -324,39 +435,94 @@ class SoundEffectorModel:
 
     """ pre-emphasis """
     ## プリエンファシスフィルタ
+    # @brief フィルタの状態をブロック間で保持します(ブロック境界で途切れません)
     # @param input 出力配列(音信号)
     # @return output 出力配列(フィルタ処理後信号)
     def preEmphasis(self, input):
-        output = signal.lfilter([1, -0.97], 1, input)
+        signal = SoundEffectorChain.scipySignal()
+        shape = np.shape(input)[:-1] + (1,)
+        if self.emphasis_zi is None or self.emphasis_zi.shape != shape:
+            self.emphasis_zi = np.zeros(shape)
+        output, self.emphasis_zi = signal.lfilter([1, -0.97], 1, input, axis=-1,
+                                                  zi=self.emphasis_zi)
         return output
     """ -----------------------------------------------------------------------
         Main function
     ----------------------------------------------------------------------- """
-    ## メイン処理まとめ
-    # @param stream 入力ストリーム
-    def main(self, stream):
-        """ input Data """
-        input_data = stream.read(self.CHUNK)
+    ## 入力データのエフェクト処理
+    # @brief 入力音信号をチャンネル別に変換しエフェクトのみをかけます(オーディオスレッド用)
+    # @details STEREOの場合は全チャンネルを、それ以外はMONORALRIGHTで選んだ
+    #          1チャンネルを処理します。
+    # @param input_data pyaudioの入力音信号(str型)
+    # @return processed_data 出力音信号(int16型, チャンネル数×CHUNK または CHUNK)
+    def process(self, input_data):
         """ Pre-Process """
-        raw_data = self.toInt16(input_data)
-        if self.CHANNELS == 2 and self.MONORALRIGHT:
-            raw_data = self.toMonoralRight(raw_data)
+        start = self.profiler.begin()
+        planar = self.codec.decode(input_data)
+        if self.STEREO:
+            raw_data = planar
         elif self.CHANNELS == 2 and not self.MONORALRIGHT:
-            raw_data = self.toMonoralLeft(raw_data)
+            raw_data = planar[0]
+        else:
+            raw_data = planar[-1]
+        self.profiler.end("decode", start)
         """ Effect """
+        start = self.profiler.begin()
         processed_data = self.effect(raw_data)
-        """ Processing """
+        self.profiler.end("effect", start)
+        return processed_data
+
+    ## 出力データへの変換
+    # @param processed_data 出力音信号(int16型, チャンネル数×CHUNK または CHUNK)
+    # @return output_data pyaudioの出力音信号(ctypesのchar配列, 次の呼び出しで上書きされます)
+    def encode(self, processed_data):
+        start = self.profiler.begin()
+        output_data = self.codec.encode(processed_data)
+        self.profiler.end("encode", start)
+        return output_data
+
+    ## 表示用データの取得
+    # @param processed_data 出力音信号(int16型, チャンネル数×CHUNK または CHUNK)
+    # @return monitor_data 表示用の出力音信号(int16型, モノラル)
+    def monitor(self, processed_data):
+        if np.ndim(processed_data) == 1:
+            return processed_data
+        if self.MONORALRIGHT:
+            return processed_data[-1]
+        return processed_data[0]
+
+    ## 表示用データの解析
+    # @brief 履歴に追加し、購読されている解析結果をANALYSISRATEに間引いて更新します
+    #        (GUIスレッド用)
+    # @details analyzeddata・plotdataは履歴のビュー(int16型)で、次の呼び出しで更新されます。
+    #          spectrum・power・cepstrum・phaseはanalyzerの配列(rfftの片側)です。
+    # @param processed_data 出力音信号(int16型, モノラル)
+    # @return analyzed 解析を行った場合True
+    def analyze(self, processed_data):
+        start = self.profiler.begin()
+        processed_data = np.ravel(processed_data)
+        self.history.push(processed_data)
+        self.analyzeddata = self.history.latest(self.ANALYZEDSIZE)
+        self.plotdata = self.analyzeddata
+        analyzed = self.analyzer.update(self.analyzeddata, len(processed_data))
+        self.profiler.end("analysis", start)
+        return analyzed
 
+    ## メイン処理まとめ
+    # @brief 読み込み・エフェクト・解析・書き込みを同期的に行います
+    # @param stream 入出力ストリーム(read/writeを持つもの)
+    def main(self, stream):
+        """ input Data """
+        start = self.profiler.begin()
+        input_data = stream.read(self.CHUNK)
+        self.profiler.end("read", start)
+        """ Effect """
+        processed_data = self.process(input_data)
         """ Plot Data """
-        self.analyzeddata = self.pushData(processed_data, self.analyzeddata)
-        self.plotdata = processed_data / self.MAXLEVEL
-        self.spectrum = self.fft(self.analyzeddata, self.HANNINGWINDOW)
-        self.power = self.calcPowerSpectrum(self.spectrum)
-        self.cepstrum = self.makeCepstrum(self.power)
-        self.phase = self.calcPhaseSpectrum(self.spectrum)
+        self.analyze(self.monitor(processed_data))
         """ Post-Process """
-        if self.CHANNELS == 2:
-            processed_data = self.toStereo(processed_data)
-        output_data = self.toStr(processed_data)
+        output_data = self.encode(processed_data)
         """ output Data """
+        start = self.profiler.begin()
         stream.write(output_data)
+        self.profiler.end("write", start)
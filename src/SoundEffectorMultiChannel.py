@@ -0,0 +1,179 @@
+# @package SoundEffectorMultiChannel.py
+# @brief SoundEffectorの多チャンネル・多ストリーム処理
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import SoundEffectorDynamics
+import SoundEffectorModel
+from SoundEffectorChain import EffectNode
+
+
+""" ---------------------------------------------------------------------------
+    Channel Strip
+--------------------------------------------------------------------------- """
+## チャンネルごとの音量・ミュート
+# @brief チャンネルごとの倍率を作業バッファ(チャンネル数×n)にその場で掛けます
+# @details pointwiseなノードのため、隣接するブースター等と融合されます。
+#          倍率は処理のたびに読むため、値が変わってもチェーンは再コンパイルしません。
+class ChannelGainNode(EffectNode):
+    pointwise = True
+
+    ## コンストラクタ
+    # @param name ノード名
+    # @param channels チャンネル数
+    # @param enabled 有効/無効
+    def __init__(self, name, channels, enabled=True):
+        super(ChannelGainNode, self).__init__(name, enabled)
+        self.gain = np.ones(channels)
+        self.mute = np.zeros(channels, dtype=int)
+        self.factor = np.ones((channels, 1))
+
+    def ops(self):
+        return [("shape", self)]
+
+    ## 倍率の適用
+    # @param buffer 作業バッファ(チャンネル数×n, その場で書き換えます)
+    def shape(self, buffer):
+        np.multiply(self.gain, self.mute == 0, out=self.factor[:, 0])
+        np.multiply(buffer, self.factor, out=buffer, casting="unsafe")
+
+
+""" ---------------------------------------------------------------------------
+    Multi Channel Model
+--------------------------------------------------------------------------- """
+## 多チャンネルModel
+# @brief 全チャンネルにSoundEffectorModelと同じエフェクトチェーンをかけます
+# @details エフェクトチェーンは(チャンネル数×CHUNK)の作業バッファで全チャンネルを
+#          まとめて処理し、各ノードの状態(フィルタ・遅延線等)はチャンネルごとに
+#          保持します。ノードがチャンネルごとの値を受け付けるパラメータ
+#          (EffectNode.CHANNELWISE: ブースターの倍率・ディストーションの閾値・
+#          ダイナミクスの閾値/比率/メイクアップ・ディレイ/リバーブのウェット音の割合等)は
+#          setChannelParameter()でチャンネルごとに指定でき、それ以外(フィルタ・
+#          フェーザー・遅延量等)と有効/無効は全チャンネル共通です。
+#          チャンネルごとの音量・ミュートはチェーン末尾のChannelGainNodeで指定します。
+#          ダイナミクスはチャンネルごとに検出します(linked=False)。
+#          SoundEffectorEngineからSoundEffectorModelと同様に使用できます。
+class MultiChannelModel(SoundEffectorModel.SoundEffectorModel):
+    ## チャンネルごとのパラメータと既定値
+    DEFAULTS = {"gain": 1.0, "mute": 0}
+
+    ## コンストラクタ
+    # @param channels チャンネル数
+    # @param chunk 1ブロックのフレーム数
+    # @param rate サンプリングレート
+    def __init__(self, channels=8, chunk=1024, rate=44100):
+        super(MultiChannelModel, self).__init__(chunk, channels, rate)
+        self.STEREO = True
+        self.MONORALRIGHT = False
+        for node in self.chain.nodes:
+            if isinstance(node, SoundEffectorDynamics.DynamicsNode):
+                node.engine.linked = False
+        self.chain.append(ChannelGainNode("channel", channels))
+
+    """ -----------------------------------------------------------------------
+        Channel Parameter
+    ----------------------------------------------------------------------- """
+    ## チャンネルごとに指定できるエフェクトのパラメータ
+    # @return names モデルの属性名のリスト(ノードのCHANNELWISEに対応するもの)
+    def channelParameters(self):
+        names = []
+        for name in dir(type(self)):
+            prop = getattr(type(self), name)
+            if (isinstance(prop, SoundEffectorModel.NodeProperty)
+                    and prop.attr in self.chain[prop.node].CHANNELWISE):
+                names.append(name)
+        return names
+
+    ## チャンネルのパラメータの設定
+    # @brief エフェクトのパラメータは、チャンネルを指定するとチャンネル数の配列に
+    #        して差し替え、指定しない場合は全チャンネル共通の値に戻します
+    # @param name パラメータ名(gain/mute、またはchannelParameters()のいずれか)
+    # @param value 値
+    # @param channel チャンネル番号(Noneの場合全チャンネル)
+    def setChannelParameter(self, name, value, channel=None):
+        if name in self.DEFAULTS:
+            values = getattr(self.chain["channel"], name)
+            if channel is None:
+                values[:] = value
+            else:
+                values[channel] = value
+            return
+        if name not in self.channelParameters():
+            raise KeyError(name)
+        if channel is None:
+            setattr(self, name, float(value))
+            return
+        values = np.empty(self.CHANNELS)
+        values[:] = getattr(self, name)
+        values[channel] = value
+        setattr(self, name, values)
+
+    ## チャンネルのパラメータの適用
+    # @param channel チャンネル番号
+    # @param preset パラメータの辞書
+    def applyChannelPreset(self, channel, preset):
+        for name, value in preset.items():
+            self.setChannelParameter(name, value, channel)
+
+    ## チャンネルのパラメータの取得
+    # @param channel チャンネル番号
+    # @return preset パラメータの辞書(エフェクトのパラメータはチャンネルごとに
+    #         指定したもののみ)
+    def getChannelPreset(self, channel):
+        node = self.chain["channel"]
+        preset = {name: getattr(node, name)[channel].item() for name in self.DEFAULTS}
+        for name in self.channelParameters():
+            values = getattr(self, name)
+            if np.ndim(values):
+                preset[name] = values[channel].item()
+        return preset
+
+
+""" ---------------------------------------------------------------------------
+    Stream Pool
+--------------------------------------------------------------------------- """
+## ストリームプール
+# @brief 独立した複数のストリーム(SoundEffectorEngine)をまとめて開始・停止します
+# @details 各ストリームはそれぞれのエンジンのスレッドで自分の周期で処理するため、
+#          遅いストリームが他のストリームを待たせることはありません。
+#          NumPy/SciPyの演算中はGILが解放されるため、ストリーム数に応じて
+#          複数のコアを使用できます。
+class StreamPool:
+    ## コンストラクタ
+    # @param engines SoundEffectorEngineのリスト
+    def __init__(self, engines):
+        self.engines = list(engines)
+
+    ## 開始
+    def start(self):
+        for engine in self.engines:
+            engine.start()
+
+    ## 停止
+    # @brief 全ストリームのスレッドの終了を待ち、入出力を閉じます
+    def stop(self):
+        for engine in self.engines:
+            engine.stop()
+
+    ## 動作中判定
+    # @return running いずれかのストリームが動作中の場合True
+    def isRunning(self):
+        return any(engine.isRunning() for engine in self.engines)
+
+    ## 終了待ち
+    # @brief 全ストリームの入力が尽きるまで待ちます
+    # @param timeout 1ストリームあたりの最大待ち時間[s](Noneの場合無制限)
+    def join(self, timeout=None):
+        for engine in self.engines:
+            engine.join(timeout)
+
+    ## ドロップアウト数
+    # @return counts 各ストリームのドロップアウト数のリスト
+    def dropoutCounts(self):
+        return [engine.dropoutCount() for engine in self.engines]
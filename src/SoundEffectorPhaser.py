@@ -0,0 +1,133 @@
+# @package SoundEffectorPhaser.py
+# @brief SoundEffectorのフェーザー(実数FFT・位相シフト表の事前計算版)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import inspect
+import math
+import numpy as np
+
+## rfft/irfftが出力先配列(out)を受け付けるか(numpy 2.0以降)
+FFT_OUT = "out" in inspect.signature(np.fft.rfft).parameters
+
+
+## フェーザー
+# @brief 原音と位相をシフトした音を1:1で混ぜ、周波数ごとの打ち消しを作ります
+# @details 位相シフトと原音の混合をまとめた複素乗数表H=(1+exp(jθ))/2を
+#          LFOの段数分だけインスタンスごとに確保し、パラメータが変わったときは
+#          同じ配列に書き直します(パラメータを連続的に変えてもメモリは増えません)。
+#          LFOが有効な場合はwhole_counterに応じてシフト量を周期的に変化させます。
+class Phaser:
+    ## コンストラクタ
+    # @param size フレーム長(CHUNK)
+    # @param rate サンプリングレート
+    # @param shift 位相のシフト量(LFOの中心)
+    # @param depth LFOの振れ幅(0の場合は固定)
+    # @param lfo_rate LFOの周波数[Hz]
+    # @param steps LFOの量子化段数
+    # @param hop counterが1増えるごとに進むサンプル数(Noneの場合はsize)
+    def __init__(self, size, rate=44100, shift=0.5, depth=0.0, lfo_rate=0.5,
+                 steps=64, hop=None):
+        self.size = size
+        self.rate = rate
+        self.hop = size if hop is None else hop
+        self.steps = steps
+        self.params = None
+        self.tables = np.zeros((steps, size // 2 + 1), dtype=complex)
+        self.phases = np.zeros((steps, size // 2 + 1))
+        self.table = None
+        self.spectrum = np.zeros(size // 2 + 1, dtype=complex)
+        self.output = np.zeros(size)
+        self.configure(shift, depth, lfo_rate)
+
+    ## 複素乗数の作成
+    # @brief 乗数表の先頭len(levels)行に書き込みます
+    # @param levels 位相のシフト量の配列
+    # @return table 複素乗数表(len(levels)×(size/2+1), tablesのビュー)
+    def multiplier(self, levels):
+        half = self.size // 2
+        count = len(levels)
+        phases = self.phases[:count]
+        np.multiply(np.pi * np.asarray(levels, dtype=float)[:, np.newaxis] * 200,
+                    np.arange(half + 1), out=phases)
+        phases /= half
+        np.mod(phases, np.pi, out=phases)
+        table = self.tables[:count]
+        np.exp(1j * phases, out=table)
+        table += 1
+        table /= 2
+        return table
+
+    ## パラメータ設定
+    # @brief パラメータが変わった場合のみLFO用の乗数表を作り直します
+    # @param shift 位相のシフト量(LFOの中心)
+    # @param depth LFOの振れ幅
+    # @param lfo_rate LFOの周波数[Hz]
+    def configure(self, shift, depth=0.0, lfo_rate=0.5):
+        params = (shift, depth, lfo_rate)
+        if params == self.params:
+            return
+        self.params = params
+        self.shift = shift
+        self.depth = depth
+        self.lfo_rate = lfo_rate
+        if depth == 0:
+            levels = [shift]
+        else:
+            levels = np.linspace(shift - depth, shift + depth, self.steps)
+        self.table = self.multiplier(levels)
+
+    ## LFOの段番号
+    # @param counter ブロック番号(whole_counter)
+    # @return index 乗数表の行番号
+    def lfoIndex(self, counter):
+        if self.table.shape[0] == 1:
+            return 0
+        phase = 2 * math.pi * self.lfo_rate * counter * self.hop / self.rate
+        return int(round((math.sin(phase) + 1) / 2 * (self.steps - 1)))
+
+    ## フェーザー処理
+    # @param input 入力音信号(最終軸の長さはsizeの整数倍)
+    # @param counter 先頭ブロックのブロック番号(whole_counter)
+    # @return output 出力音信号(1フレームの場合は内部バッファ)
+    def process(self, input, counter):
+        if np.ndim(input) == 1 and np.shape(input)[0] == self.size:
+            return self.processFrame(input, counter)
+        shape = np.shape(input)
+        frames = np.reshape(input, shape[:-1] + (-1, self.size))
+        counters = range(counter, counter + frames.shape[-2])
+        spectrum = np.fft.rfft(np.asarray(frames, dtype=float))
+        spectrum *= self.table[[self.lfoIndex(c) for c in counters]]
+        output = np.fft.irfft(spectrum, self.size)
+        return np.reshape(output, shape)
+
+    ## スペクトラムへのフェーザー処理(STFTProcessor用)
+    # @param spectrum スペクトラム(..., フレーム数, size/2+1)、その場で書き換えます
+    # @param counter 先頭フレームのフレーム番号
+    def processSpectrum(self, spectrum, counter):
+        for index in range(spectrum.shape[-2]):
+            multiplier = self.table[self.lfoIndex(counter + index)]
+            np.multiply(spectrum[..., index, :], multiplier,
+                        out=spectrum[..., index, :])
+
+    ## 1フレームのフェーザー処理
+    # @brief 事前確保したバッファに書き込むため定常状態でメモリ確保を行いません
+    # @param input 入力音信号(size)
+    # @param counter ブロック番号(whole_counter)
+    # @return output 出力音信号(内部バッファ、次の呼び出しで上書きされます)
+    def processFrame(self, input, counter):
+        multiplier = self.table[self.lfoIndex(counter)]
+        if FFT_OUT:
+            np.fft.rfft(input, out=self.spectrum)
+            np.multiply(self.spectrum, multiplier, out=self.spectrum)
+            np.fft.irfft(self.spectrum, self.size, out=self.output)
+        else:
+            self.spectrum[:] = np.fft.rfft(input)
+            np.multiply(self.spectrum, multiplier, out=self.spectrum)
+            self.output[:] = np.fft.irfft(self.spectrum, self.size)
+        return self.output
@@ -0,0 +1,286 @@
+# @package SoundEffectorPitch.py
+# @brief SoundEffectorの基本周波数推定(ケプストラム・YIN)とチューナー
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import argparse
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import SoundEffectorIO
+
+## 音名
+NOTES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+
+
+""" ---------------------------------------------------------------------------
+    Tuner
+--------------------------------------------------------------------------- """
+## 音名とセント
+# @param frequency 周波数[Hz]
+# @param a4 A4の周波数[Hz]
+# @return name 音名(無声の場合None)
+# @return octave オクターブ
+# @return cents 最も近い音からのずれ[セント]
+def noteName(frequency, a4=440.0):
+    if not frequency > 0:
+        return None, 0, 0.0
+    midi = 69 + 12 * np.log2(frequency / a4)
+    nearest = int(np.round(midi))
+    return NOTES[nearest % 12], nearest // 12 - 1, float((midi - nearest) * 100)
+
+
+## 放物線補間
+# @brief 極値の前後3点から極値の位置の補正量を求めます
+# @param left 左の値
+# @param center 極値
+# @param right 右の値
+# @return offset 補正量(-0.5〜0.5)
+def parabolicOffset(left, center, right):
+    denominator = left - 2 * center + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = np.where(denominator != 0, 0.5 * (left - right) / denominator, 0.0)
+    return np.clip(offset, -0.5, 0.5)
+
+
+""" ---------------------------------------------------------------------------
+    Pitch Tracker
+--------------------------------------------------------------------------- """
+## 基本周波数推定
+# @brief ケプストラムのピークから基本周波数を求め、YIN(累積平均正規化差分関数)の
+#        極小で補正します。ピークが明確でない場合はYINで求めます
+# @details 実時間ではAnalyzerのcepstrum購読のコールバックとして動作し、解析済みの
+#          パワースペクトル・ケプストラムを再利用します。YINの自己相関は
+#          パワースペクトルの逆FFTで求めるため、追加のFFTは1回だけです。
+#          オフラインではtrack()がフレームをまとめて2次元配列として処理します。
+#          全ての推定は(フレーム数×ビン数)の配列に対して行い、実時間は1フレームです。
+class PitchTracker:
+    ## コンストラクタ
+    # @param size 解析長
+    # @param rate サンプリングレート
+    # @param fmin 最小周波数[Hz]
+    # @param fmax 最大周波数[Hz]
+    # @param cepstrum_threshold ケプストラムのピークの閾値(範囲内の標準偏差に対する倍率)
+    # @param yin_threshold YINの閾値
+    # @param floor_db 無声とみなすフレームのパワーの下限[dB]
+    def __init__(self, size, rate=44100, fmin=60.0, fmax=1000.0, cepstrum_threshold=6.0,
+                 yin_threshold=0.15, floor_db=60.0):
+        self.size = size
+        self.rate = rate
+        self.window = np.hanning(size)
+        self.qmin = max(2, int(rate / fmax))
+        self.qmax = min(size // 2 - 2, int(np.ceil(rate / fmin)))
+        self.cepstrum_threshold = cepstrum_threshold
+        self.yin_threshold = yin_threshold
+        self.floor = 10 ** (floor_db / 10) * size
+        self.lags = np.arange(1, self.qmax + 2)
+        """ 窓の自己相関の逆数(窓による自己相関の減衰の補正) """
+        window_power = np.square(np.abs(np.fft.rfft(self.window)))
+        window_correlation = np.fft.irfft(window_power, size)[:self.qmax + 2]
+        self.window_correction = window_correlation[0] / window_correlation
+        self.analyzer = None
+        self.frequency = 0.0
+        self.confidence = 0.0
+        self.subscribers = []
+
+    """ -----------------------------------------------------------------------
+        Real time
+    ----------------------------------------------------------------------- """
+    ## Analyzerへの接続
+    # @brief cepstrum・powerを購読し、解析ごとに推定します
+    # @details hopを指定した場合はAnalyzerの解析頻度を、現在の頻度とrate/hopの
+    #          高い方にします(Analyzerは表示と共有のため)。
+    # @param analyzer SoundEffectorAnalyzer.Analyzer
+    # @param hop 推定間隔[サンプル](Noneの場合はAnalyzerの解析頻度)
+    def attach(self, analyzer, hop=None):
+        if analyzer.size != self.size or analyzer.rate != self.rate:
+            raise ValueError("analyzer size/rate does not match the tracker")
+        if hop is not None and hop < analyzer.interval:
+            analyzer.setAnalysisRate(self.rate / hop)
+        self.analyzer = analyzer
+        analyzer.subscribe("power")
+        analyzer.subscribe("cepstrum", self.update)
+
+    ## 購読
+    # @param callback 推定ごとに(周波数, 信頼度)を渡す関数
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    ## 推定(Analyzerのコールバック)
+    # @param cepstrum 解析済みのケプストラム
+    def update(self, cepstrum):
+        frequency, confidence = self.estimate(self.analyzer.power[np.newaxis],
+                                              cepstrum[np.newaxis])
+        self.frequency = frequency[0].item()
+        self.confidence = confidence[0].item()
+        for callback in self.subscribers:
+            callback(self.frequency, self.confidence)
+
+    ## チューナー
+    # @param a4 A4の周波数[Hz]
+    # @return name 音名(無声の場合None)
+    # @return octave オクターブ
+    # @return cents 最も近い音からのずれ[セント]
+    def note(self, a4=440.0):
+        return noteName(self.frequency, a4)
+
+    """ -----------------------------------------------------------------------
+        Estimation
+    ----------------------------------------------------------------------- """
+    ## 推定
+    # @brief ケプストラムで周期を求め、その近傍のYINの極小で補正します。
+    #        ケプストラムのピークが明確でないフレームはYINの結果を使用します。
+    # @param power パワースペクトル(フレーム数×(size/2+1))
+    # @param cepstrum ケプストラム(フレーム数×size)
+    # @return frequency 基本周波数[Hz](無声の場合0)
+    # @return confidence 信頼度(0〜1)
+    def estimate(self, power, cepstrum):
+        search = self.normalizedDifference(power)
+        period, confidence = self.cepstralPeriod(cepstrum)
+        refined, refined_confidence = self.refinePeriod(search, period)
+        yin_period, yin_confidence = self.yinPeriod(search)
+        fallback = (confidence < 1.0) & (yin_confidence > refined_confidence)
+        period = np.where(fallback, yin_period, refined)
+        confidence = np.where(fallback, yin_confidence, np.maximum(confidence,
+                                                                   refined_confidence))
+        voiced = ((confidence >= 1 - self.yin_threshold)
+                  & (np.sum(power, axis=-1) > self.floor) & (period > 0))
+        frequency = np.zeros(period.shape[0])
+        frequency[voiced] = self.rate / period[voiced]
+        confidence[~voiced] = np.minimum(confidence[~voiced], 1 - self.yin_threshold)
+        return frequency, confidence
+
+    ## ケプストラムによる周期
+    # @brief ケフレンシー範囲内の最大のピークを周期とします
+    # @param cepstrum ケプストラム(フレーム数×size)
+    # @return period 周期[サンプル]
+    # @return confidence 信頼度(ピークが範囲内の標準偏差のcepstrum_threshold倍で1)
+    def cepstralPeriod(self, cepstrum):
+        band = cepstrum[:, self.qmin - 1:self.qmax + 2]
+        inner = band[:, 1:-1]
+        peak = np.argmax(inner, axis=-1)
+        rows = np.arange(band.shape[0])
+        height = inner[rows, peak]
+        spread = np.std(inner, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = np.where(spread > 0, (height - np.mean(inner, axis=-1)) / spread, 0.0)
+        offset = parabolicOffset(band[rows, peak], height, band[rows, peak + 2])
+        period = self.qmin + peak + offset
+        confidence = np.clip(score / self.cepstrum_threshold, 0.0, 1.0)
+        return period, confidence
+
+    ## 累積平均正規化差分関数
+    # @brief 自己相関(パワースペクトルの逆FFT)を窓の自己相関で補正して差分関数を求め、
+    #        累積平均で正規化します
+    # @param power パワースペクトル(フレーム数×(size/2+1))
+    # @return search 周期qmin-1〜qmax+1の正規化差分(フレーム数×(qmax-qmin+3))
+    def normalizedDifference(self, power):
+        lags = self.lags
+        correlation = np.fft.irfft(power, self.size, axis=-1)[:, :lags[-1] + 1]
+        correlation *= self.window_correction
+        difference = correlation[:, :1] - correlation[:, lags]
+        np.maximum(difference, 0, out=difference)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = difference * lags / np.cumsum(difference, axis=-1)
+        normalized = np.nan_to_num(normalized, nan=1.0, posinf=1.0)
+        """ lags[i] = i + 1 のため、周期tauは列tau-1 """
+        return normalized[:, self.qmin - 2:self.qmax + 1]
+
+    ## 正規化差分の極小
+    # @param search 正規化差分(normalizedDifferenceの戻り値)
+    # @param index 極小の位置(周期-qmin)
+    # @return period 放物線補間した周期[サンプル]
+    # @return confidence 信頼度(1-正規化差分)
+    def minimumAt(self, search, index):
+        rows = np.arange(search.shape[0])
+        value = search[rows, index + 1]
+        offset = parabolicOffset(search[rows, index], value, search[rows, index + 2])
+        return self.qmin + index + offset, np.clip(1 - value, 0.0, 1.0)
+
+    ## YINによる周期
+    # @brief 正規化差分が閾値を下回る最初の極小を周期とします
+    # @param search 正規化差分(normalizedDifferenceの戻り値)
+    # @return period 周期[サンプル]
+    # @return confidence 信頼度(1-正規化差分)
+    def yinPeriod(self, search):
+        inner = search[:, 1:-1]
+        minimum = ((inner < self.yin_threshold) & (inner <= search[:, :-2])
+                   & (inner <= search[:, 2:]))
+        index = np.where(minimum.any(axis=-1), np.argmax(minimum, axis=-1),
+                         np.argmin(inner, axis=-1))
+        return self.minimumAt(search, index)
+
+    ## 周期の補正
+    # @brief ケプストラムで求めた周期の前後2サンプル内の正規化差分の極小を周期とします
+    # @param search 正規化差分(normalizedDifferenceの戻り値)
+    # @param period ケプストラムによる周期[サンプル]
+    # @return period 周期[サンプル]
+    # @return confidence 信頼度(1-正規化差分)
+    def refinePeriod(self, search, period):
+        width = search.shape[1] - 2
+        center = np.clip(np.round(period).astype(np.intp) - self.qmin, 0, width - 1)
+        candidates = np.clip(center[:, np.newaxis] + np.arange(-2, 3), 0, width - 1)
+        values = np.take_along_axis(search[:, 1:-1], candidates, axis=-1)
+        index = candidates[np.arange(candidates.shape[0]), np.argmin(values, axis=-1)]
+        return self.minimumAt(search, index)
+
+    """ -----------------------------------------------------------------------
+        Offline
+    ----------------------------------------------------------------------- """
+    ## 信号全体のピッチ曲線
+    # @brief hopごとのフレームをblockフレームずつまとめて解析・推定します
+    # @details 解析はAnalyzerと同じ(ハニング窓・rfft・20log10(power+0.0001)の逆FFT)です。
+    # @param data 音信号(モノラル)
+    # @param hop 推定間隔[サンプル]
+    # @param block 1回に処理するフレーム数
+    # @return times フレームの末尾の時刻[s]
+    # @return frequency 基本周波数[Hz](無声の場合0)
+    # @return confidence 信頼度(0〜1)
+    def track(self, data, hop=512, block=64):
+        data = np.asarray(data, dtype=float)
+        if data.shape[0] < self.size:
+            data = np.concatenate((np.zeros(self.size - data.shape[0]), data))
+        frames = sliding_window_view(data, self.size)[::hop]
+        count = frames.shape[0]
+        frequency = np.zeros(count)
+        confidence = np.zeros(count)
+        for start in range(0, count, block):
+            windowed = frames[start:start + block] * self.window
+            power = np.abs(np.fft.rfft(windowed, axis=-1))
+            np.square(power, out=power)
+            logpower = np.log10(power + 0.0001)
+            logpower *= 20
+            cepstrum = np.fft.irfft(logpower, self.size, axis=-1)
+            frequency[start:start + block], confidence[start:start + block] = \
+                self.estimate(power, cepstrum)
+        times = (np.arange(count) * hop + self.size) / self.rate
+        return times, frequency, confidence
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SoundEffector pitch contour")
+    parser.add_argument("input", help="input file (.wav/.csv/raw int16)")
+    parser.add_argument("output", help="output file (.csv: time,frequency,confidence)")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--size", type=int, default=8192)
+    parser.add_argument("--hop", type=int, default=512)
+    parser.add_argument("--fmin", type=float, default=60.0)
+    parser.add_argument("--fmax", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    data, rate, channels = SoundEffectorIO.readSignal(args.input, args.rate,
+                                                      args.channels)
+    data = data[:len(data) // channels * channels].reshape(-1, channels)[:, 0]
+    tracker = PitchTracker(args.size, rate, args.fmin, args.fmax)
+    start = time.perf_counter()
+    times, frequency, confidence = tracker.track(data, args.hop)
+    elapsed = time.perf_counter() - start
+    np.savetxt(args.output, np.stack((times, frequency, confidence), axis=-1),
+               fmt="%.6f", delimiter=",", header="time,frequency,confidence")
+    print("real-time factor: {:.1f}x".format(len(data) / rate / elapsed))
@@ -0,0 +1,126 @@
+# @package SoundEffectorProfiler.py
+# @brief SoundEffectorの処理段ごとの計測(実行中に有効/無効を切り替えられます)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import math
+import time
+import numpy as np
+
+
+## 処理段の統計
+# @brief 処理時間の対数ヒストグラムと直近の計測値を保持します
+class StageStats:
+    ## ヒストグラムの最小値[us]
+    MIN_US = 1.0
+    ## 1桁あたりのビン数
+    BINS_PER_DECADE = 10
+    ## 桁数(1us～100ms)
+    DECADES = 5
+
+    ## コンストラクタ
+    # @param history 直近の計測値を保持する数
+    def __init__(self, history=1024):
+        bins = self.BINS_PER_DECADE * self.DECADES
+        self.edges = self.MIN_US * 10 ** (np.arange(bins + 1) / self.BINS_PER_DECADE)
+        self.counts = np.zeros(bins + 2, dtype="int64")
+        self.recent = np.zeros(history)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    ## 計測値の記録
+    # @param elapsed_us 処理時間[us]
+    def record(self, elapsed_us):
+        if elapsed_us < self.MIN_US:
+            index = 0
+        else:
+            index = 1 + int(math.log10(elapsed_us / self.MIN_US) * self.BINS_PER_DECADE)
+            index = min(index, self.counts.shape[0] - 1)
+        self.counts[index] += 1
+        self.recent[self.count % self.recent.shape[0]] = elapsed_us
+        self.count += 1
+        self.total_us += elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+
+    ## 集計
+    # @return summary 回数・平均・p50・p99・最大[us]の辞書
+    def summary(self):
+        recent = self.recent[:min(self.count, self.recent.shape[0])]
+        if recent.shape[0] == 0:
+            return {"count": 0, "mean_us": 0.0, "p50_us": 0.0, "p99_us": 0.0,
+                    "max_us": 0.0}
+        p50, p99 = np.percentile(recent, [50, 99])
+        return {"count": self.count,
+                "mean_us": self.total_us / self.count,
+                "p50_us": float(p50),
+                "p99_us": float(p99),
+                "max_us": self.max_us}
+
+
+## プロファイラ
+# @brief 処理段ごとの処理時間を単調増加クロックで計測します
+# @details 無効時はbegin()が0を返しend()が何もしないため、計測箇所のコストは
+#          関数呼び出し1回分です。
+class Profiler:
+    ## コンストラクタ
+    # @param enabled 有効/無効
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}
+
+    ## 計測開始
+    # @return start 開始時刻[ns](無効時は0)
+    def begin(self):
+        if not self.enabled:
+            return 0
+        return time.perf_counter_ns()
+
+    ## 計測終了
+    # @param name 処理段名
+    # @param start begin()の戻り値
+    def end(self, name, start):
+        if not start:
+            return
+        elapsed_us = (time.perf_counter_ns() - start) / 1000.0
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages.setdefault(name, StageStats())
+        stage.record(elapsed_us)
+
+    ## 処理段名の一覧
+    # @return names 処理段名のリスト
+    def names(self):
+        return list(self.stages)
+
+    ## 集計
+    # @return summary 処理段名→集計の辞書
+    def summary(self):
+        return {name: stage.summary() for name, stage in list(self.stages.items())}
+
+    ## ヒストグラム
+    # @param name 処理段名
+    # @return edges ビン境界[us](両端に範囲外のビンがあります)
+    # @return counts 各ビンの回数
+    def histogram(self, name):
+        stage = self.stages[name]
+        return stage.edges, stage.counts.copy()
+
+    ## 初期化
+    def reset(self):
+        self.stages = {}
+
+    ## 表示用文字列
+    # @return text 処理段ごとのp50/p99/最大
+    def report(self):
+        lines = []
+        for name, summary in sorted(self.summary().items()):
+            lines.append("{:<28} p50 {:8.1f}us  p99 {:8.1f}us  max {:8.1f}us".format(
+                name, summary["p50_us"], summary["p99_us"], summary["max_us"]))
+        return "\n".join(lines)
@@ -0,0 +1,121 @@
+# @package SoundEffectorRenderer.py
+# @brief 音声ファイルにエフェクトをオフラインで適用します(音声デバイス不要)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import argparse
+import time
+import numpy as np
+import SoundEffectorModel
+import SoundEffectorEngine
+import SoundEffectorController
+import SoundEffectorIO
+
+
+""" ---------------------------------------------------------------------------
+    Render
+--------------------------------------------------------------------------- """
+## モノラル化
+# @brief 実時間処理(SoundEffectorModel.process)と同じチャンネルを取り出します
+# @param model SoundEffectorModel
+# @param data 音信号(int16型, チャンネルインターリーブ)
+# @param channels チャンネル数
+# @return output 音信号(int16型, モノラル)
+def toMonoral(model, data, channels):
+    if channels == 1:
+        return data
+    frames = np.reshape(data[:len(data) // channels * channels], (-1, channels))
+    if model.MONORALRIGHT:
+        return frames[:, 1]
+    return frames[:, 0]
+
+
+## オフライン処理
+# @brief 信号全体をCHUNKの整数倍の大きなブロックに分けてエフェクトをかけます
+# @details パラメータの平滑化・オートメーションはブロックごとに反映するため、
+#          model.parametersが設定されている場合は実時間処理と同じCHUNKずつ処理します。
+# @param model SoundEffectorModel
+# @param data 音信号(int16型, モノラル)
+# @param block_chunks 1回に処理するCHUNK数
+# @return output 出力音信号(int16型, モノラル)
+def render(model, data, block_chunks=64):
+    length = len(data)
+    padded_length = -(-length // model.CHUNK) * model.CHUNK
+    padded = np.zeros(padded_length, dtype="int16")
+    padded[:length] = data
+    output = np.empty(padded_length, dtype="int16")
+    if model.parameters is not None:
+        block_chunks = 1
+    block = block_chunks * model.CHUNK
+    for start in range(0, padded_length, block):
+        output[start:start + block] = model.effect(padded[start:start + block])
+    return output[:length]
+
+
+## 実時間処理の再現
+# @brief 疑似ストリーム経由でCHUNKずつ処理します(renderの検証用)
+# @param model SoundEffectorModel
+# @param data 音信号(int16型, モノラル)
+# @return output 出力音信号(int16型, モノラル)
+def renderChunked(model, data):
+    backend = SoundEffectorEngine.FakeStreamBackend(
+        model.toStereo(data), model.RATE, model.CHANNELS)
+    engine = SoundEffectorEngine.SoundEffectorEngine(model, backend)
+    while engine.step():
+        engine.queue.popAll()
+    output = toMonoral(model, backend.output(), model.CHANNELS)
+    return output[:len(data)]
+
+
+## ファイルのオフライン処理
+# @param input_path 入力ファイルパス
+# @param output_path 出力ファイルパス
+# @param model SoundEffectorModel(Noneの場合は新規作成)
+# @param rate サンプリングレート(CSV・raw PCMの場合)
+# @param channels チャンネル数(CSV・raw PCMの場合)
+# @param block_chunks 1回に処理するCHUNK数
+# @return output 出力音信号(int16型, モノラル)
+# @return rtf 実時間比(信号長/処理時間)
+def renderFile(input_path, output_path, model=None, rate=44100, channels=1,
+               block_chunks=64):
+    if model is None:
+        model = SoundEffectorModel.SoundEffectorModel()
+    data, rate, channels = SoundEffectorIO.readSignal(input_path, rate, channels)
+    data = toMonoral(model, data, channels)
+    start = time.perf_counter()
+    output = render(model, data, block_chunks)
+    elapsed = time.perf_counter() - start
+    SoundEffectorIO.writeSignal(output_path, output, rate, 1)
+    rtf = len(data) / rate / elapsed if elapsed > 0 else float("inf")
+    return output, rtf
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SoundEffector offline renderer")
+    parser.add_argument("input", help="input file (.wav/.csv/raw int16)")
+    parser.add_argument("output", help="output file (.wav/.csv/raw int16)")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--block", type=int, default=64,
+                        help="number of CHUNKs processed at once")
+    parser.add_argument("--preset", help="preset file (.json)")
+    parser.add_argument("--automation", help="automation file (.json)")
+    args = parser.parse_args()
+
+    model = SoundEffectorModel.SoundEffectorModel()
+    if args.preset:
+        SoundEffectorController.applyPreset(model,
+                                            SoundEffectorController.readPreset(args.preset))
+    if args.automation:
+        parameters = SoundEffectorController.SoundEffectController(model).parameters
+        automation = SoundEffectorController.Automation(model.RATE)
+        automation.load(args.automation)
+        parameters.setAutomation(automation)
+    output, rtf = renderFile(args.input, args.output, model,
+                             args.rate, args.channels, args.block)
+    print("real-time factor: {:.1f}x".format(rtf))
@@ -0,0 +1,79 @@
+# @package SoundEffectorRingBuffer.py
+# @brief SoundEffectorの履歴用リングバッファ(ミラー領域によるゼロコピー参照)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+
+
+## リングバッファ
+# @brief 固定容量の循環バッファです。書き込みを容量の2倍の領域の両半分に行うため、
+#        直近nサンプルを常に連続したビューとして(コピーなしで)参照できます。
+# @details latest()が返すビューは以降のpush()で書き換わるため、
+#          保持する場合は呼び出し側でコピーしてください。
+class RingBuffer:
+    ## コンストラクタ
+    # @param capacity 容量(サンプル数・フレーム数)
+    # @param dtype データ型
+    # @param frame_shape 1サンプルあたりの形(スペクトログラムの列などに使用)
+    def __init__(self, capacity, dtype="float64", frame_shape=()):
+        self.capacity = capacity
+        self.storage = np.zeros((2 * capacity,) + tuple(frame_shape), dtype=dtype)
+        self.index = 0
+        self.filled = 0
+
+    ## 格納済みサンプル数
+    # @return count サンプル数(最大capacity)
+    def __len__(self):
+        return self.filled
+
+    ## 書き込み
+    # @param data 入力配列(サンプル数×frame_shape)、容量を超える場合は末尾のみ保持します
+    def push(self, data):
+        capacity = self.capacity
+        count = len(data)
+        if count >= capacity:
+            data = data[count - capacity:]
+            count = capacity
+        start = self.index
+        end = start + count
+        storage = self.storage
+        if end <= capacity:
+            storage[start:end] = data
+            storage[start + capacity:end + capacity] = data
+        else:
+            first = capacity - start
+            storage[start:capacity] = data[:first]
+            storage[start + capacity:] = data[:first]
+            storage[:end - capacity] = data[first:]
+            storage[capacity:end] = data[first:]
+        self.index = end % capacity
+        self.filled = min(self.filled + count, capacity)
+
+    ## 1サンプルの書き込み
+    # @param frame 入力(frame_shape)
+    def pushFrame(self, frame):
+        self.storage[self.index] = frame
+        self.storage[self.index + self.capacity] = frame
+        self.index = (self.index + 1) % self.capacity
+        self.filled = min(self.filled + 1, self.capacity)
+
+    ## 直近データの参照
+    # @param count 参照するサンプル数(Noneの場合は容量分)
+    # @return view 古い順に並んだ連続ビュー(count×frame_shape)
+    def latest(self, count=None):
+        if count is None:
+            count = self.capacity
+        end = self.index + self.capacity
+        return self.storage[end - count:end]
+
+    ## 初期化
+    def clear(self):
+        self.storage[...] = 0
+        self.index = 0
+        self.filled = 0
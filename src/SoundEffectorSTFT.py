@@ -0,0 +1,145 @@
+# @package SoundEffectorSTFT.py
+# @brief SoundEffectorのSTFT/オーバーラップ加算処理(周波数領域エフェクト用)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+from SoundEffectorPhaser import FFT_OUT
+
+
+## 周期窓関数の作成
+# @param name 窓関数名(hann/hamming/blackman/boxcar)
+# @param size 窓長
+# @return window 窓関数
+def makeWindow(name, size):
+    if name == "hann":
+        return np.hanning(size + 1)[:-1]
+    if name == "hamming":
+        return np.hamming(size + 1)[:-1]
+    if name == "blackman":
+        return np.blackman(size + 1)[:-1]
+    if name == "boxcar":
+        return np.ones(size)
+    raise ValueError("unknown window: {}".format(name))
+
+
+## STFT/オーバーラップ加算
+# @brief 入力をhopずつずらした窓付きフレームに分け、周波数領域エフェクトをかけて
+#        オーバーラップ加算で時間領域に戻します
+# @details 分析窓・合成窓にはsqrt(窓関数)を使い、重ね合わせの和が1になるよう
+#          合成窓を正規化します。入力ブロック長はhopの整数倍であれば任意で、
+#          フレーム用バッファはブロック長ごとに一度だけ確保します。
+#          effectsの各要素はprocessSpectrum(spectrum, counter)を持ち、
+#          spectrum(..., フレーム数, fft_size/2+1)をその場で書き換えます。
+class STFTProcessor:
+    ## コンストラクタ
+    # @param frame_size フレーム長(窓長)
+    # @param hop フレームのずらし幅
+    # @param window 窓関数名
+    # @param fft_size FFT長(frame_size以上、Noneの場合はframe_size)
+    def __init__(self, frame_size=2048, hop=512, window="hann", fft_size=None):
+        if frame_size % hop != 0:
+            raise ValueError("frame_size must be a multiple of hop")
+        self.frame_size = frame_size
+        self.hop = hop
+        self.fft_size = frame_size if fft_size is None else fft_size
+        self.effects = []
+        """ blackmanの端点は丸め誤差で負になるため0で制限します """
+        base = np.sqrt(np.maximum(makeWindow(window, frame_size), 0.0))
+        overlap = (base * base).reshape(-1, hop).sum(axis=0)
+        self.analysis_window = base
+        self.synthesis_window = base / np.tile(overlap, frame_size // hop)
+        self.frame_counter = 0
+        self.shape = None
+        self.buffers = {}
+
+    ## アルゴリズム遅延
+    # @return latency 遅延サンプル数
+    def latency(self):
+        return self.frame_size - self.hop
+
+    ## 内部状態の初期化
+    # @param shape 入力の先頭軸の形(チャンネル等)
+    def reset(self, shape=()):
+        self.shape = tuple(shape)
+        self.history = np.zeros(self.shape + (self.frame_size - self.hop,))
+        self.tail = np.zeros(self.shape + (self.frame_size - self.hop,))
+        self.buffers = {}
+        self.frame_counter = 0
+
+    ## 状態の写し
+    # @brief otherと同じ状態にします(形が同じ場合は確保済みの配列に書き込みます)
+    # @param other STFTProcessor(フレーム長・ずらし幅が同じもの)
+    def assign(self, other):
+        if other.shape is None:
+            self.shape = None
+            return
+        if self.shape != other.shape:
+            self.reset(other.shape)
+        np.copyto(self.history, other.history)
+        np.copyto(self.tail, other.tail)
+        self.frame_counter = other.frame_counter
+
+    ## ブロック長ごとのバッファ
+    # @param length ブロック長
+    # @return buffers (extended, accumulator, windowed, spectrum, synthesized)
+    def getBuffers(self, length):
+        if length not in self.buffers:
+            size = self.frame_size - self.hop + length
+            frames = self.shape + (length // self.hop,)
+            self.buffers[length] = (
+                np.zeros(self.shape + (size,)),
+                np.zeros(self.shape + (size,)),
+                np.zeros(frames + (self.frame_size,)),
+                np.zeros(frames + (self.fft_size // 2 + 1,), dtype=complex),
+                np.zeros(frames + (self.fft_size,)))
+        return self.buffers[length]
+
+    ## STFT処理
+    # @param input 入力音信号(最終軸の長さはhopの整数倍)
+    # @return output 出力音信号(latency()サンプル遅延、次の呼び出しで上書きされます)
+    def process(self, input):
+        shape = np.shape(input)
+        if shape[:-1] != self.shape:
+            self.reset(shape[:-1])
+        length = shape[-1]
+        if length % self.hop != 0:
+            raise ValueError("block length must be a multiple of hop")
+        context = self.frame_size - self.hop
+        extended, accumulator, windowed, spectrum, synthesized = \
+            self.getBuffers(length)
+        extended[..., :context] = self.history
+        extended[..., context:] = input
+        self.history[...] = extended[..., length:]
+
+        """ Analysis """
+        frames = np.lib.stride_tricks.sliding_window_view(
+            extended, self.frame_size, axis=-1)[..., ::self.hop, :]
+        np.multiply(frames, self.analysis_window, out=windowed)
+        if FFT_OUT:
+            np.fft.rfft(windowed, self.fft_size, out=spectrum)
+        else:
+            spectrum[...] = np.fft.rfft(windowed, self.fft_size)
+        for effect in self.effects:
+            effect.processSpectrum(spectrum, self.frame_counter)
+        self.frame_counter += frames.shape[-2]
+
+        """ Synthesis """
+        if FFT_OUT:
+            np.fft.irfft(spectrum, self.fft_size, out=synthesized)
+        else:
+            synthesized[...] = np.fft.irfft(spectrum, self.fft_size)
+        frames = synthesized[..., :self.frame_size]
+        frames *= self.synthesis_window
+        accumulator[..., :context] = self.tail
+        accumulator[..., context:] = 0
+        for index in range(frames.shape[-2]):
+            start = index * self.hop
+            accumulator[..., start:start + self.frame_size] += frames[..., index, :]
+        self.tail[...] = accumulator[..., length:]
+        return accumulator[..., :length]
@@ -10,20 +10,39 @@ import pyqtgraph as pg
 from pyqtgraph.Qt import QtCore
 from pyqtgraph.Qt import QtGui
 from pyqtgraph.Qt import QtWidgets
+import SoundEffectorDisplay
+import SoundEffectorPitch
 
 dir(QtWidgets.QSlider.minimum)
 
 ## View
 # @brief 画面表示用クラス
 class SoundEffectorView(QtGui.QWidget):
-    def __init__(self, model, parent=None):
+    def __init__(self, model, engine, parent=None):
         super(SoundEffectorView, self).__init__(parent)
         """ Model """
         self.model = model
+        self.engine = engine
+        self.parameters = None
         """ Data """
-        self.freq = np.linspace(0, 44100, self.model.ANALYZEDSIZE)
-        self.plotdata = np.zeros(self.model.CHUNK)
-        self.update_msec = 10
+        self.freq = self.model.analyzer.freq
+        self.max_fps = 30.0
+        self.update_msec = int(1000 / self.max_fps)
+        self.profile_msec = 500
+        self.model.analyzer.setAnalysisRate(self.max_fps)
+        self.spectrogram = SoundEffectorDisplay.Spectrogram(self.freq, self.max_fps)
+        self.spectrogram_count = 0
+        self.model.analyzer.subscribe("power", self.spectrogram.update)
+        self.model.analyzer.subscribe("cepstrum")
+        self.pitch = SoundEffectorPitch.PitchTracker(self.model.ANALYZEDSIZE, self.model.RATE)
+        self.pitch.attach(self.model.analyzer)
+        """ Display """
+        self.limiter = SoundEffectorDisplay.FrameLimiter(self.max_fps)
+        self.waveform = SoundEffectorDisplay.WaveformDecimator(self.model.ANALYZEDSIZE)
+        self.logspectrum = SoundEffectorDisplay.LogSpectrum(self.freq, 20.0, 5000.0)
+        self.quefrency = SoundEffectorDisplay.CepstrumRange(
+            self.model.analyzer.quefrency, 0.001, 0.02)
+        self.analyzed = False
         """ Window """
         self.setWindowTitle("test")
         """ Label Widget """
@@ -49,6 +68,18 @@ class SoundEffectorView(QtGui.QWidget):
         self.phaser_switch.stateChanged.connect(self.toggle_phaser)
         self.post_booster_switch.stateChanged.connect(self.toggle_post_booster)
         self.post_booster_bar.valueChanged.connect(self.control_post_booster)
+        self.gate_switch = QtWidgets.QCheckBox("NOISE-GATE", self)
+        self.compressor_switch = QtWidgets.QCheckBox("COMPRESSOR", self)
+        self.limiter_switch = QtWidgets.QCheckBox("LIMITER", self)
+        self.gate_switch.stateChanged.connect(self.toggle_gate)
+        self.compressor_switch.stateChanged.connect(self.toggle_compressor)
+        self.limiter_switch.stateChanged.connect(self.toggle_limiter)
+        self.reduction_label = QtWidgets.QLabel("", self)
+        self.reduction_label.setStyleSheet("font-family: monospace;")
+        self.tuner_label = QtWidgets.QLabel("", self)
+        self.tuner_label.setStyleSheet("font-family: monospace; font-size: 16pt;")
+        self.profile_switch = QtWidgets.QCheckBox("PROFILE", self)
+        self.profile_switch.stateChanged.connect(self.toggle_profile)
         """ Effect Switch Box """
         self.switchBox = QtGui.QGridLayout()
         self.switchBox.addWidget(self.pre_booster_switch, 0, 0)
@@ -58,84 +89,170 @@ class SoundEffectorView(QtGui.QWidget):
         self.switchBox.addWidget(self.phaser_switch, 4, 0)
         self.switchBox.addWidget(self.post_booster_switch, 5, 0)
         self.switchBox.addWidget(self.post_booster_bar, 6, 0)
+        self.switchBox.addWidget(self.gate_switch, 7, 0)
+        self.switchBox.addWidget(self.compressor_switch, 8, 0)
+        self.switchBox.addWidget(self.limiter_switch, 9, 0)
+        self.switchBox.addWidget(self.reduction_label, 10, 0)
+        self.switchBox.addWidget(self.tuner_label, 11, 0)
+        self.switchBox.addWidget(self.profile_switch, 12, 0)
+        """ Graph Box(グラフは最初の表示の後に作成します) """
+        self.graphBox = QtGui.QGridLayout()
+        """ Layout Box """
+        self.layoutBox = QtGui.QGridLayout()
+        self.layoutBox.addLayout(self.switchBox, 0, 0)
+        self.layoutBox.addLayout(self.graphBox, 0, 1)
+        self.setLayout(self.layoutBox)
+        """ timer """
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.update)
+        QtCore.QTimer.singleShot(0, self.buildGraphs)
+
+    ## グラフの作成
+    # @brief 起動を速くするため、グラフのウィジェットはイベントループの開始後に作成し、
+    #        作成後に描画の周期処理を開始します
+    def buildGraphs(self):
         """ Graph Widget """
         self.graph = pg.PlotWidget(title="WaveForm")
         self.graphplt = self.graph.plotItem
         self.graphplt.setXRange(0, self.model.ANALYZEDSIZE)
-        self.graphplt.setYRange(-1, 1)
+        self.graphplt.setYRange(-self.model.MAXLEVEL, self.model.MAXLEVEL)
         self.graphcurve = self.graphplt.plot()
+        """ Profile Overlay """
+        self.profile_label = QtWidgets.QLabel(self.graph)
+        self.profile_label.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 160); color: white; font-family: monospace;")
+        self.profile_label.move(60, 10)
+        self.profile_label.hide()
+        self.profile_time = QtCore.QElapsedTimer()
+        self.profile_time.start()
         """ Spectrum Widget """
         self.spectrum = pg.PlotWidget(title="Spectrum")
         self.specplt = self.spectrum.plotItem
-        self.specplt.setXRange(0, 5000)
-        self.specplt.setYRange(0, 10**12)
-#        self.specplt.setYRange(0,20)
+        self.specplt.setLogMode(x=True, y=False)
+        self.specplt.setXRange(np.log10(20), np.log10(5000))
+        self.specplt.setYRange(0, 160)
+        self.specplt.setLabel("bottom", "Frequency", units="Hz")
+        self.specplt.setLabel("left", "Power", units="dB")
         self.speccurve = self.specplt.plot()
         """ Cepstrum Widget """
         self.cepstrum = pg.PlotWidget(title="Cepstrum")
         self.cepsplt = self.cepstrum.plotItem
-        self.cepsplt.setXRange(1019, 1029)
-        self.cepsplt.setYRange(-3, 3)
+        self.cepsplt.setXRange(self.quefrency.x[0], self.quefrency.x[-1])
+        self.cepsplt.enableAutoRange(axis="y")
+        self.cepsplt.setLabel("bottom", "Quefrency", units="ms")
         self.cepscurve = self.cepsplt.plot()
+        """ Spectrogram Widget """
+        self.waterfall = pg.PlotWidget(title="Spectrogram")
+        self.waterplt = self.waterfall.plotItem
+        self.waterimage = pg.ImageItem()
+        self.waterimage.setLookupTable(self.spectrogram.lut)
+        self.waterplt.addItem(self.waterimage)
+        self.waterplt.setLabel("bottom", "Frame")
+        self.waterplt.setLabel("left", "Band")
         """ Graph Box """
-        self.graphBox = QtGui.QGridLayout()
         self.graphBox.addWidget(self.graph, 0, 0)
         self.graphBox.addWidget(self.spectrum, 1, 0)
         self.graphBox.addWidget(self.cepstrum, 2, 0)
-        """ Layout Box """
-        self.layoutBox = QtGui.QGridLayout()
-        self.layoutBox.addLayout(self.switchBox, 0, 0)
-        self.layoutBox.addLayout(self.graphBox, 0, 1)
-        self.setLayout(self.layoutBox)
-        """ timer """
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.update)
+        self.graphBox.addWidget(self.waterfall, 3, 0)
         self.timer.start(self.update_msec)
 
     def update(self):
+        profiler = self.model.profiler
+        start = profiler.begin()
         """ Processing """
-        self.model.main(self.model.stream)
+        blocks = self.engine.queue.popAll()
+        if len(blocks) == 0:
+            return
+        self.analyzed = self.model.analyze(blocks) or self.analyzed
+        if not self.limiter.ready():
+            profiler.end("view.update", start)
+            return
         """ Rewriting GraphPlot"""
-        self.plotdata = np.append(self.plotdata, self.model.plotdata)
-        if len(self.plotdata) > self.model.ANALYZEDSIZE:
-            self.plotdata = self.plotdata[self.model.CHUNK:]
-        self.graphcurve.setData(self.plotdata)
-        """ Rewriting Spectrum """
-        self.specdata = abs(self.model.power)
-        self.speccurve.setData(self.freq, self.specdata)
-        """ Rewriting Cepstrum """
-        self.cepsdata = self.model.phase
-        self.cepscurve.setData(self.cepsdata)
+        plot_start = profiler.begin()
+        x, y = self.waveform.decimate(self.model.plotdata, self.graph.width())
+        self.graphcurve.setData(x, y)
+        profiler.end("view.setData.waveform", plot_start)
+        if self.analyzed:
+            self.analyzed = False
+            """ Rewriting Spectrum """
+            plot_start = profiler.begin()
+            self.speccurve.setData(*self.logspectrum.update(self.model.power))
+            profiler.end("view.setData.spectrum", plot_start)
+            """ Rewriting Cepstrum """
+            plot_start = profiler.begin()
+            self.cepscurve.setData(*self.quefrency.select(self.model.cepstrum))
+            profiler.end("view.setData.cepstrum", plot_start)
+            """ Rewriting Tuner """
+            name, octave, cents = self.pitch.note()
+            if name is None:
+                self.tuner_label.setText("--")
+            else:
+                self.tuner_label.setText("{}{} {:+5.1f}c {:7.2f}Hz".format(
+                    name, octave, cents, self.pitch.frequency))
+        if self.spectrogram.count != self.spectrogram_count:
+            """ Rewriting Spectrogram """
+            plot_start = profiler.begin()
+            self.spectrogram_count = self.spectrogram.count
+            self.waterimage.setImage(self.spectrogram.image(), autoLevels=False,
+                                     levels=(0, 255))
+            profiler.end("view.setData.spectrogram", plot_start)
+        """ Rewriting Gain Reduction """
+        self.reduction_label.setText("\n".join(
+            "GR {:<10} {:5.1f}dB".format(name, value)
+            for name, value in self.model.gainReduction().items()))
+        profiler.end("view.update", start)
+        """ Rewriting Profile """
+        if profiler.enabled and self.profile_time.elapsed() > self.profile_msec:
+            self.profile_time.restart()
+            self.profile_label.setText(profiler.report())
+            self.profile_label.adjustSize()
 
-    def toggle_pre_booster(self, state):
+    ## パラメータの変更
+    # @brief Controllerが設定されている場合はパラメータシステム経由で(平滑化して)、
+    #        それ以外はモデルに直接反映します
+    # @param name パラメータ名
+    # @param value 値
+    def setParameter(self, name, value):
+        if self.parameters is not None:
+            self.parameters.set(name, value)
+        else:
+            setattr(self.model, name, value)
+
+    def toggle_profile(self, state):
         if state == QtCore.Qt.Checked:
-            self.model.pre_booster_on = 1
+            self.model.profiler.reset()
+            self.model.profiler.enabled = True
+            self.profile_label.show()
         else:
-            self.model.pre_booster_on = 0
+            self.model.profiler.enabled = False
+            self.profile_label.hide()
+
+    def toggle_gate(self, state):
+        self.setParameter("gate_on", int(state == QtCore.Qt.Checked))
+
+    def toggle_compressor(self, state):
+        self.setParameter("compressor_on", int(state == QtCore.Qt.Checked))
+
+    def toggle_limiter(self, state):
+        self.setParameter("limiter_on", int(state == QtCore.Qt.Checked))
+
+    def toggle_pre_booster(self, state):
+        self.setParameter("pre_booster_on", int(state == QtCore.Qt.Checked))
 
     def control_pre_booster(self, value):
-        self.model.pre_booster_amp = value
+        self.setParameter("pre_booster_amp", value)
 
     def toggle_distortion(self, state):
-        if state == QtCore.Qt.Checked:
-            self.model.distortion_on = 1
-        else:
-            self.model.distortion_on = 0
+        self.setParameter("distortion_on", int(state == QtCore.Qt.Checked))
 
     def control_distortion(self, value):
-        self.model.distortion_thresh = value
+        self.setParameter("distortion_thresh", value)
 
     def toggle_phaser(self, state):
-        if state == QtCore.Qt.Checked:
-            self.model.phaser_on = 1
-        else:
-            self.model.phaser_on = 0
+        self.setParameter("phaser_on", int(state == QtCore.Qt.Checked))
 
     def toggle_post_booster(self, state):
-        if state == QtCore.Qt.Checked:
-            self.model.post_booster_on = 1
-        else:
-            self.model.post_booster_on = 0
+        self.setParameter("post_booster_on", int(state == QtCore.Qt.Checked))
 
     def control_post_booster(self, value):
-        self.model.post_booster_amp = value
+        self.setParameter("post_booster_amp", value)
@@ -0,0 +1,354 @@
+# @package SoundEffectorWaveshaper.py
+# @brief SoundEffectorのウェーブシェーパー(オーバーサンプリング付きディストーション)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import SoundEffectorCache
+from SoundEffectorChain import DistortionNode, scipySignal, segment
+
+## 特性曲線の種類
+CURVES = ("hard", "soft", "tanh", "asymmetric")
+
+## オーバーサンプリング倍率
+FACTORS = (1, 2, 4, 8)
+
+
+""" ---------------------------------------------------------------------------
+    Curve
+--------------------------------------------------------------------------- """
+## 特性曲線
+# @param curve 種類(hard/soft/tanh/asymmetric)
+# @param u 閾値で正規化した入力
+# @return y 閾値で正規化した出力
+def shapeCurve(curve, u):
+    if curve == "hard":
+        return np.clip(u, -1.0, 1.0)
+    if curve == "soft":
+        clipped = np.clip(u, -1.0, 1.0)
+        return 1.5 * (clipped - clipped ** 3 / 3)
+    if curve == "tanh":
+        return np.tanh(u)
+    if curve == "asymmetric":
+        return np.where(u >= 0, np.tanh(u), 0.6 * np.tanh(u / 0.6))
+    raise ValueError("unknown curve: {}".format(curve))
+
+
+""" ---------------------------------------------------------------------------
+    Oversampler
+--------------------------------------------------------------------------- """
+## 低域通過FIRフィルタの設計
+# @param length タップ数
+# @param cutoff 遮断周波数(ナイキスト周波数に対する比)
+# @return fir フィルタ係数
+def designLowpass(length, cutoff):
+    return scipySignal().firwin(length, cutoff)
+
+
+## ポリフェーズ・オーバーサンプラー
+# @brief FIRフィルタのポリフェーズ分解でアップ・ダウンサンプリングします
+# @details フィルタの状態(直前の入力)をブロック間で保持するため、CHUNKの境界で
+#          途切れません。積和は入力の窓(ビュー)と係数行列の行列積で計算します。
+#          係数は最初に使用するときに作成します。
+class Oversampler:
+    ## コンストラクタ
+    # @param factor 倍率
+    # @param taps 1位相あたりのタップ数
+    def __init__(self, factor, taps=16):
+        self.factor = factor
+        self.taps = taps
+        self.up = None
+        self.down = None
+        self.up_state = None
+        self.down_state = None
+
+    ## 係数の作成
+    # @brief 最初に使用するときにキャッシュから取得(なければ設計)します
+    def design(self):
+        factor = self.factor
+        taps = self.taps
+        fir = SoundEffectorCache.table("lowpass", designLowpass, factor * taps, 0.9 / factor)
+        """ アップサンプリング: up[j, p] = fir[p + (taps-1-j)*factor] """
+        self.up = fir.reshape(taps, factor)[::-1] * factor
+        """ ダウンサンプリング: 古い順の窓に掛ける係数 """
+        self.down = fir[::-1].copy()
+
+    ## 遅延
+    # @return latency 元のサンプリングレートでの遅延[サンプル]
+    def latency(self):
+        return (self.factor * self.taps - 1) / self.factor
+
+    ## 状態の長さ
+    # @return memory 出力に影響する過去の入力のサンプル数
+    def memory(self):
+        return 2 * self.taps - 1
+
+    ## 状態の初期化
+    def reset(self):
+        self.up_state = None
+        self.down_state = None
+
+    ## 状態の写し
+    # @brief otherと同じ係数・状態にします
+    # @details 係数・状態の配列は書き換えずに処理のたびに作り直すため、複製せずに
+    #          共有します。
+    # @param other Oversampler
+    def assign(self, other):
+        self.factor = other.factor
+        self.taps = other.taps
+        self.up = other.up
+        self.down = other.down
+        self.up_state = other.up_state
+        self.down_state = other.down_state
+
+    ## 状態の確保
+    # @param state 保持している状態
+    # @param shape 入力の形
+    # @param length 保持するサンプル数
+    # @return state 状態(形が変わった場合は0で初期化)
+    def getState(self, state, shape, length):
+        shape = shape[:-1] + (length,)
+        if state is None or state.shape != shape:
+            state = np.zeros(shape)
+        return state
+
+    ## アップサンプリング
+    # @param input 入力音信号(最終軸が時間軸)
+    # @return output factor倍のサンプリングレートの信号
+    def upsample(self, input):
+        if self.up is None:
+            self.design()
+        n = np.shape(input)[-1]
+        self.up_state = self.getState(self.up_state, np.shape(input), self.taps - 1)
+        extended = np.concatenate((self.up_state, input), axis=-1)
+        output = np.matmul(sliding_window_view(extended, self.taps, axis=-1), self.up)
+        self.up_state = extended[..., n:]
+        return output.reshape(np.shape(input)[:-1] + (n * self.factor,))
+
+    ## ダウンサンプリング
+    # @param input factor倍のサンプリングレートの信号(最終軸が時間軸)
+    # @return output 元のサンプリングレートの信号
+    def downsample(self, input):
+        if self.down is None:
+            self.design()
+        length = self.down.shape[0]
+        self.down_state = self.getState(self.down_state, np.shape(input), length - 1)
+        extended = np.concatenate((self.down_state, input), axis=-1)
+        windows = sliding_window_view(extended, length, axis=-1)[..., ::self.factor, :]
+        output = np.matmul(windows, self.down)
+        self.down_state = extended[..., extended.shape[-1] - (length - 1):]
+        return output
+
+
+""" ---------------------------------------------------------------------------
+    Waveshaper
+--------------------------------------------------------------------------- """
+## ウェーブシェーパー
+# @brief 特性曲線の参照テーブルを線形補間して歪みを加えます
+# @details 参照テーブルは特性曲線・閾値が変わったときだけ作り直します。
+#          テーブルは等間隔のため、位置は探索せず直接計算します。
+#          chunkを指定した場合はchunkごとに処理し、ブロックの長さによらず同じ結果に
+#          なります。
+class Waveshaper:
+    ## 参照テーブルの点数
+    TABLESIZE = 4097
+    ## 参照テーブルの範囲(閾値に対する倍率)
+    TABLERANGE = 16.0
+
+    ## コンストラクタ
+    # @param curve 特性曲線の種類
+    # @param threshold 閾値(振幅)
+    # @param factor オーバーサンプリング倍率
+    # @param chunk 処理単位(Noneの場合ブロック全体)
+    def __init__(self, curve="hard", threshold=6553.6, factor=1, chunk=None):
+        self.chunk = chunk
+        self.curve = None
+        self.threshold = None
+        self.factor = None
+        self.oversampler = None
+        self.spare = Oversampler(factor)
+        self.configure(curve, threshold, factor)
+
+    ## パラメータ設定
+    # @param curve 特性曲線の種類
+    # @param threshold 閾値(振幅)
+    # @param factor オーバーサンプリング倍率
+    def configure(self, curve, threshold, factor):
+        if factor not in FACTORS:
+            raise ValueError("oversampling factor must be one of {}".format(FACTORS))
+        if curve != self.curve or threshold != self.threshold:
+            threshold = max(float(threshold), 1.0)
+            grid = np.linspace(-self.TABLERANGE, self.TABLERANGE, self.TABLESIZE)
+            self.table_y = shapeCurve(curve, grid) * threshold
+            self.table_slope = np.append(np.diff(self.table_y), 0.0)
+            self.table_offset = self.TABLERANGE * threshold
+            self.table_scale = (self.TABLESIZE - 1) / (2 * self.table_offset)
+            self.curve = curve
+            self.threshold = threshold
+        if factor != self.factor:
+            self.oversampler = Oversampler(factor) if factor > 1 else None
+            self.factor = factor
+
+    ## 遅延
+    # @return latency 遅延[サンプル]
+    def latency(self):
+        if self.oversampler is None:
+            return 0
+        return self.oversampler.latency()
+
+    ## 状態の初期化
+    def reset(self):
+        if self.oversampler is not None:
+            self.oversampler.reset()
+
+    ## 設定・状態の写し
+    # @brief otherと同じ設定・状態にします(参照テーブルは共有し、オーバーサンプラーは
+    #        事前に確保したものに写します)
+    # @param other Waveshaper
+    def assign(self, other):
+        self.chunk = other.chunk
+        self.curve = other.curve
+        self.threshold = other.threshold
+        self.factor = other.factor
+        self.table_y = other.table_y
+        self.table_slope = other.table_slope
+        self.table_offset = other.table_offset
+        self.table_scale = other.table_scale
+        if other.oversampler is None:
+            self.oversampler = None
+        else:
+            self.spare.assign(other.oversampler)
+            self.oversampler = self.spare
+
+    ## 特性曲線の適用
+    # @details サンプル・チャンネルごとの閾値は、参照テーブルを作り直さずに入出力の倍率で
+    #          反映します。
+    # @param input 入力音信号
+    # @param threshold サンプル・チャンネルごとの閾値(振幅, Noneの場合は設定した閾値)
+    # @return output 出力音信号
+    def shape(self, input, threshold=None):
+        if threshold is not None:
+            ratio = np.maximum(threshold, 1.0) / self.threshold
+            output = self.shape(input / ratio)
+            output *= ratio
+            return output
+        position = np.add(input, self.table_offset)
+        position *= self.table_scale
+        np.clip(position, 0, self.TABLESIZE - 1, out=position)
+        index = position.astype(np.intp)
+        position -= index
+        position *= self.table_slope[index]
+        position += self.table_y[index]
+        return position
+
+    ## エフェクト処理
+    # @param input 入力音信号(最終軸が時間軸)
+    # @param threshold サンプル・チャンネルごとの閾値(振幅, Noneの場合は設定した閾値)
+    # @return output 出力音信号
+    def process(self, input, threshold=None):
+        if self.oversampler is None:
+            return self.shape(input, threshold)
+        length = np.shape(input)[-1]
+        chunk = self.chunk or length
+        if length <= chunk:
+            return self.processBlock(input, threshold)
+        output = np.empty(np.shape(input))
+        for start in range(0, length, chunk):
+            output[..., start:start + chunk] = self.processBlock(
+                input[..., start:start + chunk], segment(threshold, start, start + chunk))
+        return output
+
+    ## オーバーサンプリング処理
+    # @param input 入力音信号(最終軸が時間軸)
+    # @param threshold サンプル・チャンネルごとの閾値(振幅, Noneの場合は設定した閾値)
+    # @return output 出力音信号
+    def processBlock(self, input, threshold=None):
+        upsampled = self.oversampler.upsample(input)
+        if np.ndim(threshold) == 1:
+            threshold = np.repeat(threshold, self.factor)
+        return self.oversampler.downsample(self.shape(upsampled, threshold))
+
+
+## ウェーブシェーパーのノード
+# @brief 閾値(MAXLEVELに対する%)・特性曲線・オーバーサンプリング倍率を指定します
+# @details 倍率が1の場合はpointwiseなノードとして隣接するノードと融合され、
+#          hardはクリップ、それ以外は参照テーブルで作業バッファをその場で処理します。
+#          オーバーサンプリング(2倍以上)は指定した場合のみ行います。
+class WaveshaperNode(DistortionNode):
+    ## コンストラクタ
+    # @param name ノード名
+    # @param thresh 閾値[%]
+    # @param maxlevel 最大振幅
+    # @param curve 特性曲線の種類
+    # @param oversample オーバーサンプリング倍率
+    # @param chunk 処理単位(CHUNK)
+    # @param enabled 有効/無効
+    # @param twin 切り替え前の処理用の複製を確保するか
+    def __init__(self, name, thresh=20, maxlevel=32768.0, curve="hard", oversample=1,
+                 chunk=None, enabled=True, twin=True):
+        super(WaveshaperNode, self).__init__(name, thresh, maxlevel, enabled)
+        self.curve = curve
+        self.oversample = oversample
+        self.engine = Waveshaper(curve, self.level(), oversample, chunk)
+        self.twin = None
+        if twin:
+            self.twin = WaveshaperNode(name, thresh, maxlevel, curve, oversample, chunk,
+                                       enabled, False)
+
+    ## サンプルごとに独立した処理か(オーバーサンプリングしない場合)
+    @property
+    def pointwise(self):
+        return self.oversample == 1
+
+    def key(self):
+        return (self.pointwise,)
+
+    def latency(self):
+        return self.configure().latency()
+
+    def reset(self):
+        self.engine.reset()
+
+    def memory(self):
+        oversampler = self.configure().oversampler
+        return 0 if oversampler is None else oversampler.memory()
+
+    def shadow(self):
+        twin = self.twin
+        twin.thresh = self.thresh
+        twin.maxlevel = self.maxlevel
+        twin.curve = self.curve
+        twin.oversample = self.oversample
+        twin.engine.assign(self.engine)
+        return twin
+
+    ## パラメータの反映
+    # @brief 参照テーブルは最大の閾値で作り、チャンネルごとの閾値は倍率で反映します
+    # @return engine ウェーブシェーパー
+    def configure(self):
+        self.engine.configure(self.curve, self.level(np.max(self.thresh)), self.oversample)
+        return self.engine
+
+    ## サンプル・チャンネルごとの閾値
+    # @param length ブロック長
+    # @return level サンプル・チャンネルごとの閾値(振幅, 定数の場合None)
+    def levelCurve(self, length):
+        thresh = self.takeCurve("thresh", length)
+        return self.level(thresh) if np.ndim(thresh) else None
+
+    def shape(self, buffer):
+        if self.curve == "hard":
+            super(WaveshaperNode, self).shape(buffer)
+        else:
+            level = self.levelCurve(np.shape(buffer)[-1])
+            np.copyto(buffer, self.configure().shape(buffer, level), casting="unsafe")
+
+    def process(self, buffer, counter):
+        level = self.levelCurve(np.shape(buffer)[-1])
+        return self.configure().process(buffer, level)
@@ -0,0 +1,38 @@
+# @package conftest.py
+# @brief SoundEffectorのテスト共通設定(src/をimportパスに追加します)
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import os
+import sys
+import numpy as np
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, os.path.abspath(SRC))
+
+## 録音データ
+RECORDED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "test.csv")
+
+
+## ディスクのキャッシュを一時ディレクトリにします
+@pytest.fixture(autouse=True)
+def cacheDir(tmp_path, monkeypatch):
+    import SoundEffectorCache
+    monkeypatch.setenv("SOUNDEFFECTOR_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(SoundEffectorCache, "CACHEDIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+## 試験信号(雑音と正弦波の和, int16型, モノラル)
+@pytest.fixture
+def signal():
+    random = np.random.RandomState(0)
+    t = np.arange(44100 // 2) / 44100
+    data = 6000 * np.sin(2 * np.pi * 220 * t) + 2000 * random.randn(len(t))
+    return np.array(np.clip(data, -32768, 32767), dtype="int16")
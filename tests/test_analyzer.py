@@ -0,0 +1,64 @@
+# @package test_analyzer.py
+# @brief 解析器(購読・間引き)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorAnalyzer
+
+SIZE = 2048
+RATE = 44100
+
+
+## 正弦波
+# @param freq 周波数[Hz]
+# @return data SIZE点の正弦波
+def sine(freq):
+    return 10000 * np.sin(2 * np.pi * freq * np.arange(SIZE) / RATE)
+
+
+def test_only_subscribed_products_are_computed():
+    analyzer = SoundEffectorAnalyzer.Analyzer(SIZE, RATE)
+    data = sine(1000.0)
+    analyzer.analyze(data)
+    assert analyzer.analysis_count == 0
+    assert not analyzer.spectrum.any()
+    analyzer.subscribe("phase")
+    analyzer.analyze(data)
+    assert analyzer.analysis_count == 1
+    assert analyzer.phase.any()
+    assert not analyzer.power.any() and not analyzer.cepstrum.any()
+    analyzer.unsubscribe("phase")
+    analyzer.subscribe("cepstrum")
+    analyzer.analyze(data)
+    assert analyzer.power.any() and analyzer.cepstrum.any()
+    with pytest.raises(KeyError):
+        analyzer.subscribe("waveform")
+
+
+def test_callbacks_receive_the_results():
+    analyzer = SoundEffectorAnalyzer.Analyzer(SIZE, RATE)
+    received = []
+    analyzer.subscribe("power", received.append)
+    analyzer.analyze(sine(2000.0))
+    assert received[0] is analyzer.power
+    peak = analyzer.freq[np.argmax(received[0])]
+    assert abs(peak - 2000.0) <= RATE / SIZE
+
+
+def test_update_is_decimated_to_the_analysis_rate():
+    analyzer = SoundEffectorAnalyzer.Analyzer(SIZE, RATE, analysis_rate=60.0)
+    analyzer.subscribe("spectrum")
+    data = sine(440.0)
+    results = [analyzer.update(data, 256) for _ in range(1000)]
+    assert analyzer.interval == RATE // 60
+    assert sum(results) == analyzer.analysis_count == 1000 * 256 // analyzer.interval
+    analyzer.setAnalysisRate(RATE)
+    assert analyzer.interval == 1
+    assert analyzer.update(data, 1)
@@ -0,0 +1,74 @@
+# @package test_batch.py
+# @brief バッチ処理(セグメント分割・pre-roll)とファイル全体の処理の一致のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorBatch
+import SoundEffectorController
+import SoundEffectorIO
+import SoundEffectorModel
+import SoundEffectorRenderer
+
+PRESETS = {
+    "pointwise": {"pre_booster_amp": 4, "distortion_on": 1, "distortion_curve": "tanh"},
+    "oversampled": {"pre_booster_amp": 4, "distortion_on": 1, "distortion_oversample": 4,
+                    "phaser_on": 1, "depth_phaser": 0.3},
+    "convolution": {"convolution_on": 1, "post_booster_on": 1, "post_booster_amp": 2},
+    "stateful": {"reverb_on": 1, "compressor_on": 1},
+}
+
+
+## バッチ処理
+# @param path 入力ファイルパス
+# @param output_dir 出力ディレクトリ
+# @param preset プリセット
+# @param segment_sec 1セグメントの長さ[s]
+# @param analysis_hop 解析間隔(CHUNK数)
+# @return output 出力音信号
+# @return summary 処理結果
+def runBatch(path, output_dir, preset, segment_sec, analysis_hop=0):
+    summary = SoundEffectorBatch.processFiles([path], str(output_dir), preset, workers=2,
+                                              segment_sec=segment_sec,
+                                              analysis_hop=analysis_hop)
+    output, rate, channels = SoundEffectorIO.readSignal(str(output_dir / "input.wav"))
+    return output, summary[0]
+
+
+@pytest.mark.parametrize("name", sorted(PRESETS))
+def test_batch_matches_render(name, tmp_path, signal):
+    path = str(tmp_path / "input.wav")
+    SoundEffectorIO.writeSignal(path, np.repeat(signal, 2), 44100, 2)
+    output, summary = runBatch(path, tmp_path / "output", PRESETS[name], 0.1)
+    model = SoundEffectorModel.SoundEffectorModel()
+    SoundEffectorController.applyPreset(model, PRESETS[name])
+    expected = SoundEffectorRenderer.render(model, signal)
+    np.testing.assert_array_equal(output, expected)
+    if name == "stateful":
+        assert summary["segments"] == 1
+    else:
+        assert summary["segments"] > 1
+
+
+def test_batch_analysis_matches_unsplit(tmp_path, signal):
+    path = str(tmp_path / "input.wav")
+    SoundEffectorIO.writeSignal(path, signal, 44100, 1)
+    preset = PRESETS["oversampled"]
+    runBatch(path, tmp_path / "split", preset, 0.1, analysis_hop=2)
+    runBatch(path, tmp_path / "whole", preset, 60.0, analysis_hop=2)
+    split = np.load(str(tmp_path / "split" / "input_analysis.npz"))
+    whole = np.load(str(tmp_path / "whole" / "input_analysis.npz"))
+    np.testing.assert_array_equal(split["power"], whole["power"])
+    np.testing.assert_array_equal(split["cepstrum"], whole["cepstrum"])
+
+
+def test_split_segments_context():
+    segments = SoundEffectorBatch.splitSegments(10 * 256 + 5, 256, 4, 512)
+    assert segments == [(0, 1024, 0), (1024, 2048, 512), (2048, 2565, 512)]
+    assert SoundEffectorBatch.splitSegments(1000, 256, None, 512) == [(0, 1000, 0)]
@@ -0,0 +1,233 @@
+# @package test_controller.py
+# @brief パラメータシステム(平滑化・オートメーション・プリセット)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import copy
+import tracemalloc
+import numpy as np
+import pytest
+import SoundEffectorController
+import SoundEffectorModel
+import SoundEffectorRenderer
+
+
+## パラメータシステム付きのモデル
+# @param chunk 1ブロックのフレーム数
+# @return model SoundEffectorModel
+# @return parameters ParameterSystem
+def makeModel(chunk=256):
+    model = SoundEffectorModel.SoundEffectorModel(chunk)
+    parameters = SoundEffectorController.SoundEffectController(model).parameters
+    return model, parameters
+
+
+## コンパイル回数の計測
+# @param model SoundEffectorModel
+# @return calls コンパイルしたノードの並びのリスト
+def countCompiles(model):
+    calls = []
+    compile = model.chain.compile
+
+    def counted(nodes):
+        calls.append(nodes)
+        return compile(nodes)
+    model.chain.compile = counted
+    return calls
+
+
+def test_ramps_and_automation_do_not_recompile(signal):
+    model, parameters = makeModel()
+    parameters.update({"distortion_on": 1, "post_booster_on": 1})
+    model.effect(np.zeros(8 * model.CHUNK, dtype="int16"))
+    calls = countCompiles(model)
+    automation = SoundEffectorController.Automation(model.RATE)
+    automation.addLane("pre_booster_amp", [0.0, 0.2], [1.0, 8.0])
+    automation.addLane("distortion_thresh", [0.0, 0.2], [60.0, 10.0])
+    parameters.setAutomation(automation)
+    for start in range(0, len(signal) // 2, model.CHUNK):
+        if start == 4 * model.CHUNK:
+            parameters.set("post_booster_amp", 3.0)
+        model.effect(signal[start:start + model.CHUNK])
+    assert len(calls) == 1
+    assert model.post_booster_amp == 3.0
+
+
+def test_booster_ramp_reaches_target(signal):
+    model, parameters = makeModel()
+    parameters.set("pre_booster_amp", 4.0)
+    block = np.full(model.CHUNK, 1000, dtype="int16")
+    first = model.effect(block).copy()
+    assert first[0] < first[-1] <= 4000
+    for _ in range(8):
+        output = model.effect(block)
+    np.testing.assert_array_equal(output, 4000)
+
+
+def test_enable_switch_crossfades(signal):
+    model, parameters = makeModel()
+    parameters.update({"pre_booster_amp": 4.0})
+    block = np.full(model.CHUNK, 1000, dtype="int16")
+    for _ in range(8):
+        model.effect(block)
+    calls = countCompiles(model)
+    parameters.set("pre_booster_on", 0)
+    outputs = [model.effect(block).copy() for _ in range(8)]
+    output = np.concatenate(outputs)
+    assert output[0] > 1000
+    assert np.max(np.abs(np.diff(output.astype(int)))) < 100
+    np.testing.assert_array_equal(outputs[-1], 1000)
+    assert len(calls) == 2
+    assert model.chain.fades == {}
+
+
+def test_choice_switch_is_equal_power(signal):
+    model, parameters = makeModel()
+    parameters.update({"distortion_on": 1, "distortion_thresh": 20.0})
+    for start in range(0, 8 * model.CHUNK, model.CHUNK):
+        model.effect(signal[start:start + model.CHUNK])
+    parameters.set("distortion_curve", "tanh")
+    fade = parameters.fade_samples
+    output = np.concatenate([model.effect(signal[start:start + model.CHUNK]).copy()
+                             for start in range(8 * model.CHUNK,
+                                                8 * model.CHUNK + fade + model.CHUNK,
+                                                model.CHUNK)])
+    hard, soft = makeModel()[0], makeModel()[0]
+    for reference, curve in ((hard, "hard"), (soft, "tanh")):
+        reference.distortion_on = 1
+        reference.distortion_thresh = 20.0
+        reference.distortion_curve = curve
+    span = slice(8 * model.CHUNK, 8 * model.CHUNK + len(output))
+    old = SoundEffectorRenderer.render(hard, signal)[span].astype(int)
+    new = SoundEffectorRenderer.render(soft, signal)[span].astype(int)
+    theta = np.minimum(np.arange(1, len(output) + 1) / fade, 1.0) * np.pi / 2
+    expected = old * np.cos(theta) + new * np.sin(theta)
+    assert np.max(np.abs(output - expected)) <= 2
+    np.testing.assert_array_equal(output[fade + 1:], new[fade + 1:])
+
+
+def test_disabling_fades_out_the_live_node_without_copying(signal):
+    model, parameters = makeModel()
+    parameters.update({"convolution_on": 1, "reverb_on": 1, "delay_on": 1})
+    blocks = [signal[start:start + model.CHUNK]
+              for start in range(0, len(signal) - model.CHUNK, model.CHUNK)]
+    for block in blocks[:8]:
+        model.effect(block)
+    tracemalloc.start()
+    model.effect(blocks[8])
+    steady = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    parameters.update({"convolution_on": 0, "reverb_on": 0, "delay_on": 0})
+    model.effect(blocks[9])
+    switched = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert switched < steady + 16384
+    fade = model.chain.fades[id(model.chain["convolution"])]
+    assert fade.source is model.chain["convolution"] and fade.target is None
+
+
+def test_choice_switches_fade_from_the_twin(signal, monkeypatch):
+    model, parameters = makeModel()
+    parameters.update({"distortion_on": 1, "phaser_on": 1})
+    for start in range(0, 8 * model.CHUNK, model.CHUNK):
+        model.effect(signal[start:start + model.CHUNK])
+    monkeypatch.setattr(copy, "deepcopy", None)
+    parameters.update({"distortion_curve": "tanh", "distortion_oversample": 2,
+                       "stft_on": 1})
+    model.effect(signal[8 * model.CHUNK:9 * model.CHUNK])
+    for name in ("distortion", "phaser"):
+        node = model.chain[name]
+        fade = model.chain.fades[id(node)]
+        assert fade.source is not None and fade.target is not None
+        assert node.twin.engine is not node.engine
+    for start in range(9 * model.CHUNK, 16 * model.CHUNK, model.CHUNK):
+        model.effect(signal[start:start + model.CHUNK])
+    assert model.chain.fades == {}
+
+
+def test_toggle_back_during_fade_reverses(signal):
+    model, parameters = makeModel()
+    parameters.update({"pre_booster_amp": 4.0})
+    block = np.full(model.CHUNK, 1000, dtype="int16")
+    for _ in range(8):
+        model.effect(block)
+    parameters.set("pre_booster_on", 0)
+    outputs = [model.effect(block).copy()]
+    parameters.set("pre_booster_on", 1)
+    outputs += [model.effect(block).copy() for _ in range(8)]
+    output = np.concatenate(outputs).astype(int)
+    assert np.max(np.abs(np.diff(output))) < 100
+    np.testing.assert_array_equal(outputs[-1], 4000)
+
+
+def test_switches_render_like_stream(signal):
+    outputs = []
+    for render in (SoundEffectorRenderer.render, SoundEffectorRenderer.renderChunked):
+        model, parameters = makeModel()
+        automation = SoundEffectorController.Automation(model.RATE)
+        automation.addLane("distortion_on", [0.0, 0.1, 0.2], [0, 1, 0])
+        automation.addLane("phaser_on", [0.0, 0.15], [1, 0])
+        automation.addLane("distortion_thresh", [0.0, 0.3], [80.0, 10.0])
+        automation.addLane("distortion_oversample", [0.0, 0.12], [1, 4])
+        automation.addLane("delay_on", [0.0, 0.05], [0, 1])
+        automation.addLane("delay_mix", [0.0, 0.4], [0.2, 0.9])
+        parameters.setAutomation(automation)
+        outputs.append(render(model, signal))
+    np.testing.assert_array_equal(outputs[0], outputs[1])
+
+
+def test_automation_feeds_per_sample_values_to_nodes():
+    model, parameters = makeModel()
+    parameters.applyPreset(model, {"distortion_on": 1, "delay_on": 1})
+    ramp = np.arange(model.CHUNK) / model.CHUNK
+    automation = SoundEffectorController.Automation(model.RATE)
+    automation.addLane("distortion_thresh", [0.0, model.CHUNK / model.RATE], [10.0, 60.0])
+    automation.addLane("delay_mix", [0.0, model.CHUNK / model.RATE], [0.0, 1.0])
+    parameters.setAutomation(automation)
+    output = model.effect(np.full(model.CHUNK, 30000, dtype="int16"))
+    expected = np.minimum(30000, (10 + 50 * ramp) / 100 * model.MAXLEVEL) * (1 - ramp)
+    np.testing.assert_allclose(output, expected, atol=1)
+    assert model.distortion_thresh == pytest.approx(10 + 50 * ramp[-1])
+
+
+def test_step_lanes_switch_at_the_breakpoint():
+    model, parameters = makeModel()
+    parameters.applyPreset(model, {"pre_booster_on": 0, "pre_booster_amp": 4.0})
+    automation = SoundEffectorController.Automation(model.RATE)
+    automation.addLane("pre_booster_on", [0.0, 100 / model.RATE], [0, 1])
+    automation.addLane("distortion_oversample", [0.0, 0.001], [1, 2.4])
+    automation.addLane("distortion_curve", [0.0, 0.001], ["hard", "tanh"])
+    parameters.setAutomation(automation)
+    block = np.full(model.CHUNK, 1000, dtype="int16")
+    output = model.effect(block).copy()
+    np.testing.assert_array_equal(output[:100], 1000)
+    assert output[100] > 1000
+    for _ in range(8):
+        output = model.effect(block)
+    np.testing.assert_array_equal(output, 4000)
+    assert model.distortion_oversample == 2
+    assert isinstance(model.distortion_oversample, int)
+    assert model.distortion_curve == "tanh"
+    automation.addLane("distortion_oversample", [0.0], [3])
+    with pytest.raises(ValueError):
+        parameters.setAutomation(automation)
+
+
+def test_apply_preset_jumps_without_smoothing(tmp_path):
+    model, parameters = makeModel()
+    path = str(tmp_path / "preset.json")
+    parameters.update({"pre_booster_amp": 4.0, "distortion_thresh": 50.0})
+    parameters.savePreset(path)
+    model, parameters = makeModel()
+    parameters.applyPreset(model, SoundEffectorController.readPreset(path))
+    block = np.full(model.CHUNK, 1000, dtype="int16")
+    np.testing.assert_array_equal(model.effect(block), 4000)
+    assert model.distortion_thresh == 50.0
+    assert parameters.get("pre_booster_amp") == 4.0
+    with pytest.raises(KeyError):
+        SoundEffectorController.applyPreset(model, {"unknown": 1})
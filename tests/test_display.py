@@ -0,0 +1,105 @@
+# @package test_display.py
+# @brief 表示用データの間引き(波形・スペクトラム・スペクトログラム・ケプストラム・
+#        描画頻度)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import SoundEffectorDisplay
+
+
+def test_waveform_keeps_peaks_of_each_bucket(signal):
+    data = signal[:8192]
+    decimator = SoundEffectorDisplay.WaveformDecimator(8192, 512)
+    x, y = decimator.decimate(data)
+    assert decimator.bucket == 16
+    assert len(x) == len(y) == 2 * 512
+    blocks = data.reshape(512, 16)
+    np.testing.assert_array_equal(y[0::2], blocks.min(axis=1))
+    np.testing.assert_array_equal(y[1::2], blocks.max(axis=1))
+    assert y.max() == data.max() and y.min() == data.min()
+    np.testing.assert_array_equal(x[:4], [8, 8, 24, 24])
+
+
+def test_waveform_resizes_and_passes_short_signals_through(signal):
+    data = signal[:1000]
+    decimator = SoundEffectorDisplay.WaveformDecimator(1000, 300)
+    x, y = decimator.decimate(data)
+    assert decimator.bucket == 3 and len(y) == 2 * 333
+    assert y.max() == data[1:].max()
+    x, y = decimator.decimate(data, width=2000)
+    assert decimator.bucket == 1
+    assert y is data
+    np.testing.assert_array_equal(x, np.arange(1000))
+
+
+def test_log_spectrum_averages_bins_per_band():
+    freq = np.fft.rfftfreq(4096, 1 / 44100)
+    power = np.ones_like(freq)
+    power[freq > 1000] = 100.0
+    spectrum = SoundEffectorDisplay.LogSpectrum(freq, 20.0, 5000.0, 50, smoothing=0)
+    centers, level = spectrum.update(power)
+    assert len(centers) == len(level) == 50
+    np.testing.assert_allclose(level[centers < 800], 0.0, atol=1e-6)
+    np.testing.assert_allclose(level[centers > 1300], 20.0, atol=1e-6)
+    assert spectrum.empty.any()
+    assert np.isfinite(level).all()
+
+
+def test_log_spectrum_smooths_over_time():
+    freq = np.fft.rfftfreq(1024, 1 / 44100)
+    spectrum = SoundEffectorDisplay.LogSpectrum(freq, bands=20, smoothing=0.5)
+    spectrum.update(np.ones_like(freq))
+    level = spectrum.update(np.full_like(freq, 100.0))[1]
+    np.testing.assert_allclose(level, 10.0, atol=1e-6)
+
+
+def test_spectrogram_ring_keeps_the_latest_columns_in_order():
+    freq = np.fft.rfftfreq(2048, 1 / 44100)
+    spectrogram = SoundEffectorDisplay.Spectrogram(freq, analysis_rate=10.0,
+                                                   history_sec=2.0, bands=32)
+    image = spectrogram.image()
+    assert image.shape == (20, 32) and image.dtype == np.uint8
+    for step in range(25):
+        spectrogram.update(np.full_like(freq, 10 ** ((40.0 + 4 * step) / 10)))
+    image = spectrogram.image()
+    assert spectrogram.count == 25
+    assert image.shape == (20, 32)
+    assert image.flags["C_CONTIGUOUS"]
+    expected = np.round(4 * np.arange(5, 25) * 255 / 120)
+    np.testing.assert_allclose(image[:, 0], expected, atol=1)
+    assert (np.ptp(image, axis=1) <= 1).all()
+
+
+def test_spectrogram_quantizes_and_clips_the_level():
+    freq = np.fft.rfftfreq(2048, 1 / 44100)
+    spectrogram = SoundEffectorDisplay.Spectrogram(freq, bands=16)
+    for level_db in (0.0, 200.0):
+        spectrogram.update(np.full_like(freq, 10 ** (level_db / 10)))
+    image = spectrogram.image()
+    assert image[-2].max() == 0 and image[-1].min() == 255
+    assert spectrogram.lut.shape == (256, 3)
+    np.testing.assert_array_equal(spectrogram.lut[[0, -1]], [[0, 0, 0], [255, 255, 255]])
+    assert spectrogram.bandFrequency()[-1] < 20000.0
+
+
+def test_cepstrum_range_selects_a_view():
+    quefrency = np.arange(1024) / 44100
+    cepstrum = np.arange(1024, dtype=float)
+    selection = SoundEffectorDisplay.CepstrumRange(quefrency, 0.001, 0.02)
+    x, y = selection.select(cepstrum)
+    assert x[0] >= 1.0 and x[-1] <= 20.0
+    assert len(x) == len(y)
+    assert np.shares_memory(y, cepstrum)
+
+
+def test_frame_limiter_caps_the_frame_rate():
+    limiter = SoundEffectorDisplay.FrameLimiter(30.0)
+    ready = [limiter.ready(step / 120.0) for step in range(120)]
+    assert sum(ready) == 30
+    assert limiter.skipped == 90
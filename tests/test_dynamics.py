@@ -0,0 +1,82 @@
+# @package test_dynamics.py
+# @brief ダイナミクス系エフェクト(ノイズゲート・コンプレッサー・リミッター)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorDynamics
+
+CHUNK = 256
+RATE = 44100
+MAXLEVEL = 32768.0
+
+
+## 一定レベルの入力での処理
+# @param node DynamicsNode
+# @param level_db 入力レベル[dBFS](チャンネルごとの配列も可)
+# @param seconds 処理時間[s]
+# @return output 最後のブロックの出力音信号
+def settle(node, level_db, seconds=1.0):
+    amplitude = MAXLEVEL * 10 ** (np.asarray(level_db, dtype=float) / 20)
+    block = np.multiply.outer(amplitude, np.ones(CHUNK))
+    for _ in range(int(seconds * RATE) // CHUNK):
+        output = node.process(block, 0)
+    return output
+
+
+@pytest.mark.parametrize("level_db, threshold, ratio", [(-10.0, -20.0, 4.0),
+                                                        (-3.0, -30.0, 2.0),
+                                                        (-25.0, -20.0, 4.0)])
+def test_compressor_reduces_by_the_ratio_above_threshold(level_db, threshold, ratio):
+    node = SoundEffectorDynamics.DynamicsNode("compressor", CHUNK, RATE, "compressor")
+    node.threshold, node.ratio = threshold, ratio
+    output = settle(node, level_db)
+    expected = max(level_db - threshold, 0) * (1 - 1 / ratio)
+    assert node.gain_reduction_db == pytest.approx(expected, abs=1e-3)
+    np.testing.assert_allclose(20 * np.log10(output / MAXLEVEL), level_db - expected,
+                               atol=1e-3)
+
+
+def test_makeup_gain_is_applied_after_reduction():
+    node = SoundEffectorDynamics.DynamicsNode("compressor", CHUNK, RATE, "compressor")
+    node.makeup = 6.0
+    output = settle(node, -10.0)
+    np.testing.assert_allclose(20 * np.log10(output / MAXLEVEL), -10.0 - 7.5 + 6.0,
+                               atol=1e-3)
+
+
+def test_gate_attenuates_below_threshold_up_to_range():
+    node = SoundEffectorDynamics.DynamicsNode("gate", CHUNK, RATE, "gate")
+    settle(node, -55.0)
+    assert node.gain_reduction_db == pytest.approx(5.0 * (node.ratio - 1), abs=1e-3)
+    settle(node, -90.0)
+    assert node.gain_reduction_db == pytest.approx(node.range, abs=1e-3)
+    output = settle(node, -20.0)
+    assert node.gain_reduction_db == pytest.approx(0.0, abs=1e-6)
+    np.testing.assert_allclose(output, MAXLEVEL * 0.1)
+
+
+def test_limiter_holds_the_threshold():
+    node = SoundEffectorDynamics.DynamicsNode("limiter", CHUNK, RATE, "limiter")
+    output = settle(node, 0.0)
+    assert node.latency() == round(1.5e-3 * RATE)
+    assert node.gain_reduction_db == pytest.approx(-node.threshold, abs=1e-3)
+    np.testing.assert_allclose(20 * np.log10(output / MAXLEVEL), node.threshold, atol=1e-3)
+
+
+def test_linked_and_unlinked_detection():
+    linked = SoundEffectorDynamics.DynamicsNode("compressor", CHUNK, RATE, "compressor")
+    unlinked = SoundEffectorDynamics.DynamicsNode("compressor", CHUNK, RATE, "compressor",
+                                                  linked=False)
+    levels = [-10.0, -40.0]
+    gains = [20 * np.log10(settle(node, levels)[:, -1] / MAXLEVEL) - levels
+             for node in (linked, unlinked)]
+    np.testing.assert_allclose(gains[0], [-7.5, -7.5], atol=1e-3)
+    np.testing.assert_allclose(gains[1], [-7.5, 0.0], atol=1e-3)
+    np.testing.assert_allclose(unlinked.engine.reduction_db, [7.5, 0.0], atol=1e-3)
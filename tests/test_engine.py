@@ -0,0 +1,169 @@
+# @package test_engine.py
+# @brief オーディオエンジン・リングバッファ・PCM変換のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import copy
+import pickle
+import time
+import numpy as np
+import SoundEffectorCodec
+import SoundEffectorEngine
+import SoundEffectorModel
+import SoundEffectorRingBuffer
+
+
+## エンジンの作成
+# @param data 入力音信号(int16型, モノラル)
+# @param queue_size 表示側に渡すブロックの最大数
+# @return engine SoundEffectorEngine
+# @return backend FakeStreamBackend
+def makeEngine(data, queue_size=32):
+    model = SoundEffectorModel.SoundEffectorModel()
+    backend = SoundEffectorEngine.FakeStreamBackend(
+        model.toStereo(data), model.RATE, model.CHANNELS)
+    return SoundEffectorEngine.SoundEffectorEngine(model, backend, queue_size), backend
+
+
+def test_step_processes_until_input_ends(signal):
+    engine, backend = makeEngine(signal)
+    chunk = engine.model.CHUNK
+    steps = 0
+    while engine.step():
+        steps += 1
+    assert steps == -(-len(signal) // chunk)
+    assert engine.stats.block_count == steps
+    assert len(backend.output()) == 2 * steps * chunk
+    assert len(engine.queue) == min(steps, engine.queue.capacity)
+
+
+def test_dropout_count_sums_xruns_and_queue(signal):
+    engine, backend = makeEngine(signal[:8 * 1024], queue_size=4)
+    engine.period = 0.0
+    backend.overflow_count = 3
+    engine.step()
+    backend.underflow_count = 2
+    while engine.step():
+        pass
+    """ 処理時間が再生時間を超えてもxrunには数えません """
+    assert engine.stats.late_count == 8
+    assert engine.stats.xrun_count == 3 + 2
+    assert engine.queue.dropped_count == 4
+    assert engine.dropoutCount() == 3 + 2 + 4
+
+
+def test_engine_thread_stops_at_end_of_input(signal):
+    engine, backend = makeEngine(signal)
+    engine.start()
+    engine._thread.join(10)
+    assert not engine.isRunning()
+    engine.stop()
+    assert len(backend.output()) > 0
+
+
+def test_stats_keep_history_and_maximum():
+    stats = SoundEffectorEngine.EngineStats(history=4)
+    for latency in (1.0, 2.0, 3.0, 4.0, 5.0, 6.0):
+        stats.record(latency, 10.0 - latency, 4.5, xruns=int(latency == 2.0))
+    assert stats.block_count == 6
+    assert stats.late_count == 2
+    assert stats.xrun_count == 1
+    assert stats.max_latency == 6.0
+    assert stats.meanLatency() == np.mean([3.0, 4.0, 5.0, 6.0])
+    assert stats.last_wait == 4.0
+    assert stats.meanWait() == np.mean([7.0, 6.0, 5.0, 4.0])
+
+
+def test_write_wait_is_not_counted_as_processing_time(signal):
+    engine, backend = makeEngine(signal[:4 * 1024])
+    write = backend.write
+
+    def slowWrite(data):
+        time.sleep(0.05)
+        write(data)
+
+    backend.write = slowWrite
+    while engine.step():
+        pass
+    assert engine.stats.meanWait() >= 0.05
+    assert engine.stats.max_latency < engine.stats.meanWait()
+    assert engine.stats.xrun_count == 0
+
+
+def test_chain_latency_is_recorded(signal):
+    engine, backend = makeEngine(signal[:2048])
+    engine.model.limiter_on = 1
+    engine.model.distortion_on = 1
+    engine.model.distortion_oversample = 4
+    engine.step()
+    assert engine.stats.chain_latency == engine.model.chain.latency()
+    assert engine.stats.chain_latency > 0
+
+
+def test_block_ring_buffer_wraparound():
+    queue = SoundEffectorEngine.BlockRingBuffer(3, 2)
+    for i in range(5):
+        assert queue.push([i, -i])
+        np.testing.assert_array_equal(queue.popAll(), [[i, -i]])
+    for i in range(4):
+        queue.push([i, i])
+    assert queue.dropped_count == 1
+    np.testing.assert_array_equal(queue.popAll()[:, 0], [0, 1, 2])
+    assert len(queue) == 0
+
+
+def test_ring_buffer_wraparound_keeps_latest_contiguous():
+    ring = SoundEffectorRingBuffer.RingBuffer(8, "int64")
+    written = np.arange(30)
+    for start in range(0, 30, 3):
+        ring.push(written[start:start + 3])
+        count = min(start + 3, 8)
+        np.testing.assert_array_equal(ring.latest(count),
+                                      written[start + 3 - count:start + 3])
+    assert len(ring) == 8
+    ring.push(np.arange(100, 120))
+    np.testing.assert_array_equal(ring.latest(), np.arange(112, 120))
+    assert ring.latest().base is ring.storage
+
+
+def test_ring_buffer_frames():
+    ring = SoundEffectorRingBuffer.RingBuffer(3, frame_shape=(2,))
+    for i in range(5):
+        ring.pushFrame([i, 10 * i])
+    np.testing.assert_array_equal(ring.latest(), [[2, 20], [3, 30], [4, 40]])
+    ring.clear()
+    assert len(ring) == 0
+
+
+def test_codec_round_trip():
+    codec = SoundEffectorCodec.PCMCodec(256, 2)
+    interleaved = np.random.RandomState(1).randint(-32768, 32768, 512).astype("int16")
+    planar = codec.decode(interleaved.tobytes())
+    np.testing.assert_array_equal(planar, interleaved.reshape(256, 2).T)
+    output = codec.encode(planar.astype("int16"))
+    assert bytes(output) == interleaved.tobytes()
+
+
+def test_codec_output_is_reused_without_copy():
+    codec = SoundEffectorCodec.PCMCodec(4, 2)
+    output = codec.encode(np.array([[1, 2, 3, 4], [5, 6, 7, 8]], "int16"))
+    assert not isinstance(output, (bytes, bytearray))
+    assert memoryview(output).readonly is False
+    assert codec.encode(np.zeros(4, "int16")) is output
+    codec.encode(np.array([[1, 2, 3, 4], [5, 6, 7, 8]], "int16"))
+    for restored in (copy.deepcopy(codec), pickle.loads(pickle.dumps(codec))):
+        assert bytes(restored.output) == bytes(output)
+        restored.encode(np.zeros(4, "int16"))
+        assert not any(bytes(restored.output))
+    assert bytes(output) == np.array([1, 5, 2, 6, 3, 7, 4, 8], "int16").tobytes()
+
+
+def test_codec_encodes_monoral_to_all_channels():
+    codec = SoundEffectorCodec.PCMCodec(4, 2)
+    output = np.frombuffer(codec.encode(np.array([1, 2, 3, 4], "int16")), "int16")
+    np.testing.assert_array_equal(output, [1, 1, 2, 2, 3, 3, 4, 4])
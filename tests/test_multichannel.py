@@ -0,0 +1,113 @@
+# @package test_multichannel.py
+# @brief 多チャンネルModel・ストリームプールのテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import SoundEffectorEngine
+import SoundEffectorMultiChannel
+
+CHUNK = 256
+EFFECTS = {"distortion_on": 1, "distortion_oversample": 2, "compressor_on": 1,
+           "tone_on": 1, "tone_bass": 6.0, "chorus_on": 1, "phaser_on": 1,
+           "stft_on": 1, "reverb_on": 1, "limiter_on": 1}
+
+
+## エフェクトをかけたモデルの作成
+# @param channels チャンネル数
+# @return model MultiChannelModel
+def makeModel(channels):
+    model = SoundEffectorMultiChannel.MultiChannelModel(channels, CHUNK)
+    for key, value in EFFECTS.items():
+        setattr(model, key, value)
+    return model
+
+
+## 疑似ストリームでの処理
+# @param model MultiChannelModel
+# @param planar 入力音信号(チャンネル数×n, int16型)
+# @return output 出力音信号(チャンネル数×n, int16型)
+def run(model, planar):
+    backend = SoundEffectorEngine.FakeStreamBackend(planar.T.ravel(), model.RATE,
+                                                    model.CHANNELS)
+    engine = SoundEffectorEngine.SoundEffectorEngine(model, backend)
+    while engine.step():
+        engine.queue.popAll()
+    return backend.output().reshape(-1, model.CHANNELS).T[:, :planar.shape[-1]]
+
+
+## チャンネルごとに異なる試験信号
+# @param signal 試験信号
+# @param channels チャンネル数
+# @return planar チャンネル数×n
+def makePlanar(signal, channels):
+    length = len(signal) // CHUNK * CHUNK
+    return np.stack([np.roll(signal[:length], 1000 * c) // (c + 1)
+                     for c in range(channels)])
+
+
+def test_channels_are_processed_independently(signal):
+    planar = makePlanar(signal, 3)
+    output = run(makeModel(3), planar)
+    for channel in range(3):
+        solo = run(makeModel(1), planar[channel:channel + 1])
+        np.testing.assert_array_equal(output[channel], solo[0])
+
+
+def test_channel_gain_and_mute(signal):
+    planar = makePlanar(signal, 3)
+    model = SoundEffectorMultiChannel.MultiChannelModel(3, CHUNK)
+    model.applyChannelPreset(1, {"gain": 0.5})
+    model.setChannelParameter("mute", 1, 2)
+    output = run(model, planar)
+    np.testing.assert_array_equal(output[0], planar[0])
+    half = (planar[1] * np.float32(0.5)).astype("int16")
+    np.testing.assert_array_equal(output[1], half)
+    assert not output[2].any()
+    assert model.getChannelPreset(2) == {"gain": 1.0, "mute": 1}
+    assert [stage.name for stage in model.chain.stages] == ["fused:pre_booster+channel"]
+
+
+def test_channel_effect_parameters(signal):
+    planar = makePlanar(signal, 2)
+    presets = [{"distortion_thresh": 10.0, "compressor_thresh": -30.0, "delay_mix": 0.2},
+               {"distortion_thresh": 40.0, "compressor_thresh": -10.0, "delay_mix": 0.8}]
+    common = {"distortion_on": 1, "compressor_on": 1, "delay_on": 1, "reverb_on": 1}
+    model = SoundEffectorMultiChannel.MultiChannelModel(2, CHUNK)
+    for key, value in common.items():
+        setattr(model, key, value)
+    for channel, preset in enumerate(presets):
+        model.applyChannelPreset(channel, preset)
+    assert model.getChannelPreset(1) == dict(presets[1], gain=1.0, mute=0)
+    output = run(model, planar)
+    for channel, preset in enumerate(presets):
+        solo = SoundEffectorMultiChannel.MultiChannelModel(1, CHUNK)
+        for key, value in dict(common, **preset).items():
+            setattr(solo, key, value)
+        np.testing.assert_array_equal(output[channel],
+                                      run(solo, planar[channel:channel + 1])[0])
+    model.setChannelParameter("delay_mix", 0.5)
+    assert model.delay_mix == 0.5
+
+
+def test_stream_pool_runs_each_stream_on_its_own_thread(signal):
+    planar = makePlanar(signal, 2)
+    models = [makeModel(2) for _ in range(3)]
+    backends = [SoundEffectorEngine.FakeStreamBackend(planar.T.ravel(), model.RATE, 2)
+                for model in models]
+    pool = SoundEffectorMultiChannel.StreamPool(
+        [SoundEffectorEngine.SoundEffectorEngine(model, backend, queue_size=1024)
+         for model, backend in zip(models, backends)])
+    pool.start()
+    pool.join(30)
+    assert not pool.isRunning()
+    pool.stop()
+    expected = run(makeModel(2), planar)
+    for backend in backends:
+        output = backend.output().reshape(-1, 2).T[:, :planar.shape[-1]]
+        np.testing.assert_array_equal(output, expected)
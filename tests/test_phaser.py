@@ -0,0 +1,71 @@
+# @package test_phaser.py
+# @brief フェーザー(複素乗数表・LFO)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import math
+import numpy as np
+import SoundEffectorPhaser
+
+SIZE = 256
+
+
+## 位相のシフト量に対する回転角
+# @param level 位相のシフト量
+# @return theta 周波数ビンごとの回転角
+def rotation(level):
+    half = SIZE // 2
+    return np.mod(np.pi * level * 200 * np.arange(half + 1) / half, np.pi)
+
+
+def test_table_rows_follow_the_lfo_levels():
+    phaser = SoundEffectorPhaser.Phaser(SIZE, shift=0.5)
+    assert phaser.table.shape == (1, SIZE // 2 + 1)
+    np.testing.assert_allclose(phaser.table[0], (1 + np.exp(1j * rotation(0.5))) / 2)
+    phaser.configure(0.5, 0.2, 1.0)
+    levels = np.linspace(0.3, 0.7, phaser.steps)
+    assert phaser.table.shape == (phaser.steps, SIZE // 2 + 1)
+    for row, level in zip(phaser.table, levels):
+        np.testing.assert_allclose(row, (1 + np.exp(1j * rotation(level))) / 2)
+
+
+def test_tables_are_rebuilt_in_place():
+    phaser = SoundEffectorPhaser.Phaser(SIZE, shift=0.5, depth=0.1)
+    tables = phaser.tables
+    for shift in np.linspace(0.1, 0.9, 50):
+        phaser.configure(shift, 0.1, 0.5)
+        assert phaser.tables is tables
+        assert np.shares_memory(phaser.table, tables)
+
+
+def test_response_is_a_phase_rotation_mixed_with_the_dry_signal():
+    """ 9e1a8e4以前は回転が実部で打ち消され、cos(θ)の重み付けになっていました """
+    phaser = SoundEffectorPhaser.Phaser(SIZE, shift=0.37)
+    n = np.arange(SIZE)
+    for k in (3, 17, 64):
+        theta = rotation(0.37)[k]
+        frame = np.cos(2 * np.pi * k * n / SIZE)
+        output = phaser.process(frame, 0)
+        expected = math.cos(theta / 2) * np.cos(2 * np.pi * k * n / SIZE + theta / 2)
+        np.testing.assert_allclose(output, expected, atol=1e-12)
+        weighted = (1 + math.cos(theta)) / 2 * frame
+        if abs(math.sin(theta)) > 0.1:
+            assert not np.allclose(output, weighted, atol=1e-3)
+
+
+def test_lfo_selects_rows_per_frame(signal):
+    phaser = SoundEffectorPhaser.Phaser(SIZE, shift=0.5, depth=0.3, lfo_rate=2.0)
+    indices = [phaser.lfoIndex(counter) for counter in range(200)]
+    assert indices[0] == round((phaser.steps - 1) / 2)
+    assert min(indices) == 0 and max(indices) == phaser.steps - 1
+    frames = signal[:8 * SIZE].astype(float)
+    output = phaser.process(frames, 5)
+    for index in range(8):
+        frame = frames[index * SIZE:(index + 1) * SIZE]
+        np.testing.assert_allclose(output[index * SIZE:(index + 1) * SIZE],
+                                   phaser.processFrame(frame, 5 + index), atol=1e-9)
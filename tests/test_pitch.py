@@ -0,0 +1,70 @@
+# @package test_pitch.py
+# @brief 基本周波数推定(ケプストラム・YIN)とチューナーのテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorAnalyzer
+import SoundEffectorPitch
+
+SIZE = 4096
+RATE = 44100
+
+
+## 試験音
+# @param frequency 基本周波数[Hz]
+# @param harmonics 倍音の数(1の場合は正弦波)
+# @return data 1秒間の音信号
+def tone(frequency, harmonics=1):
+    time = np.arange(RATE) / RATE
+    return sum(8000 / k * np.sin(2 * np.pi * k * frequency * time)
+               for k in range(1, harmonics + 1) if k * frequency < RATE / 2)
+
+
+@pytest.mark.parametrize("frequency", [82.41, 110.0, 196.0, 261.63, 440.0, 659.25, 880.0])
+@pytest.mark.parametrize("harmonics", [1, 7])
+def test_tracks_a_known_tone_within_a_cent(frequency, harmonics):
+    tracker = SoundEffectorPitch.PitchTracker(SIZE, RATE)
+    times, estimated, confidence = tracker.track(tone(frequency, harmonics), 1024)
+    cents = 1200 * np.log2(estimated / frequency)
+    assert np.max(np.abs(cents)) < 1.0
+    assert np.min(confidence) > 0.95
+    assert times[0] == pytest.approx(SIZE / RATE)
+
+
+def test_silence_is_unvoiced():
+    tracker = SoundEffectorPitch.PitchTracker(SIZE, RATE)
+    _, frequency, confidence = tracker.track(np.zeros(RATE // 4), 1024)
+    assert not frequency.any()
+    assert np.max(confidence) <= 1 - tracker.yin_threshold
+
+
+def test_real_time_estimate_matches_offline_track():
+    data = tone(196.0, 5)
+    tracker = SoundEffectorPitch.PitchTracker(SIZE, RATE)
+    _, offline, _ = tracker.track(data, 1024)
+    analyzer = SoundEffectorAnalyzer.Analyzer(SIZE, RATE)
+    received = []
+    tracker.attach(analyzer)
+    tracker.subscribe(lambda frequency, confidence: received.append(frequency))
+    analyzer.analyze(data[10 * 1024:10 * 1024 + SIZE])
+    assert received == [tracker.frequency]
+    assert tracker.frequency == pytest.approx(offline[10], rel=1e-9)
+    assert tracker.note()[:2] == ("G", 3)
+    with pytest.raises(ValueError):
+        tracker.attach(SoundEffectorAnalyzer.Analyzer(2 * SIZE, RATE))
+
+
+def test_note_names_and_cents():
+    assert SoundEffectorPitch.noteName(440.0) == ("A", 4, 0.0)
+    name, octave, cents = SoundEffectorPitch.noteName(261.63)
+    assert (name, octave) == ("C", 4) and abs(cents) < 0.1
+    name, octave, cents = SoundEffectorPitch.noteName(440.0 * 2 ** (30 / 1200))
+    assert (name, octave) == ("A", 4) and cents == pytest.approx(30.0)
+    assert SoundEffectorPitch.noteName(0.0) == (None, 0, 0.0)
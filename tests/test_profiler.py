@@ -0,0 +1,66 @@
+# @package test_profiler.py
+# @brief 処理段ごとの計測(ヒストグラム・パーセンタイル)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorProfiler
+
+
+@pytest.mark.parametrize("elapsed_us", [1.1, 3.0, 15.0, 250.0, 9999.0, 99000.0])
+def test_histogram_bins_contain_the_value(elapsed_us):
+    stats = SoundEffectorProfiler.StageStats()
+    stats.record(elapsed_us)
+    index = int(np.flatnonzero(stats.counts)[0])
+    assert stats.edges[index - 1] <= elapsed_us < stats.edges[index]
+
+
+def test_histogram_has_under_and_overflow_bins():
+    stats = SoundEffectorProfiler.StageStats()
+    stats.record(0.2)
+    stats.record(5e6)
+    assert stats.counts[0] == 1
+    assert stats.counts[-1] == 1
+    assert stats.counts.sum() == 2
+
+
+def test_percentiles_use_the_recent_window():
+    stats = SoundEffectorProfiler.StageStats(history=100)
+    for value in range(1, 101):
+        stats.record(float(value))
+    summary = stats.summary()
+    assert summary["count"] == 100
+    assert summary["mean_us"] == pytest.approx(50.5)
+    assert summary["p50_us"] == pytest.approx(50.5)
+    assert summary["p99_us"] == pytest.approx(99.01)
+    assert summary["max_us"] == 100.0
+    for _ in range(100):
+        stats.record(10.0)
+    summary = stats.summary()
+    assert summary["p50_us"] == summary["p99_us"] == 10.0
+    assert summary["max_us"] == 100.0
+    assert summary["count"] == 200
+    assert summary["mean_us"] == pytest.approx((5050 + 1000) / 200)
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = SoundEffectorProfiler.Profiler()
+    profiler.end("stage", profiler.begin())
+    assert profiler.names() == []
+    profiler.enabled = True
+    for _ in range(3):
+        profiler.end("stage", profiler.begin())
+    assert profiler.summary()["stage"]["count"] == 3
+    edges, counts = profiler.histogram("stage")
+    assert counts.sum() == 3
+    counts[:] = 0
+    assert profiler.histogram("stage")[1].sum() == 3
+    assert profiler.report().startswith("stage")
+    profiler.reset()
+    assert profiler.names() == []
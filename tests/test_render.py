@@ -0,0 +1,111 @@
+# @package test_render.py
+# @brief オフライン処理(render)と実時間処理(CHUNKずつ)の一致のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import argparse
+import copy
+import json
+import numpy as np
+import pytest
+import SoundEffector
+import SoundEffectorBenchmark
+import SoundEffectorController
+import SoundEffectorIO
+import SoundEffectorModel
+import SoundEffectorRenderer
+from conftest import RECORDED
+
+
+## 組み合わせを適用したモデル
+# @param combo エフェクトの組み合わせ名
+# @return model SoundEffectorModel
+def makeModel(combo):
+    model = SoundEffectorModel.SoundEffectorModel()
+    SoundEffectorController.applyPreset(model, SoundEffectorBenchmark.COMBOS[combo])
+    return model
+
+
+@pytest.mark.parametrize("combo", sorted(SoundEffectorBenchmark.COMBOS))
+def test_render_matches_chunked(combo, signal):
+    model = makeModel(combo)
+    expected = SoundEffectorRenderer.renderChunked(copy.deepcopy(model), signal)
+    output = SoundEffectorRenderer.render(model, signal)
+    np.testing.assert_array_equal(output, expected)
+
+
+def test_render_matches_chunked_with_every_effect(signal):
+    model = SoundEffectorModel.SoundEffectorModel()
+    for node in model.chain.nodes:
+        node.enabled = True
+    model.stft_on = 1
+    model.distortion_oversample = 2
+    expected = SoundEffectorRenderer.renderChunked(copy.deepcopy(model), signal)
+    output = SoundEffectorRenderer.render(model, signal, block_chunks=7)
+    np.testing.assert_array_equal(output, expected)
+
+
+def test_render_matches_chunked_with_automation(signal):
+    model = SoundEffectorModel.SoundEffectorModel()
+    parameters = SoundEffectorController.SoundEffectController(model).parameters
+    parameters.update({"distortion_on": 1, "post_booster_on": 1})
+    automation = SoundEffectorController.Automation(model.RATE)
+    automation.addLane("pre_booster_amp", [0.0, 0.4], [1.0, 6.0])
+    automation.addLane("distortion_thresh", [0.0, 0.4], [50.0, 10.0])
+    parameters.setAutomation(automation)
+    expected = SoundEffectorRenderer.renderChunked(copy.deepcopy(model), signal)
+    output = SoundEffectorRenderer.render(model, signal)
+    np.testing.assert_array_equal(output, expected)
+
+
+def test_render_recorded_file(tmp_path):
+    model = makeModel("full")
+    reference = copy.deepcopy(model)
+    path = str(tmp_path / "output.wav")
+    output, rtf = SoundEffectorRenderer.renderFile(RECORDED, path, model)
+    data, rate, channels = SoundEffectorIO.readSignal(RECORDED)
+    expected = SoundEffectorRenderer.renderChunked(reference, data)
+    np.testing.assert_array_equal(output, expected)
+    written, rate, channels = SoundEffectorIO.readSignal(path)
+    np.testing.assert_array_equal(written, output)
+    assert rtf > 0
+
+
+def test_headless_renders_preset_in_large_blocks(tmp_path, monkeypatch, signal):
+    source = str(tmp_path / "input.wav")
+    SoundEffectorIO.writeSignal(source, signal, 44100, 1)
+    preset = str(tmp_path / "preset.json")
+    with open(preset, "w") as f:
+        json.dump(SoundEffectorBenchmark.COMBOS["full"], f)
+    blocks = []
+    effect = SoundEffectorModel.SoundEffectorModel.effect
+
+    def counted(self, input):
+        blocks.append(np.shape(input)[-1])
+        return effect(self, input)
+    monkeypatch.setattr(SoundEffectorModel.SoundEffectorModel, "effect", counted)
+    model = SoundEffectorModel.SoundEffectorModel()
+    args = argparse.Namespace(input=source, output=str(tmp_path / "output.wav"),
+                              preset=preset, rate=44100, channels=1, block=4)
+    SoundEffector.runHeadless(model, args)
+    assert model.parameters is None
+    assert max(blocks) == 4 * model.CHUNK
+    written, rate, channels = SoundEffectorIO.readSignal(args.output)
+    np.testing.assert_array_equal(written, SoundEffectorRenderer.render(makeModel("full"), signal))
+
+
+@pytest.mark.parametrize("ext", [".wav", ".csv", ".raw"])
+def test_signal_io_round_trip(ext, tmp_path, signal):
+    path = str(tmp_path / ("signal" + ext))
+    stereo = np.repeat(signal[:1000], 2)
+    SoundEffectorIO.writeSignal(path, stereo, 22050, 2)
+    data, rate, channels = SoundEffectorIO.readSignal(path, 22050, 2)
+    np.testing.assert_array_equal(data, stereo)
+    assert SoundEffectorIO.signalInfo(path, 22050, 2) == (1000, 22050, 2)
+    part, rate, channels = SoundEffectorIO.readRange(path, 990, 1200, 22050, 2)
+    np.testing.assert_array_equal(part, stereo[1980:])
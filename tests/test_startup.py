@@ -0,0 +1,70 @@
+# @package test_startup.py
+# @brief 起動時の遅延読み込みとDSPテーブルのキャッシュのテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import copy
+import importlib
+import numpy as np
+import SoundEffectorBenchmark
+import SoundEffectorCache
+import SoundEffectorDelay
+import SoundEffectorModel
+import SoundEffectorRenderer
+import SoundEffectorWaveshaper
+
+
+def test_headless_startup_does_not_import_heavy_modules():
+    startup = SoundEffectorBenchmark.measureStartup(repeats=1)
+    assert startup["heavy_modules"] == []
+
+
+def test_model_construction_defers_tables():
+    model = SoundEffectorModel.SoundEffectorModel()
+    assert model.chain["convolution"]._engine is None
+    assert SoundEffectorWaveshaper.Oversampler(4).up is None
+
+
+def test_oversampler_design_matches_direct_design():
+    oversampler = SoundEffectorWaveshaper.Oversampler(4)
+    oversampler.design()
+    fir = SoundEffectorWaveshaper.designLowpass(4 * oversampler.taps, 0.9 / 4)
+    np.testing.assert_array_equal(oversampler.down, fir[::-1])
+
+
+def test_cached_tables_are_bit_identical(cacheDir):
+    impulse = SoundEffectorDelay.defaultImpulse(1.0, 44100)
+    assert not impulse.flags.writeable
+    assert len(list(cacheDir.iterdir())) == 1
+    SoundEffectorCache.clear()
+    np.testing.assert_array_equal(SoundEffectorDelay.defaultImpulse(1.0, 44100), impulse)
+    np.testing.assert_array_equal(SoundEffectorDelay.makeImpulse(1.0, 44100, 0), impulse)
+
+
+def test_render_is_identical_with_and_without_disk_cache(signal, monkeypatch):
+    model = SoundEffectorModel.SoundEffectorModel()
+    model.convolution_on = 1
+    model.distortion_on = 1
+    model.distortion_oversample = 4
+    reference = copy.deepcopy(model)
+    cached = SoundEffectorRenderer.render(model, signal)
+    SoundEffectorCache.clear()
+    monkeypatch.setattr(SoundEffectorCache, "CACHEDIR", "")
+    np.testing.assert_array_equal(SoundEffectorRenderer.render(reference, signal), cached)
+
+
+def test_cache_key_follows_builder_source():
+    key = SoundEffectorCache.cacheKey("impulse", SoundEffectorDelay.makeImpulse, (1.0,))
+    assert SoundEffectorCache.sourceHash(SoundEffectorDelay.makeImpulse) in key
+    assert key != SoundEffectorCache.cacheKey("impulse", SoundEffectorWaveshaper.designLowpass,
+                                              (1.0,))
+
+
+def test_disk_cache_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("SOUNDEFFECTOR_CACHE")
+    assert importlib.reload(SoundEffectorCache).CACHEDIR == ""
@@ -0,0 +1,121 @@
+# @package test_state.py
+# @brief エフェクトノードの状態がCHUNKの境界をまたいで連続することのテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import copy
+import numpy as np
+import pytest
+import SoundEffectorChain
+import SoundEffectorDelay
+import SoundEffectorDynamics
+import SoundEffectorFilter
+import SoundEffectorWaveshaper
+
+CHUNK = 256
+RATE = 44100
+
+
+## 試験するノード
+# @return nodes ノード名→ノードの辞書
+def makeNodes():
+    eq = SoundEffectorFilter.EQNode("eq", rate=RATE)
+    eq.gains = [6.0, -3.0, 0.0, 4.0, -6.0, 0.0, 3.0, 0.0, -2.0]
+    wah = SoundEffectorFilter.WahNode("wah", CHUNK, RATE)
+    wah.lfo_rate = 2.0
+    tone = SoundEffectorFilter.ToneStackNode("tone", RATE)
+    tone.bass, tone.treble = 6.0, -6.0
+    phaser = SoundEffectorChain.PhaserNode("phaser", CHUNK, RATE, 2 * CHUNK, CHUNK // 2)
+    phaser.depth = 0.3
+    stft = copy.deepcopy(phaser)
+    stft.stft_on = True
+    gate = SoundEffectorDynamics.DynamicsNode("gate", CHUNK, RATE, "gate")
+    gate.threshold = -10.0
+    return {
+        "highpass": SoundEffectorFilter.PassNode("highpass", "highpass", 200.0, 2, RATE),
+        "lowpass": SoundEffectorFilter.PassNode("lowpass", "lowpass", 3000.0, 4, RATE),
+        "eq": eq,
+        "wah": wah,
+        "tone": tone,
+        "gate": gate,
+        "compressor": SoundEffectorDynamics.DynamicsNode("compressor", CHUNK, RATE,
+                                                         "compressor"),
+        "limiter": SoundEffectorDynamics.DynamicsNode("limiter", CHUNK, RATE, "limiter"),
+        "delay": SoundEffectorDelay.ModulatedDelayNode("delay", CHUNK, RATE, "delay"),
+        "chorus": SoundEffectorDelay.ModulatedDelayNode("chorus", CHUNK, RATE, "chorus"),
+        "flanger": SoundEffectorDelay.ModulatedDelayNode("flanger", CHUNK, RATE,
+                                                         "flanger"),
+        "reverb": SoundEffectorDelay.ReverbNode("reverb", CHUNK, RATE),
+        "convolution": SoundEffectorDelay.ConvolutionNode("convolution", CHUNK, RATE),
+        "phaser": phaser,
+        "phaser_stft": stft,
+        "waveshaper": SoundEffectorWaveshaper.WaveshaperNode(
+            "waveshaper", 10, curve="tanh", oversample=4, chunk=CHUNK),
+    }
+
+
+@pytest.mark.parametrize("name", sorted(makeNodes()))
+@pytest.mark.parametrize("channels", [1, 2])
+def test_state_continues_across_chunks(name, channels, signal):
+    node = makeNodes()[name]
+    length = len(signal) // CHUNK * CHUNK
+    data = np.tile(signal[:length].astype("float32"), (channels, 1))
+    if channels == 1:
+        data = data[0]
+    whole = np.array(copy.deepcopy(node).process(data.copy(), 0), dtype="float64")
+    chunked = np.empty(np.shape(data))
+    for block, start in enumerate(range(0, length, CHUNK)):
+        chunked[..., start:start + CHUNK] = node.process(
+            data[..., start:start + CHUNK].copy(), block)
+    np.testing.assert_array_equal(chunked, whole)
+    assert np.any(chunked != data)
+
+
+def test_filter_reset_clears_state(signal):
+    node = SoundEffectorFilter.PassNode("lowpass", "lowpass", 1000.0, 2, RATE)
+    first = node.process(signal[:CHUNK].astype("float32"), 0)
+    node.process(signal[CHUNK:4 * CHUNK].astype("float32"), 1)
+    node.reset()
+    again = node.process(signal[:CHUNK].astype("float32"), 0)
+    np.testing.assert_array_equal(again, first)
+
+
+@pytest.mark.parametrize("name", ["delay", "reverb", "convolution", "waveshaper",
+                                  "lowpass", "phaser_stft"])
+def test_reenabled_node_starts_without_old_state(name, signal):
+    node = makeNodes()[name]
+    fresh = copy.deepcopy(node)
+    chain = SoundEffectorChain.EffectChain([node])
+    chain.process(signal[:4 * CHUNK], 0)
+    node.enabled = False
+    chain.process(signal[:CHUNK], 4)
+    node.enabled = True
+    silence = np.zeros(CHUNK, dtype="int16")
+    expected = SoundEffectorChain.EffectChain([fresh]).process(silence, 5)
+    np.testing.assert_array_equal(chain.process(silence, 5), expected)
+
+
+def test_chain_latency_sums_enabled_nodes():
+    limiter = SoundEffectorDynamics.DynamicsNode("limiter", CHUNK, RATE, "limiter")
+    phaser = SoundEffectorChain.PhaserNode("phaser", CHUNK, RATE, 2 * CHUNK, CHUNK // 2)
+    phaser.stft_on = True
+    chain = SoundEffectorChain.EffectChain([limiter, phaser])
+    assert chain.latency() == limiter.latency() + phaser.stft.latency()
+    limiter.enabled = False
+    assert chain.latency() == phaser.stft.latency()
+
+
+def test_waveshaper_latency_uses_its_own_oversampler(monkeypatch):
+    node = SoundEffectorWaveshaper.WaveshaperNode("waveshaper", chunk=CHUNK)
+    assert node.latency() == 0 and node.memory() == 0
+    node.oversample = 4
+    latency, memory = node.latency(), node.memory()
+    assert latency == SoundEffectorWaveshaper.Oversampler(4).latency()
+    assert memory == SoundEffectorWaveshaper.Oversampler(4).memory()
+    monkeypatch.setattr(SoundEffectorWaveshaper, "Oversampler", None)
+    assert (node.latency(), node.memory()) == (latency, memory)
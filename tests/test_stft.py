@@ -0,0 +1,58 @@
+# @package test_stft.py
+# @brief STFT/オーバーラップ加算処理のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorSTFT
+
+
+## ブロックごとの処理
+# @param processor STFTProcessor
+# @param data 入力音信号(最終軸が時間軸)
+# @param block ブロック長
+# @return output 出力音信号
+def run(processor, data, block):
+    return np.concatenate([processor.process(data[..., start:start + block]).copy()
+                           for start in range(0, np.shape(data)[-1], block)], axis=-1)
+
+
+@pytest.mark.parametrize("window", ["hann", "hamming", "blackman", "boxcar"])
+@pytest.mark.parametrize("frame_size, hop", [(1024, 256), (512, 256), (2048, 512)])
+def test_reconstructs_input_delayed_by_latency(window, frame_size, hop, signal):
+    processor = SoundEffectorSTFT.STFTProcessor(frame_size, hop, window)
+    data = signal[:len(signal) // 2048 * 2048].astype(float)
+    output = run(processor, data, 1024)
+    latency = processor.latency()
+    assert latency == frame_size - hop
+    np.testing.assert_allclose(output[latency:], data[:len(data) - latency], atol=1e-6)
+
+
+def test_impulse_appears_after_latency():
+    processor = SoundEffectorSTFT.STFTProcessor(1024, 256)
+    data = np.zeros(4096)
+    data[1000] = 1.0
+    output = run(processor, data, 512)
+    assert np.argmax(np.abs(output)) == 1000 + processor.latency()
+
+
+def test_output_does_not_depend_on_block_length(signal):
+    data = np.stack([signal[:8192], signal[8192:16384]]).astype(float)
+    outputs = [run(SoundEffectorSTFT.STFTProcessor(1024, 256), data, block)
+               for block in (256, 1024, 4096)]
+    np.testing.assert_allclose(outputs[0], outputs[1], atol=1e-9)
+    np.testing.assert_allclose(outputs[0], outputs[2], atol=1e-9)
+
+
+def test_rejects_lengths_that_are_not_hop_multiples():
+    with pytest.raises(ValueError):
+        SoundEffectorSTFT.STFTProcessor(1000, 256)
+    processor = SoundEffectorSTFT.STFTProcessor(1024, 256)
+    with pytest.raises(ValueError):
+        processor.process(np.zeros(300))
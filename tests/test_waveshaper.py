@@ -0,0 +1,51 @@
+# @package test_waveshaper.py
+# @brief ウェーブシェーパー(オーバーサンプリングによる折り返し雑音の低減)のテスト
+# @author Nakashima
+# @date 2018/9/22
+# @version 0.0.1
+# @
+
+# @cond
+# -*- coding:utf-8 -*-
+# @endcond
+import numpy as np
+import pytest
+import SoundEffectorWaveshaper
+
+SIZE = 8192
+## 試験信号の周波数ビン(約7kHz, 3倍以上の高調波がナイキスト周波数を超えます)
+BIN = 1300
+
+
+## 折り返し雑音の割合
+# @brief 入力の高調波以外の周波数ビンの電力の割合を求めます
+# @param curve 特性曲線の種類
+# @param factor オーバーサンプリング倍率
+# @return ratio 折り返し雑音の割合[dB]
+def aliasing(curve, factor):
+    data = 20000 * np.sin(2 * np.pi * BIN * np.arange(4 * SIZE) / SIZE)
+    waveshaper = SoundEffectorWaveshaper.Waveshaper(curve, 5000.0, factor, 1024)
+    output = waveshaper.process(data)[-SIZE:]
+    power = np.abs(np.fft.rfft(output * np.hanning(SIZE))) ** 2
+    alias = np.ones(power.shape[0], dtype=bool)
+    alias[:3] = False
+    for harmonic in range(BIN, SIZE // 2 + 1, BIN):
+        alias[harmonic - 3:harmonic + 4] = False
+    return 10 * np.log10(power[alias].sum() / power.sum())
+
+
+@pytest.mark.parametrize("curve", SoundEffectorWaveshaper.CURVES)
+def test_oversampling_reduces_aliasing(curve):
+    ratios = [aliasing(curve, factor) for factor in SoundEffectorWaveshaper.FACTORS]
+    assert ratios[1] < ratios[0] - 10
+    assert ratios[-1] < ratios[0] - 35
+    assert all(later < earlier + 1 for earlier, later in zip(ratios, ratios[1:]))
+
+
+def test_without_clipping_oversampling_only_delays():
+    time = np.arange(4096)
+    data = 2000 * np.sin(2 * np.pi * 0.01 * time)
+    oversampled = SoundEffectorWaveshaper.Waveshaper("hard", 5000.0, 4, 1024)
+    output = oversampled.process(data)
+    expected = 2000 * np.sin(2 * np.pi * 0.01 * (time - oversampled.latency()))
+    np.testing.assert_allclose(output[512:], expected[512:], atol=20)